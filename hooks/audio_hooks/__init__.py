@@ -0,0 +1,5 @@
+"""
+Claude Code Audio Hooks - hook runner package
+
+runner.py holds the hook runner; hooks/hook_runner.py is its entry point.
+"""
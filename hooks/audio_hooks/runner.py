@@ -0,0 +1,4522 @@
+"""
+Claude Code Audio Hooks - Python Hook Runner
+Cross-platform hook runner that works on Windows, macOS, and Linux.
+This replaces the bash-based hooks for better Windows compatibility.
+
+Claude Code runs it through the hook_runner.py stub next to this package.
+Python caches the bytecode of an imported module, never of a script, so
+the stub keeps each event from recompiling this file.
+
+Usage:
+    python hook_runner.py <hook_type>
+    python hook_runner.py --daemon          Run the persistent playback daemon
+    python hook_runner.py --stop-daemon     Stop a running daemon
+    python hook_runner.py --resolve <hook>  Print all decisions for the bash hooks
+    python hook_runner.py --drain-queue     Play queued sounds (started automatically)
+    python hook_runner.py --event           Take the hook type from the JSON on stdin
+    python hook_runner.py --playlist <hook|file>...  Play sounds back to back
+    python hook_runner.py --ingest-history  Move spooled triggers into history.db
+
+Hook types: notification, stop, pretooluse, posttooluse, userpromptsubmit,
+            subagent_stop, precompact, session_start, session_end
+
+Environment Variables:
+    CLAUDE_HOOKS_DEBUG=1        Enable debug logging
+    CLAUDE_HOOKS_LOG_LEVEL=<l>  debug, info, error or off (overrides the config)
+    CLAUDE_HOOKS_NO_DAEMON=1    Never hand events to the daemon
+    CLAUDE_HOOKS_DETACH=1|0     Return before playback (overrides the config)
+    CLAUDE_HOOKS_LOG_DIR=<dir>  Write logs and trigger history here instead
+    CLAUDE_HOOKS_ENV_CACHE=<f>  Cache the resolved environment in this file
+    CLAUDE_HOOKS_PROFILE=1      Record per-phase timings in profile.log
+    CLAUDE_HOOKS_PROFILE_START  Launch time (epoch seconds) for the startup phase
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+import subprocess
+import re
+import struct
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # Unix
+    msvcrt = None
+
+# =============================================================================
+# DEBUG LOGGING SYSTEM
+# =============================================================================
+
+DEBUG = os.environ.get("CLAUDE_HOOKS_DEBUG", "").lower() in ("1", "true", "yes")
+
+# Records below the active level are dropped before anything is formatted;
+# trigger lines are "info". CLAUDE_HOOKS_LOG_LEVEL (or CLAUDE_HOOKS_DEBUG)
+# pins the level, otherwise the config's logging.level sets it.
+LOG_LEVELS = {"debug": 10, "info": 20, "error": 40, "off": 50}
+LOG_LEVEL_ENV = os.environ.get("CLAUDE_HOOKS_LOG_LEVEL", "").lower()
+if LOG_LEVEL_ENV not in LOG_LEVELS:
+    LOG_LEVEL_ENV = "debug" if DEBUG else ""
+
+# Logging calls only buffer records; flush_logs() writes them with one write
+# per file at exit, or from a thread in the daemon and queue worker. All of
+# a one-shot hook's logging, flush included, must fit in this budget.
+LOG_BUDGET_US = 500
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+# Flush early once this many records are waiting and no thread is flushing
+LOG_BUFFER_MAX_RECORDS = 500
+
+# Each log rolls over to a numbered segment (hook_triggers.log.1, .2, ...)
+# once it grows past its byte limit; only the newest segments are kept. The
+# history spool is ingested into history.db instead, so no row is pruned.
+LOG_MAX_BYTES = {
+    "debug.log": 256 * 1024,
+    "profile.log": 256 * 1024,
+    "errors.log": 64 * 1024,
+    "hook_triggers.log": 64 * 1024,
+    "history.spool": 256 * 1024,
+}
+DEFAULT_LOG_MAX_BYTES = 64 * 1024
+LOG_KEEP_SEGMENTS = 3
+
+_LOG_DIR: List[Path] = []
+
+# Active level and per-hook trigger-line sampling (keep 1 in N)
+_LOG_SETTINGS: Dict[str, Any] = {
+    "level": LOG_LEVELS[LOG_LEVEL_ENV or "info"],
+    "sample": {},
+    "direct_history": False,
+}
+# Buffered records: (log name, epoch time or None, prefix, message, args)
+_LOG_RECORDS: List[tuple] = []
+# [thread, lock] once start_log_flusher() has run
+_LOG_FLUSHER: List[Any] = []
+_LOG_AT_EXIT = [False]
+_SAMPLE_COUNTS: Dict[str, int] = {}
+
+
+def get_log_dir() -> Path:
+    """Get the log directory, creating it if necessary."""
+    if _LOG_DIR:
+        return _LOG_DIR[0]
+    override = os.environ.get("CLAUDE_HOOKS_LOG_DIR")
+    if override:
+        log_dir = Path(override)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        _LOG_DIR.append(log_dir)
+        return log_dir
+    if os.name == "nt":
+        base = Path(os.environ.get("TEMP", os.environ.get("TMP", "C:/Windows/Temp")))
+    else:
+        base = Path("/tmp")
+    log_dir = base / "claude_audio_hooks_queue" / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    _LOG_DIR.append(log_dir)
+    return log_dir
+
+
+def list_log_segments(log_file: Path) -> List[Path]:
+    """Return the rotated segments of a log, oldest first."""
+    prefix = log_file.name + "."
+    segments = []
+    try:
+        names = os.listdir(str(log_file.parent))
+    except OSError:
+        return []
+    for name in names:
+        if name.startswith(prefix) and name[len(prefix):].isdigit():
+            segments.append((int(name[len(prefix):]), log_file.parent / name))
+    return [path for _, path in sorted(segments)]
+
+
+def rotate_log(log_file: Path) -> None:
+    """Roll a log over to the next numbered segment and prune old ones.
+
+    The log is first moved to a name private to this process, then linked
+    to the first free segment number, so two hooks rotating at once never
+    overwrite each other's segment.
+    """
+    private = log_file.with_name(f"{log_file.name}.rotating-{os.getpid()}")
+    try:
+        os.rename(str(log_file), str(private))
+    except OSError:
+        # Another process rotated it first (or Windows has it open)
+        return
+    segments = list_log_segments(log_file)
+    next_index = int(segments[-1].name.rsplit(".", 1)[1]) + 1 if segments else 1
+    while True:
+        target = Path(f"{log_file}.{next_index}")
+        try:
+            os.link(str(private), str(target))
+        except FileExistsError:
+            next_index += 1
+            continue
+        except OSError:
+            # No hard links here: fall back to a plain rename
+            os.replace(str(private), str(target))
+            break
+        os.unlink(str(private))
+        break
+    segments = list_log_segments(log_file)
+    for old in segments[:-LOG_KEEP_SEGMENTS]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def write_log(name: str, text: str) -> None:
+    """Append lines to a log file with a single O_APPEND write.
+
+    Appends of this size are atomic, so concurrent hooks never interleave or
+    clobber each other's lines. The file is only touched again when it has
+    grown past its limit and needs rotating (or, for the history spool,
+    ingesting).
+    """
+    log_file = get_log_dir() / name
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    fd = os.open(str(log_file), flags, 0o644)
+    try:
+        os.write(fd, text.encode("utf-8"))
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+    if size > LOG_MAX_BYTES.get(name, DEFAULT_LOG_MAX_BYTES):
+        if name == HISTORY_SPOOL_NAME:
+            ingest_history()
+        else:
+            rotate_log(log_file)
+
+
+def _flush_at_exit() -> None:
+    """Make sure buffered records are written when the process exits."""
+    if not _LOG_AT_EXIT[0]:
+        _LOG_AT_EXIT[0] = True
+        atexit.register(flush_logs)
+
+
+def _buffer_record(record: tuple) -> None:
+    """Queue a record for flush_logs()."""
+    _LOG_RECORDS.append(record)
+    _flush_at_exit()
+    if len(_LOG_RECORDS) >= LOG_BUFFER_MAX_RECORDS and not _LOG_FLUSHER:
+        flush_logs()
+
+
+def append_log(name: str, line: str) -> None:
+    """Queue one preformatted line for a log file."""
+    _buffer_record((name, None, "", line, ()))
+
+
+def _flush_records() -> None:
+    """Format the buffered records and write each log's lines at once."""
+    records = _LOG_RECORDS[:]
+    del _LOG_RECORDS[:len(records)]
+    batches: Dict[str, List[str]] = {}
+    stamps: Dict[int, str] = {}
+    for name, when, prefix, message, args in records:
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = f"{message} {args!r}"
+        if when is not None:
+            second = int(when)
+            stamp = stamps.get(second)
+            if stamp is None:
+                stamp = stamps[second] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            message = f"{stamp} | {prefix}{message}"
+        batches.setdefault(name, []).append(message)
+    for name, lines in batches.items():
+        try:
+            write_log(name, "\n".join(lines) + "\n")
+        except OSError:
+            pass
+
+
+def flush_logs() -> None:
+    """Write every buffered log record and trigger history row.
+
+    Runs at exit, from the flusher thread and before the process forks.
+    """
+    lock = _LOG_FLUSHER[1] if _LOG_FLUSHER else None
+    if lock is not None:
+        lock.acquire()
+    try:
+        if _LOG_RECORDS:
+            _flush_records()
+        _flush_history()
+    finally:
+        if lock is not None:
+            lock.release()
+
+
+def start_log_flusher(interval: float = LOG_FLUSH_INTERVAL_SECONDS) -> None:
+    """Flush from a background thread, for the daemon and queue worker.
+
+    Long-lived processes also store history rows in the database directly
+    and pick up the rows one-shot hooks have spooled.
+    """
+    if _LOG_FLUSHER:
+        return
+    import threading
+
+    def _run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                flush_logs()
+            except Exception:
+                pass
+
+    _LOG_FLUSHER.extend([threading.Thread(target=_run, name="log-flusher", daemon=True),
+                         threading.Lock()])
+    _LOG_SETTINGS["direct_history"] = True
+    _flush_at_exit()
+    _LOG_FLUSHER[0].start()
+
+
+def configure_logging(settings: Dict[str, Any]) -> None:
+    """Apply the config's logging section (see compile_logging())."""
+    if not LOG_LEVEL_ENV:
+        _LOG_SETTINGS["level"] = LOG_LEVELS[settings["level"]]
+    _LOG_SETTINGS["sample"] = settings["sample"]
+
+
+def log_enabled(level: str) -> bool:
+    """Whether records at this level are kept; guards costly log arguments."""
+    return LOG_LEVELS[level] >= _LOG_SETTINGS["level"]
+
+
+def log_debug(message: str, *args: Any) -> None:
+    """Log a debug message; %-style args are only formatted if it is kept."""
+    if _LOG_SETTINGS["level"] > 10:
+        return
+    _buffer_record(("debug.log", time.time(), "DEBUG | ", message, args))
+
+
+def log_error(message: str, *args: Any) -> None:
+    """Log error message (kept unless logging is off)."""
+    if _LOG_SETTINGS["level"] > 40:
+        return
+    _buffer_record(("errors.log", time.time(), "ERROR | ", message, args))
+
+
+def _sample_hit(hook_type: str, every: int) -> bool:
+    """Keep one in every N trigger lines of a hook.
+
+    Each process starts its count at a random offset, so one-shot hooks
+    that log a single trigger are still sampled at the configured rate.
+    """
+    count = _SAMPLE_COUNTS.get(hook_type)
+    if count is None:
+        count = int.from_bytes(os.urandom(2), "little") % every
+    count += 1
+    _SAMPLE_COUNTS[hook_type] = count
+    return count % every == 0
+
+
+def log_trigger(hook_type: str, status: str, details: str = "") -> None:
+    """Log hook trigger with status.
+
+    Sampling thins out hook_triggers.log only; the history keeps every row.
+    """
+    latency_ms = (time.perf_counter() - _EVENT_START[0]) * 1000.0
+    _PROFILE_STATUS[0] = status
+    if _LOG_SETTINGS["level"] > 20:
+        return
+    log_start = time.perf_counter()
+    now = time.time()
+    every = _LOG_SETTINGS["sample"].get(hook_type)
+    if not every or _sample_hit(hook_type, every):
+        if details:
+            _buffer_record(("hook_triggers.log", now, "", "%s | %s | %s", (hook_type, status, details)))
+        else:
+            _buffer_record(("hook_triggers.log", now, "", "%s | %s", (hook_type, status)))
+    record_history(hook_type, status, details, latency_ms, now)
+    add_phase("log", log_start, time.perf_counter())
+
+# =============================================================================
+# TRIGGER HISTORY STORE
+# =============================================================================
+
+# Structured copy of every trigger for `diagnose.py --history`
+HISTORY_DB_NAME = "history.db"
+HISTORY_SCHEMA_VERSION = 1
+HISTORY_RETENTION_SECONDS = 30 * 24 * 3600
+# Old rows are pruned once every this many inserts
+HISTORY_PRUNE_INTERVAL = 1000
+# One-shot hooks append their rows here as JSON lines instead of opening
+# the database. The daemon and the queue worker ingest them, as does the
+# hook whose append takes the spool past its LOG_MAX_BYTES limit.
+HISTORY_SPOOL_NAME = "history.spool"
+
+# Start of the event being handled; latency is measured from here
+_EVENT_START = [time.perf_counter()]
+
+_HISTORY_CONN: List[Any] = []
+# Buffered rows: (ts, hook, status, latency_ms, details)
+_HISTORY_ROWS: List[tuple] = []
+
+
+def _history_connection():
+    """Open (once per process) the WAL-mode trigger history database."""
+    if _HISTORY_CONN:
+        return _HISTORY_CONN[0]
+    import sqlite3
+
+    # The flusher thread and the main thread share it under the flush lock
+    conn = sqlite3.connect(str(get_log_dir() / HISTORY_DB_NAME), timeout=1.0,
+                           check_same_thread=False)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != HISTORY_SCHEMA_VERSION:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS triggers (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                hook TEXT NOT NULL,
+                status TEXT NOT NULL,
+                latency_ms REAL,
+                details TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_triggers_ts ON triggers (ts);
+            CREATE INDEX IF NOT EXISTS idx_triggers_hook_ts ON triggers (hook, ts);
+            CREATE INDEX IF NOT EXISTS idx_triggers_status_ts ON triggers (status, ts);
+            """
+        )
+        conn.execute(f"PRAGMA user_version = {HISTORY_SCHEMA_VERSION}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _HISTORY_CONN.append(conn)
+    return conn
+
+
+def record_history(hook_type: str, status: str, details: str, latency_ms: float,
+                   ts: Optional[float] = None) -> None:
+    """Buffer a trigger for the history database; flush_logs() stores it."""
+    _HISTORY_ROWS.append((ts or time.time(), hook_type, status, round(latency_ms, 3), details or None))
+    _flush_at_exit()
+
+
+def _flush_history() -> None:
+    """Store buffered rows, or spool them when this is a one-shot hook."""
+    rows = _HISTORY_ROWS[:]
+    del _HISTORY_ROWS[:len(rows)]
+    if _LOG_SETTINGS["direct_history"]:
+        ingest_history(rows)
+    elif rows:
+        try:
+            write_log(HISTORY_SPOOL_NAME, "".join(
+                json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+        except OSError:
+            pass
+
+
+def _read_spool(path: Path) -> List[tuple]:
+    """Parse a claimed spool file; lines cut short by a crash are skipped."""
+    rows = []
+    try:
+        with open(str(path), encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(row, list) and len(row) == 5:
+                    rows.append(tuple(row))
+    except OSError:
+        pass
+    return rows
+
+
+def ingest_history(rows: List[tuple] = ()) -> int:
+    """Move spooled trigger rows (plus any given) into the history database.
+
+    Each spool file is renamed before it is read, so hooks appending in the
+    meantime start a fresh spool and no row is stored twice. Storage is best
+    effort: rows are dropped if the database cannot be written.
+    """
+    rows = list(rows)
+    spool = get_log_dir() / HISTORY_SPOOL_NAME
+    claimed = []
+    for path in list_log_segments(spool) + [spool]:
+        claim = path.with_name(f"{path.name}.{os.getpid()}.ingest")
+        try:
+            os.rename(str(path), str(claim))
+        except OSError:
+            continue
+        claimed.append(claim)
+        rows.extend(_read_spool(claim))
+
+    stored = 0
+    if rows:
+        try:
+            conn = _history_connection()
+            with conn:
+                before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM triggers").fetchone()[0]
+                conn.executemany(
+                    "INSERT INTO triggers (ts, hook, status, latency_ms, details) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if (before + len(rows)) // HISTORY_PRUNE_INTERVAL > before // HISTORY_PRUNE_INTERVAL:
+                    conn.execute(
+                        "DELETE FROM triggers WHERE ts < ?",
+                        (time.time() - HISTORY_RETENTION_SECONDS,),
+                    )
+            stored = len(rows)
+        except Exception as e:
+            # sqlite3 can be missing from minimal Python builds
+            log_debug("Could not record trigger history: %s", e)
+    for claim in claimed:
+        try:
+            claim.unlink()
+        except OSError:
+            pass
+    return stored
+
+# =============================================================================
+# PHASE PROFILING
+# =============================================================================
+
+# With CLAUDE_HOOKS_PROFILE=1 every invocation appends one compact record of
+# its phase timings to profile.log; `diagnose.py --profile` summarizes them.
+PROFILE = os.environ.get("CLAUDE_HOOKS_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_LOG_NAME = "profile.log"
+
+# Phase offsets are measured from here: module start for a one-shot hook,
+# the start of each event in the daemon
+_PROFILE_BASE = [time.perf_counter(), time.time()]
+_MODULE_START = _PROFILE_BASE[0]
+_PROFILE_PHASES: List[Any] = []
+_PROFILE_STATUS = [""]
+
+
+class _Phase:
+    """Context manager that records one timed phase."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "_Phase":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        add_phase(self.name, self.start, time.perf_counter())
+
+
+class _NoPhase:
+    """Stand-in used when profiling is off, so phases cost one call."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoPhase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def profile_phase(name: str):
+    """Time the enclosed block as a named phase when profiling is on."""
+    return _Phase(name) if PROFILE else _NO_PHASE
+
+
+def add_phase(name: str, start: float, end: float) -> None:
+    """Record a phase from two perf_counter() readings."""
+    if PROFILE:
+        _PROFILE_PHASES.append((name, start, end))
+
+
+def begin_profile() -> None:
+    """Start a new record; the daemon calls this for each event."""
+    _PROFILE_BASE[0] = time.perf_counter()
+    _PROFILE_BASE[1] = time.time()
+    del _PROFILE_PHASES[:]
+    _PROFILE_STATUS[0] = ""
+
+
+def flush_profile(hook_type: str) -> None:
+    """Append this invocation's phases to profile.log as one JSON line.
+
+    Offsets and durations are integer microseconds from the record's base
+    ("ts", wall clock). Phases nest: "play" contains "wsl_copy"/"popen".
+    """
+    if not PROFILE:
+        return
+    base = _PROFILE_BASE[0]
+    end = time.perf_counter()
+    record = {
+        "ts": round(_PROFILE_BASE[1], 6),
+        "pid": os.getpid(),
+        "hook": hook_type,
+        "status": _PROFILE_STATUS[0],
+        "total_us": int((end - base) * 1e6),
+        "phases": [
+            [name, int((start - base) * 1e6), int((stop - start) * 1e6)]
+            for name, start, stop in _PROFILE_PHASES
+        ],
+    }
+    try:
+        append_log(PROFILE_LOG_NAME, json.dumps(record, separators=(",", ":")))
+    except Exception as e:
+        log_debug("Could not write profile record: %s", e)
+    del _PROFILE_PHASES[:]
+
+
+if PROFILE:
+    # Interpreter start-up and imports happen before this module runs; a
+    # caller can pass its launch time (epoch seconds) to have them counted
+    try:
+        _started_ago = _PROFILE_BASE[1] - float(os.environ.get("CLAUDE_HOOKS_PROFILE_START", ""))
+    except ValueError:
+        _started_ago = -1.0
+    if 0 <= _started_ago < 60:
+        add_phase("startup", _PROFILE_BASE[0] - _started_ago, _PROFILE_BASE[0])
+        _PROFILE_BASE[0] -= _started_ago
+        _PROFILE_BASE[1] -= _started_ago
+
+# =============================================================================
+# PATH UTILITIES
+# =============================================================================
+
+def normalize_path(path_str: str) -> str:
+    """Convert various path formats to the platform's native format.
+
+    Handles:
+    - Git Bash/MSYS2: /c/Users/... -> C:/Users/...
+    - WSL2: /mnt/c/Users/... -> C:/Users/...
+    - Cygwin: /cygdrive/c/... -> C:/...
+    """
+    if os.name != "nt":
+        return path_str
+
+    path_str = path_str.strip()
+
+    log_debug("normalize_path input: %s", path_str)
+
+    # Handle WSL2 style paths: /mnt/c/... -> C:/...
+    if path_str.startswith("/mnt/") and len(path_str) >= 6:
+        drive_letter = path_str[5].upper()
+        if drive_letter.isalpha():
+            rest = path_str[6:] if len(path_str) > 6 else "/"
+            result = f"{drive_letter}:{rest}"
+            log_debug("normalize_path WSL2: %s -> %s", path_str, result)
+            return result
+
+    # Handle Cygwin style paths: /cygdrive/c/... -> C:/...
+    if path_str.startswith("/cygdrive/") and len(path_str) >= 11:
+        drive_letter = path_str[10].upper()
+        if drive_letter.isalpha():
+            rest = path_str[11:] if len(path_str) > 11 else "/"
+            result = f"{drive_letter}:{rest}"
+            log_debug("normalize_path Cygwin: %s -> %s", path_str, result)
+            return result
+
+    # Handle Git Bash/MSYS2 style paths: /d/... -> D:/...
+    if len(path_str) >= 2 and path_str[0] == '/' and path_str[1].isalpha():
+        drive_letter = path_str[1].upper()
+        if len(path_str) == 2:
+            result = f"{drive_letter}:/"
+        elif path_str[2] == '/':
+            result = f"{drive_letter}:{path_str[2:]}"
+        else:
+            # Not a drive path, return as-is
+            return path_str
+        log_debug("normalize_path Git Bash: %s -> %s", path_str, result)
+        return result
+
+    return path_str
+
+
+def escape_powershell_string(s: str) -> str:
+    """Escape a string for safe use in PowerShell double-quoted strings."""
+    # Escape backticks, double quotes, and dollar signs
+    s = s.replace('`', '``')
+    s = s.replace('"', '`"')
+    s = s.replace('$', '`$')
+    return s
+
+
+def get_safe_temp_dir() -> Path:
+    """Get a safe temporary directory that exists and is writable."""
+    candidates: List[Path] = []
+
+    if os.name == "nt":
+        # Windows: prefer TEMP, then TMP, then USERPROFILE/Temp, then fallback
+        for env_var in ["TEMP", "TMP"]:
+            val = os.environ.get(env_var)
+            if val:
+                candidates.append(Path(val))
+
+        userprofile = os.environ.get("USERPROFILE")
+        if userprofile:
+            candidates.append(Path(userprofile) / "AppData" / "Local" / "Temp")
+
+        # Windows fallback
+        windir = os.environ.get("WINDIR", "C:/Windows")
+        candidates.append(Path(windir) / "Temp")
+        candidates.append(Path("C:/Windows/Temp"))
+    else:
+        # Unix: prefer TMPDIR, then standard locations
+        tmpdir = os.environ.get("TMPDIR")
+        if tmpdir:
+            candidates.append(Path(tmpdir))
+        candidates.extend([
+            Path("/tmp"),
+            Path("/var/tmp"),
+            Path.home() / ".cache" / "claude_hooks_temp",
+        ])
+
+    # Find first existing and writable directory
+    for candidate in candidates:
+        try:
+            if candidate.exists() and os.access(str(candidate), os.W_OK):
+                log_debug("Using temp dir: %s", candidate)
+                return candidate
+        except Exception:
+            continue
+
+    # Last resort: create in home directory
+    fallback = Path.home() / ".cache" / "claude_hooks_temp"
+    fallback.mkdir(parents=True, exist_ok=True)
+    log_debug("Using fallback temp dir: %s", fallback)
+    return fallback
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+def get_project_dir() -> Path:
+    """Determine the project directory."""
+    script_dir = SCRIPT_DIR
+    log_debug("Script dir: %s", script_dir)
+
+    # Strategy 1: Read from .project_path file
+    project_path_file = PROJECT_PATH_FILE
+    if project_path_file.exists():
+        try:
+            recorded_path = project_path_file.read_text(encoding="utf-8").strip()
+            log_debug("Read .project_path: %s", recorded_path)
+            # Normalize path format for Windows compatibility
+            recorded_path = normalize_path(recorded_path)
+            recorded_path_obj = Path(recorded_path)
+            if recorded_path_obj.exists() and (recorded_path_obj / "config" / "user_preferences.json").exists():
+                log_debug("Using project dir from .project_path: %s", recorded_path_obj)
+                return recorded_path_obj
+            else:
+                log_debug("Project path invalid or config missing: %s", recorded_path_obj)
+        except Exception as e:
+            log_error("Failed to read .project_path: %s", e)
+
+    # Strategy 2: Check if we're in the project structure
+    candidate = script_dir.parent
+    if (candidate / "config" / "user_preferences.json").exists():
+        log_debug("Using parent dir as project dir: %s", candidate)
+        return candidate
+
+    # Strategy 3: Search common locations
+    home = Path.home()
+    common_locations = [
+        home / "claude-code-audio-hooks",
+        home / "projects" / "claude-code-audio-hooks",
+        home / "Documents" / "claude-code-audio-hooks",
+        home / "repos" / "claude-code-audio-hooks",
+    ]
+
+    for loc in common_locations:
+        if loc.exists() and (loc / "config" / "user_preferences.json").exists():
+            log_debug("Found project in common location: %s", loc)
+            return loc
+
+    # Fallback
+    log_debug("Using fallback project dir: %s", candidate)
+    return candidate
+
+
+# =============================================================================
+# ENVIRONMENT CACHE
+# =============================================================================
+
+# The hooks directory, which holds the hook_runner.py entry point, this
+# package and .project_path
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+HOOK_RUNNER = SCRIPT_DIR / "hook_runner.py"
+PROJECT_PATH_FILE = SCRIPT_DIR / ".project_path"
+
+# Resolved environment, stored next to .project_path so it can be found
+# before the queue directory is known (tests point it into their sandbox)
+ENV_CACHE_FILE = Path(os.environ.get("CLAUDE_HOOKS_ENV_CACHE") or SCRIPT_DIR / ".env_cache.json")
+ENV_CACHE_SCHEMA = 2
+
+# Environment variables that influence project/temp directory discovery
+ENV_CACHE_VARS = ("HOME", "USERPROFILE", "TMPDIR", "TEMP", "TMP", "WINDIR")
+
+def is_wsl() -> bool:
+    """Check if running in WSL."""
+    try:
+        with open("/proc/version", "r") as f:
+            content = f.read().lower()
+            return "microsoft" in content or "wsl" in content
+    except (FileNotFoundError, PermissionError):
+        return False
+
+
+def _stat_key(path: Path) -> Optional[List[int]]:
+    """Cheap identity of a file or directory: inode and mtime."""
+    try:
+        stat = os.stat(str(path))
+    except OSError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns]
+
+
+def _env_cache_validators(project_dir: str) -> Dict[str, Any]:
+    """Everything a cached environment depends on."""
+    return {
+        "script_dir": str(SCRIPT_DIR),
+        "project_path_file": _stat_key(PROJECT_PATH_FILE),
+        "project_dir": _stat_key(Path(project_dir)),
+        "env": {name: os.environ.get(name) for name in ENV_CACHE_VARS},
+    }
+
+
+def discover_environment() -> Dict[str, Any]:
+    """Probe the filesystem for project, temp directory and platform."""
+    project_dir = get_project_dir()
+    queue_dir = get_safe_temp_dir() / "claude_audio_hooks_queue"
+    queue_dir.mkdir(parents=True, exist_ok=True)
+
+    import platform
+    system = platform.system()
+    wsl = system == "Linux" and is_wsl()
+
+    return {
+        "schema": ENV_CACHE_SCHEMA,
+        "project_dir": str(project_dir),
+        "queue_dir": str(queue_dir),
+        "system": system,
+        "is_wsl": wsl,
+        "validators": _env_cache_validators(str(project_dir)),
+    }
+
+
+def load_environment() -> Dict[str, Any]:
+    """Return the resolved environment, rediscovering it only when stale.
+
+    A warm start costs one small JSON read plus three stat() calls: the
+    .project_path file, the project directory and the queue directory.
+    """
+    try:
+        env = json.loads(ENV_CACHE_FILE.read_text(encoding="utf-8"))
+        if (env.get("schema") == ENV_CACHE_SCHEMA
+                and env.get("validators") == _env_cache_validators(env["project_dir"])
+                and os.path.isdir(env["queue_dir"])):
+            return env
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    env = discover_environment()
+    tmp_file = ENV_CACHE_FILE.with_name(f"{ENV_CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text(json.dumps(env), encoding="utf-8")
+        os.replace(str(tmp_file), str(ENV_CACHE_FILE))
+    except OSError as e:
+        # The hooks directory may be read-only; just rediscover next time
+        log_debug("Could not write environment cache: %s", e)
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+    return env
+
+
+# Initialize paths
+with profile_phase("environment"):
+    ENVIRONMENT = load_environment()
+PROJECT_DIR = Path(ENVIRONMENT["project_dir"])
+AUDIO_DIR = PROJECT_DIR / "audio"
+CONFIG_FILE = PROJECT_DIR / "config" / "user_preferences.json"
+QUEUE_DIR = Path(ENVIRONMENT["queue_dir"])
+LOCK_FILE = QUEUE_DIR / "audio.lock"
+SYSTEM = ENVIRONMENT["system"]
+IS_WSL = ENVIRONMENT["is_wsl"]
+
+# Default audio files for each hook type
+DEFAULT_AUDIO_FILES = {
+    "notification": "notification-urgent.mp3",
+    "stop": "task-complete.mp3",
+    "pretooluse": "task-starting.mp3",
+    "posttooluse": "task-progress.mp3",
+    "userpromptsubmit": "prompt-received.mp3",
+    "subagent_stop": "subagent-complete.mp3",
+    "precompact": "notification-info.mp3",
+    "session_start": "session-start.mp3",
+    "session_end": "session-end.mp3",
+}
+
+# =============================================================================
+# CONFIGURATION FUNCTIONS
+# =============================================================================
+
+# Parsed config keyed by the file's (mtime, size), so repeated lookups within
+# one process - or across events in daemon mode - only re-parse on change.
+_CONFIG_CACHE: Dict[str, Any] = {"key": None, "config": {}}
+
+
+def load_config() -> Dict[str, Any]:
+    """Load configuration from user_preferences.json."""
+    try:
+        stat = CONFIG_FILE.stat()
+    except OSError:
+        log_debug("Config file not found: %s", CONFIG_FILE)
+        return {}
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _CONFIG_CACHE["key"] == key:
+        return _CONFIG_CACHE["config"]
+    try:
+        config = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+        log_debug("Loaded config from %s", CONFIG_FILE)
+        _CONFIG_CACHE["key"] = key
+        _CONFIG_CACHE["config"] = config
+        return config
+    except json.JSONDecodeError as e:
+        log_error("Invalid JSON in config file: %s", e)
+        return {}
+    except PermissionError as e:
+        log_error("Permission denied reading config: %s", e)
+        return {}
+    except OSError as e:
+        log_error("OS error reading config: %s", e)
+        return {}
+
+
+# =============================================================================
+# COMPILED CONFIG SNAPSHOT
+# =============================================================================
+
+SNAPSHOT_FILE = QUEUE_DIR / "config_snapshot.json"
+
+# Bump when the snapshot layout changes so old snapshots are rebuilt
+SNAPSHOT_SCHEMA = 13
+
+# Hooks that are enabled when the config does not mention them
+DEFAULT_ENABLED_HOOKS = {"notification", "stop", "subagent_stop"}
+
+# Older/example configs use short names for some hooks
+HOOK_ALIASES = {
+    "subagent": "subagent_stop",
+}
+
+DEFAULT_DEBOUNCE_MS = 500
+DEFAULT_MAX_QUEUE_SIZE = 5
+DEFAULT_PCM_CACHE_MAX_MB = 32
+DEFAULT_MIX_WINDOW_MS = 150
+DEFAULT_MIX_GAIN = 0.8
+DEFAULT_RATE_PER_MINUTE = 6
+DEFAULT_BURST_QUIET_MS = 2000
+DEFAULT_MAX_PLAYERS = 4
+# Machine-wide cap on sounds across all sessions
+DEFAULT_GLOBAL_PER_MINUTE = 30
+DEFAULT_GLOBAL_BURST = 6
+
+# Queue priority per hook: higher plays first and is evicted last. Hooks
+# not listed (and unknown hooks) get DEFAULT_HOOK_PRIORITY.
+DEFAULT_HOOK_PRIORITIES = {
+    "notification": 4,
+    "stop": 3,
+    "subagent_stop": 3,
+    "session_start": 2,
+    "session_end": 2,
+    "precompact": 2,
+    "userpromptsubmit": 2,
+    "pretooluse": 1,
+    "posttooluse": 1,
+}
+DEFAULT_HOOK_PRIORITY = 0
+
+# Loaded once per process; the daemon refreshes it before each event
+_SNAPSHOT: Dict[str, Any] = {"snapshot": None}
+
+
+def _config_source_key() -> Optional[List[Any]]:
+    """Identify the current config file contents by path, mtime and size."""
+    try:
+        stat = CONFIG_FILE.stat()
+    except OSError:
+        return None
+    return [str(CONFIG_FILE), str(AUDIO_DIR), stat.st_mtime_ns, stat.st_size]
+
+
+def normalize_enabled_hooks(raw: Any) -> Dict[str, bool]:
+    """Normalize ``enabled_hooks`` to a {hook_type: bool} mapping.
+
+    Accepts both the dict form used by default_preferences.json and the list
+    form used by the example_preferences_*.json files. Hooks the config does
+    not mention fall back to DEFAULT_ENABLED_HOOKS.
+    """
+    explicit: Dict[str, bool] = {}
+    if isinstance(raw, dict):
+        for name, value in raw.items():
+            if name.startswith("_"):
+                continue
+            explicit[HOOK_ALIASES.get(name, name)] = value is True
+    elif isinstance(raw, list):
+        # List form: listed hooks are on, everything else is off
+        listed = {HOOK_ALIASES.get(str(name), str(name)) for name in raw}
+        for name in DEFAULT_AUDIO_FILES:
+            explicit[name] = name in listed
+        for name in listed:
+            explicit[name] = True
+    elif raw is not None:
+        log_error("Ignoring enabled_hooks of unexpected type: %s", type(raw).__name__)
+
+    enabled = {name: name in DEFAULT_ENABLED_HOOKS for name in DEFAULT_AUDIO_FILES}
+    enabled.update(explicit)
+    return enabled
+
+
+def _resolve_audio_path(configured: Optional[str], default_file: str) -> Optional[str]:
+    """Resolve a configured audio path, falling back to the default asset."""
+    if configured:
+        full_path = AUDIO_DIR / configured
+        problem = asset_problem(full_path)
+        if problem is None:
+            return str(full_path)
+        log_error("Audio file %s: %s, using the default sound", problem, full_path)
+    default_path = AUDIO_DIR / "default" / default_file
+    if asset_problem(default_path) is None:
+        return str(default_path)
+    return None
+
+
+def _dir_mtime_ns(directory: Path) -> int:
+    """Return a directory's mtime in ns, or -1 if it does not exist."""
+    try:
+        return directory.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _snapshot_is_current(snapshot: Dict[str, Any], key: Optional[List[Any]]) -> bool:
+    """Check a loaded snapshot against the config file and audio directories."""
+    if snapshot.get("schema") != SNAPSHOT_SCHEMA or snapshot.get("key") != key:
+        return False
+    for directory, mtime_ns in snapshot.get("audio_dirs", {}).items():
+        if _dir_mtime_ns(Path(directory)) != mtime_ns:
+            return False
+    return True
+
+
+def _int_setting(settings: Dict[str, Any], name: str, default: int, minimum: int) -> int:
+    """Read an integer playback setting, rejecting invalid values."""
+    value = settings.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < minimum:
+        log_error("Invalid playback_settings.%s: %r, using %s", name, value, default)
+        return default
+    return int(value)
+
+
+def _float_setting(settings: Dict[str, Any], name: str, default: float,
+                   minimum: float, maximum: float) -> float:
+    """Read a numeric playback setting within [minimum, maximum]."""
+    value = settings.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not minimum <= value <= maximum:
+        log_error("Invalid playback_settings.%s: %r, using %s", name, value, default)
+        return default
+    return float(value)
+
+
+def compile_rate_limits(raw: Any) -> Dict[str, Dict[str, Any]]:
+    """Normalize ``playback_settings.rate_limits`` to {hook_type: bucket}."""
+    limits: Dict[str, Dict[str, Any]] = {}
+    if raw is None:
+        return limits
+    if not isinstance(raw, dict):
+        log_error("Ignoring rate_limits: expected an object")
+        return limits
+    for name, spec in raw.items():
+        if name.startswith("_"):
+            continue
+        if not isinstance(spec, dict):
+            log_error("Ignoring rate_limits.%s: expected an object", name)
+            continue
+        limits[HOOK_ALIASES.get(name, name)] = {
+            "per_minute": _float_setting(spec, "per_minute", DEFAULT_RATE_PER_MINUTE, 0.0, 60000.0),
+            "burst": _int_setting(spec, "burst", 1, 1),
+            "aggregate": spec.get("aggregate", False) is True,
+            "quiet_ms": _int_setting(spec, "quiet_ms", DEFAULT_BURST_QUIET_MS, 0),
+        }
+    return limits
+
+
+def compile_global_rate_limit(raw: Any) -> Optional[Dict[str, Any]]:
+    """Normalize ``playback_settings.global_rate_limit``.
+
+    The cap is opt-in: a missing key or ``false`` disables it, and ``{}``
+    uses the default burst and rate.
+    """
+    if raw is None or raw is False:
+        return None
+    if not isinstance(raw, dict):
+        log_error("Ignoring global_rate_limit: expected an object or false")
+        raw = {}
+    return {
+        "per_minute": _float_setting(raw, "per_minute", DEFAULT_GLOBAL_PER_MINUTE, 0.0, 60000.0),
+        "burst": _int_setting(raw, "burst", DEFAULT_GLOBAL_BURST, 1),
+    }
+
+
+def compile_priorities(raw: Any) -> Dict[str, int]:
+    """Merge ``playback_settings.priorities`` over DEFAULT_HOOK_PRIORITIES."""
+    priorities = dict(DEFAULT_HOOK_PRIORITIES)
+    if raw is None:
+        return priorities
+    if not isinstance(raw, dict):
+        log_error("Ignoring priorities: expected an object")
+        return priorities
+    for name, value in raw.items():
+        if name.startswith("_"):
+            continue
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            log_error("Ignoring priorities.%s: expected a non-negative integer", name)
+            continue
+        priorities[HOOK_ALIASES.get(name, name)] = value
+    return priorities
+
+
+def compile_logging(raw: Any) -> Dict[str, Any]:
+    """Validate the ``logging`` section: a level and per-hook sampling.
+
+    ``sample`` maps a hook to N, keeping one in N of its trigger lines.
+    """
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        log_error("Ignoring logging: expected an object")
+        raw = {}
+    level = raw.get("level", "info")
+    if not isinstance(level, str) or level.lower() not in LOG_LEVELS:
+        log_error("Ignoring logging.level: expected one of %s", ", ".join(LOG_LEVELS))
+        level = "info"
+    sample: Dict[str, int] = {}
+    raw_sample = raw.get("sample", {})
+    if not isinstance(raw_sample, dict):
+        log_error("Ignoring logging.sample: expected an object")
+        raw_sample = {}
+    for name, every in raw_sample.items():
+        if name.startswith("_"):
+            continue
+        if isinstance(every, bool) or not isinstance(every, int) or every < 1:
+            log_error("Ignoring logging.sample.%s: expected a positive integer", name)
+            continue
+        if every > 1:
+            sample[HOOK_ALIASES.get(name, name)] = every
+    return {"level": level.lower(), "sample": sample}
+
+
+RULE_OUTCOMES = ("success", "failure")
+
+
+def compile_rules(raw: Any) -> List[Dict[str, Any]]:
+    """Validate the ``rules`` list and resolve each rule's audio file.
+
+    A rule matches on any of hook, tool (exact name), tool_regex (full
+    match) and outcome ("success"/"failure"); omitted fields match
+    anything. Invalid rules are logged and skipped. The result stays plain
+    JSON so it can live in the snapshot; build_rule_table() turns it into
+    the dispatch table.
+    """
+    rules: List[Dict[str, Any]] = []
+    if raw is None:
+        return rules
+    if not isinstance(raw, list):
+        log_error("Ignoring rules: expected a list")
+        return rules
+    for index, rule in enumerate(raw):
+        if not isinstance(rule, dict):
+            log_error("Ignoring rules[%s]: expected an object", index)
+            continue
+        hook = rule.get("hook", "*")
+        tool = rule.get("tool", "*")
+        tool_regex = rule.get("tool_regex")
+        outcome = rule.get("outcome", "*")
+        audio = rule.get("audio")
+        if not isinstance(hook, str) or not isinstance(tool, str) or not isinstance(audio, str):
+            log_error("Ignoring rules[%s]: hook, tool and audio must be strings", index)
+            continue
+        if outcome != "*" and outcome not in RULE_OUTCOMES:
+            log_error("Ignoring rules[%s]: unknown outcome %r", index, outcome)
+            continue
+        groups = 0
+        if tool_regex is not None:
+            if tool != "*":
+                log_error("Ignoring rules[%s]: use either tool or tool_regex", index)
+                continue
+            try:
+                groups = re.compile(tool_regex).groups
+            except (re.error, TypeError) as e:
+                log_error("Ignoring rules[%s]: bad tool_regex: %s", index, e)
+                continue
+        audio_path = AUDIO_DIR / audio
+        problem = asset_problem(audio_path)
+        if problem is not None:
+            log_error("Ignoring rules[%s]: audio file %s: %s", index, problem, audio_path)
+            continue
+        rules.append({
+            "hook": HOOK_ALIASES.get(hook, hook),
+            "tool": tool,
+            "tool_regex": tool_regex,
+            "groups": groups,
+            "outcome": outcome,
+            "audio": str(audio_path),
+        })
+    return rules
+
+
+def compile_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Compile raw preferences into the flat form the hot path reads."""
+    refresh_audio_manifest()
+    audio_files = config.get("audio_files", {})
+    if not isinstance(audio_files, dict):
+        log_error("Ignoring audio_files: expected an object")
+        audio_files = {}
+    configured_audio: Dict[str, str] = {}
+    for name, value in audio_files.items():
+        if name.startswith("_") or not isinstance(value, str):
+            continue
+        canonical = HOOK_ALIASES.get(name, name)
+        # An explicit canonical entry wins over its alias
+        if canonical not in configured_audio or name == canonical:
+            configured_audio[canonical] = value
+
+    resolved_audio: Dict[str, Optional[str]] = {}
+    extra_hooks = [name for name in configured_audio if name not in DEFAULT_AUDIO_FILES]
+    for name in list(DEFAULT_AUDIO_FILES) + extra_hooks:
+        default_file = DEFAULT_AUDIO_FILES.get(name, "notification-info.mp3")
+        resolved_audio[name] = _resolve_audio_path(
+            configured_audio.get(name, f"default/{default_file}"), default_file
+        )
+
+    playback = config.get("playback_settings", {})
+    if not isinstance(playback, dict):
+        log_error("Ignoring playback_settings: expected an object")
+        playback = {}
+
+    # Adding or removing an asset changes its directory's mtime, which
+    # invalidates the resolved paths above
+    audio_dirs: Dict[str, int] = {}
+    for name, value in configured_audio.items():
+        directory = (AUDIO_DIR / value).parent
+        audio_dirs[str(directory)] = _dir_mtime_ns(directory)
+    audio_dirs[str(AUDIO_DIR / "default")] = _dir_mtime_ns(AUDIO_DIR / "default")
+    rules = compile_rules(config.get("rules"))
+    for rule in rules:
+        directory = Path(rule["audio"]).parent
+        audio_dirs[str(directory)] = _dir_mtime_ns(directory)
+
+    return {
+        "schema": SNAPSHOT_SCHEMA,
+        "key": _config_source_key(),
+        "audio_dirs": audio_dirs,
+        "enabled": normalize_enabled_hooks(config.get("enabled_hooks")),
+        "audio_files": resolved_audio,
+        "fallback_audio": _resolve_audio_path(None, "notification-info.mp3"),
+        "debounce_ms": _int_setting(playback, "debounce_ms", DEFAULT_DEBOUNCE_MS, 0),
+        "queue_enabled": playback.get("queue_enabled", True) is not False,
+        "max_queue_size": _int_setting(playback, "max_queue_size", DEFAULT_MAX_QUEUE_SIZE, 1),
+        "pcm_cache": playback.get("pcm_cache", True) is not False,
+        "pcm_cache_max_mb": _int_setting(playback, "pcm_cache_max_mb", DEFAULT_PCM_CACHE_MAX_MB, 1),
+        "mix_enabled": playback.get("mix_enabled", False) is True,
+        "mix_window_ms": _int_setting(playback, "mix_window_ms", DEFAULT_MIX_WINDOW_MS, 0),
+        "mix_gain": _float_setting(playback, "mix_gain", DEFAULT_MIX_GAIN, 0.0, 4.0),
+        "rate_limits": compile_rate_limits(playback.get("rate_limits")),
+        "max_players": _int_setting(playback, "max_players", DEFAULT_MAX_PLAYERS, 1),
+        "preempt": playback.get("preempt", True) is not False,
+        "detach": playback.get("detach", False) is True,
+        "priorities": compile_priorities(playback.get("priorities")),
+        "global_rate_limit": compile_global_rate_limit(playback.get("global_rate_limit")),
+        "rules": rules,
+        "logging": compile_logging(config.get("logging")),
+    }
+
+
+def _write_snapshot(snapshot: Dict[str, Any]) -> None:
+    """Atomically persist a compiled snapshot."""
+    tmp_file = SNAPSHOT_FILE.with_name(f"{SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(str(tmp_file), str(SNAPSHOT_FILE))
+    except OSError as e:
+        log_debug("Could not write config snapshot: %s", e)
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def get_config_snapshot() -> Dict[str, Any]:
+    """Return the compiled config, rebuilding it only when the JSON changed."""
+    snapshot = _SNAPSHOT["snapshot"]
+    if snapshot is not None:
+        return snapshot
+
+    key = _config_source_key()
+    try:
+        snapshot = json.loads(SNAPSHOT_FILE.read_text(encoding="utf-8"))
+        if not _snapshot_is_current(snapshot, key):
+            snapshot = None
+    except (OSError, ValueError, AttributeError):
+        snapshot = None
+
+    if snapshot is None:
+        log_debug("Compiling config snapshot")
+        snapshot = compile_config(load_config())
+        _write_snapshot(snapshot)
+
+    configure_logging(snapshot["logging"])
+    _SNAPSHOT["snapshot"] = snapshot
+    return snapshot
+
+
+def refresh_config_snapshot() -> None:
+    """Forget the in-process snapshot so the next lookup revalidates it."""
+    _SNAPSHOT["snapshot"] = None
+
+
+def is_hook_enabled(hook_type: str) -> bool:
+    """Check if a hook is enabled in configuration."""
+    result = get_config_snapshot()["enabled"].get(hook_type, False)
+    log_debug("Hook %s enabled: %s", hook_type, result)
+    return result
+
+
+def get_audio_file(hook_type: str, event: Optional[Dict[str, str]] = None) -> Optional[Path]:
+    """Get the audio file path for a hook type (and event payload, if any)."""
+    snapshot = get_config_snapshot()
+    if event and snapshot["rules"]:
+        ruled = match_rule(get_rule_table(), hook_type, event)
+        if ruled:
+            log_debug("Rule selected audio for %s/%s: %s", hook_type, event.get("tool_name"), ruled)
+            return Path(ruled)
+
+    audio_files = snapshot["audio_files"]
+    if hook_type in audio_files:
+        audio_path = audio_files[hook_type]
+    else:
+        audio_path = snapshot["fallback_audio"]
+
+    if audio_path:
+        log_debug("Audio file for %s: %s", hook_type, audio_path)
+        return Path(audio_path)
+
+    log_debug("No audio file found for %s", hook_type)
+    return None
+
+
+def get_debounce_ms() -> int:
+    """Get debounce time in milliseconds."""
+    return get_config_snapshot()["debounce_ms"]
+
+
+def is_queue_enabled() -> bool:
+    """Check if queued (non-overlapping) playback is enabled."""
+    return get_config_snapshot()["queue_enabled"]
+
+
+def get_rate_limit(hook_type: str) -> Optional[Dict[str, Any]]:
+    """Get a hook's token-bucket settings, or None if it is not rate limited."""
+    return get_config_snapshot()["rate_limits"].get(hook_type)
+
+
+def get_hook_priority(hook_type: str) -> int:
+    """Get a hook's queue priority (higher plays first)."""
+    return get_config_snapshot()["priorities"].get(hook_type, DEFAULT_HOOK_PRIORITY)
+
+# =============================================================================
+# SOUND RULES
+# =============================================================================
+
+_RULE_TABLE: Dict[str, Any] = {"key": None, "table": None}
+
+
+# Patterns are compiled on first use (re keeps them cached), not at import
+_BACKREFERENCE = r"\\[1-9]|\(\?P="
+
+
+def _combine_patterns(members: List[tuple]) -> List[tuple]:
+    """Merge (order, regex, groups, audio) members into as few patterns as possible.
+
+    Members become branches of one alternation, so a single fullmatch()
+    finds the earliest matching rule. Each entry is (pattern, owners),
+    where owners maps the match's lastindex to that rule's (order, audio).
+    Patterns with backreferences (or a failed merge) are kept on their own.
+    """
+    combined: List[tuple] = []
+    branches: List[str] = []
+    owners: List[Optional[tuple]] = [None]
+    for order, tool_regex, groups, audio in members:
+        if re.search(_BACKREFERENCE, tool_regex):
+            combined.append((re.compile(tool_regex), [(order, audio)] * (groups + 1)))
+            continue
+        branches.append(f"({tool_regex})")
+        owners.extend([(order, audio)] * (groups + 1))
+    if branches:
+        try:
+            combined.insert(0, (re.compile("|".join(branches)), owners))
+        except re.error:
+            # e.g. the same named group in two rules
+            for order, tool_regex, groups, audio in members:
+                if not re.search(_BACKREFERENCE, tool_regex):
+                    combined.append((re.compile(tool_regex), [(order, audio)] * (groups + 1)))
+    return combined
+
+
+def build_rule_table(rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compile rules into a dispatch table.
+
+    Rules without a regex go into a dict keyed by (hook, tool, outcome),
+    with "*" for wildcards, so they cost a fixed number of lookups. Regex
+    rules are merged into one alternation per (hook, outcome), compiled
+    the first time an event needs it, so a one-shot hook process only pays
+    for the patterns of its own hook. Each entry keeps its position so the
+    first matching rule in the config wins.
+    """
+    exact: Dict[tuple, tuple] = {}
+    grouped: Dict[tuple, List[tuple]] = {}
+    for order, rule in enumerate(rules):
+        if rule["tool_regex"] is None:
+            exact.setdefault((rule["hook"], rule["tool"], rule["outcome"]), (order, rule["audio"]))
+        else:
+            grouped.setdefault((rule["hook"], rule["outcome"]), []).append(
+                (order, rule["tool_regex"], rule["groups"], rule["audio"])
+            )
+    return {"exact": exact, "pending": grouped, "regex": {}}
+
+
+def _regex_patterns(table: Dict[str, Any], key: tuple) -> List[tuple]:
+    """Return the compiled patterns for a (hook, outcome) key."""
+    patterns = table["regex"].get(key)
+    if patterns is None:
+        members = table["pending"].get(key)
+        patterns = _combine_patterns(members) if members else []
+        table["regex"][key] = patterns
+    return patterns
+
+
+def get_rule_table() -> Dict[str, Any]:
+    """Return the dispatch table for the current snapshot, compiling it once."""
+    snapshot = get_config_snapshot()
+    key = snapshot["key"]
+    if _RULE_TABLE["table"] is None or _RULE_TABLE["key"] != key:
+        _RULE_TABLE["table"] = build_rule_table(snapshot["rules"])
+        _RULE_TABLE["key"] = key
+    return _RULE_TABLE["table"]
+
+
+def event_outcome(event: Dict[str, str]) -> str:
+    """Classify an event payload as "success" or "failure"."""
+    if event.get("hook_event_name", "").endswith("Failure") or event.get("error"):
+        return "failure"
+    return "success"
+
+
+def match_rule(table: Dict[str, Any], hook_type: str, event: Dict[str, str]) -> Optional[str]:
+    """Return the audio path of the first rule matching the event, if any."""
+    tool = event.get("tool_name", "")
+    outcome = event_outcome(event)
+    best: Optional[tuple] = None
+    exact = table["exact"]
+    for hook in (hook_type, "*"):
+        for tool_key in (tool, "*"):
+            for outcome_key in (outcome, "*"):
+                hit = exact.get((hook, tool_key, outcome_key))
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+    for hook in (hook_type, "*"):
+        for outcome_key in (outcome, "*"):
+            for pattern, owners in _regex_patterns(table, (hook, outcome_key)):
+                match = pattern.fullmatch(tool)
+                if match is not None:
+                    hit = owners[match.lastindex or 0]
+                    if best is None or hit[0] < best[0]:
+                        best = hit
+    return best[1] if best else None
+
+# =============================================================================
+# DEBOUNCE AND RATE LIMITING
+# =============================================================================
+
+# Fixed-layout state shared by every hook process through mmap:
+#   header  magic, layout version, generation counter
+#   slots   hook name (NUL padded), last-played time in epoch ms, and the
+#           hook's token bucket (tokens left, last refill in epoch ms)
+# Writers bump the generation to an odd value before touching a slot and to
+# the next even value afterwards, so readers can check a slot without the
+# lock and detect a concurrent update (a seqlock).
+DEBOUNCE_STATE_FILE = QUEUE_DIR / "debounce.state"
+DEBOUNCE_LOCK_FILE = QUEUE_DIR / "debounce.lock"
+DEBOUNCE_MAGIC = b"CAHD"
+DEBOUNCE_LAYOUT_VERSION = 2
+DEBOUNCE_HEADER = struct.Struct("<4sIQ")
+DEBOUNCE_GENERATION = struct.Struct("<Q")
+DEBOUNCE_GENERATION_OFFSET = 8
+DEBOUNCE_SLOT = struct.Struct("<24sqdq")
+DEBOUNCE_TIMESTAMP = struct.Struct("<q")
+DEBOUNCE_TIMESTAMP_OFFSET = 24
+DEBOUNCE_BUCKET = struct.Struct("<dq")
+DEBOUNCE_BUCKET_OFFSET = 32
+DEBOUNCE_SLOTS = 32
+DEBOUNCE_STATE_SIZE = DEBOUNCE_HEADER.size + DEBOUNCE_SLOT.size * DEBOUNCE_SLOTS
+
+# Each Claude Code session (the payload's session_id) keeps its debounce
+# slots and token buckets in its own state file and lock under SESSIONS_DIR,
+# so parallel sessions neither debounce nor wait on each other. Events
+# without a session_id use the shared file above, which also holds the
+# machine-wide bucket that caps the total sound rate across sessions.
+SESSIONS_DIR = QUEUE_DIR / "sessions"
+SESSION_ID_UNSAFE = r"[^A-Za-z0-9_.-]"
+SESSION_ID_MAX_LENGTH = 64
+# Session state files untouched for this long are removed
+SESSION_STATE_MAX_AGE_SECONDS = 24 * 3600
+# Session maps a long-lived process (the daemon) keeps open at once
+SESSION_MAPS_MAX = 32
+# Slot name of the machine-wide bucket; hook names never contain "*"
+GLOBAL_BUCKET_SLOT = "*global*"
+
+_DEBOUNCE_STATE: Dict[str, Any] = {"map": None, "slots": {}, "sessions": {}}
+
+# Session namespace of the event being handled (None: shared state)
+_SESSION: List[Optional[str]] = [None]
+
+
+def session_namespace(session_id: Any) -> Optional[str]:
+    """Turn a payload session_id into a safe file name, or None."""
+    if not isinstance(session_id, str):
+        return None
+    name = re.sub(SESSION_ID_UNSAFE, "_", session_id)[:SESSION_ID_MAX_LENGTH].strip(".")
+    return name or None
+
+
+def begin_session(hook_type: str, event: Optional[Dict[str, str]]) -> None:
+    """Scope debounce and rate-limit state to the event's session.
+
+    A new session sweeps up state left by sessions that never ended. An
+    ending session's state is removed right away, and its final sound uses
+    the shared state.
+    """
+    _SESSION[0] = session_namespace((event or {}).get("session_id"))
+    if hook_type == "session_start":
+        prune_sessions()
+    elif hook_type == "session_end" and _SESSION[0] is not None:
+        end_session(_SESSION[0])
+        _SESSION[0] = None
+
+
+def _debounce_files(namespace: Optional[str]) -> tuple:
+    """Return the (state file, lock file) pair for a namespace."""
+    if namespace is None:
+        return DEBOUNCE_STATE_FILE, DEBOUNCE_LOCK_FILE
+    return SESSIONS_DIR / f"{namespace}.state", SESSIONS_DIR / f"{namespace}.lock"
+
+
+def _debounce_state_is_valid(state) -> bool:
+    magic, version, _ = DEBOUNCE_HEADER.unpack_from(state, 0)
+    return magic == DEBOUNCE_MAGIC and version == DEBOUNCE_LAYOUT_VERSION
+
+
+def _map_debounce_file(state_file: Path, lock_file: Path):
+    """Map a debounce state file, creating or reinitializing it as needed."""
+    import mmap
+
+    fd = os.open(str(state_file), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size < DEBOUNCE_STATE_SIZE:
+            with FileLock(lock_file):
+                if os.fstat(fd).st_size < DEBOUNCE_STATE_SIZE:
+                    os.ftruncate(fd, DEBOUNCE_STATE_SIZE)
+        state = mmap.mmap(fd, DEBOUNCE_STATE_SIZE)
+    finally:
+        # The mapping keeps its own reference to the file
+        os.close(fd)
+
+    if not _debounce_state_is_valid(state):
+        with FileLock(lock_file):
+            if not _debounce_state_is_valid(state):
+                log_debug("Initializing debounce state file %s", state_file.name)
+                state[:] = bytes(DEBOUNCE_STATE_SIZE)
+                DEBOUNCE_HEADER.pack_into(state, 0, DEBOUNCE_MAGIC, DEBOUNCE_LAYOUT_VERSION, 0)
+    return state
+
+
+def _open_debounce_state(namespace: Optional[str] = None):
+    """Map a namespace's debounce state file, creating it on first use."""
+    if namespace is None:
+        state = _DEBOUNCE_STATE["map"]
+        if state is None:
+            state = _map_debounce_file(DEBOUNCE_STATE_FILE, DEBOUNCE_LOCK_FILE)
+            _DEBOUNCE_STATE["map"] = state
+        return state
+
+    sessions = _DEBOUNCE_STATE["sessions"]
+    state = sessions.pop(namespace, None)
+    if state is None:
+        SESSIONS_DIR.mkdir(exist_ok=True)
+        state = _map_debounce_file(*_debounce_files(namespace))
+        if len(sessions) >= SESSION_MAPS_MAX:
+            _close_session_state(next(iter(sessions)))
+    # Reinsert so the dict stays in least recently used order
+    sessions[namespace] = state
+    return state
+
+
+def _close_session_state(namespace: str) -> None:
+    """Unmap a session's state and forget its cached slot offsets."""
+    state = _DEBOUNCE_STATE["sessions"].pop(namespace, None)
+    if state is not None:
+        state.close()
+    slots = _DEBOUNCE_STATE["slots"]
+    for key in [key for key in slots if isinstance(key, tuple) and key[0] == namespace]:
+        del slots[key]
+
+
+def end_session(namespace: Optional[str]) -> None:
+    """Remove a finished session's state files."""
+    if namespace is None:
+        return
+    _close_session_state(namespace)
+    for path in _debounce_files(namespace):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    log_debug("Removed state of session %s", namespace)
+
+
+def prune_sessions(max_age: float = SESSION_STATE_MAX_AGE_SECONDS) -> int:
+    """Remove state left by sessions that ended without a session_end event."""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        listing = list(os.scandir(str(SESSIONS_DIR)))
+    except OSError:
+        return 0
+    for item in listing:
+        try:
+            if item.name.endswith(".state") and item.stat().st_mtime < cutoff:
+                end_session(item.name[:-len(".state")])
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _debounce_slot(state, hook_type: str, create: bool, namespace: Optional[str] = None) -> Optional[int]:
+    """Return the offset of a hook's slot; claiming a free one needs the lock."""
+    key = hook_type if namespace is None else (namespace, hook_type)
+    offset = _DEBOUNCE_STATE["slots"].get(key)
+    if offset is not None:
+        return offset
+    name = hook_type.encode("utf-8")[:DEBOUNCE_TIMESTAMP_OFFSET]
+    for index in range(DEBOUNCE_SLOTS):
+        offset = DEBOUNCE_HEADER.size + index * DEBOUNCE_SLOT.size
+        slot_name = DEBOUNCE_SLOT.unpack_from(state, offset)[0].rstrip(b"\0")
+        if slot_name == name:
+            _DEBOUNCE_STATE["slots"][key] = offset
+            return offset
+        if not slot_name:
+            if not create:
+                return None
+            DEBOUNCE_SLOT.pack_into(state, offset, name, 0, 0.0, 0)
+            _DEBOUNCE_STATE["slots"][key] = offset
+            return offset
+    return None
+
+
+def _generation(state) -> int:
+    return DEBOUNCE_GENERATION.unpack_from(state, DEBOUNCE_GENERATION_OFFSET)[0]
+
+
+def _write_slot_field(state, field: struct.Struct, offset: int, *values: Any) -> None:
+    """Write part of a slot (lock held), bracketed by generation bumps."""
+    current = _generation(state)
+    # An odd generation here means a writer died mid-update
+    base = current + current % 2
+    DEBOUNCE_GENERATION.pack_into(state, DEBOUNCE_GENERATION_OFFSET, base + 1)
+    field.pack_into(state, offset, *values)
+    DEBOUNCE_GENERATION.pack_into(state, DEBOUNCE_GENERATION_OFFSET, base + 2)
+
+
+def _read_slot_field(state, name: str, field: struct.Struct, field_offset: int,
+                     namespace: Optional[str] = None) -> tuple:
+    """Read (generation, field values) of a slot without the lock.
+
+    The values are None if the slot does not exist yet; (None, None) means
+    a writer kept the state busy.
+    """
+    for _ in range(3):
+        before = _generation(state)
+        if before % 2:
+            continue
+        offset = _debounce_slot(state, name, create=False, namespace=namespace)
+        values = None
+        if offset is not None:
+            values = field.unpack_from(state, offset + field_offset)
+        if _generation(state) == before:
+            return before, values
+    return None, None
+
+
+def _read_debounce_slot(state, hook_type: str, namespace: Optional[str] = None) -> tuple:
+    """Read (generation, last_played_ms) without the lock.
+
+    Returns (None, None) if a writer kept the state busy.
+    """
+    generation, values = _read_slot_field(state, hook_type, DEBOUNCE_TIMESTAMP,
+                                          DEBOUNCE_TIMESTAMP_OFFSET, namespace)
+    return generation, values[0] if values else None
+
+
+def should_debounce(hook_type: str) -> bool:
+    """Check if we should skip this notification due to debounce.
+
+    A debounced event costs one lock-free read of the mapped state. An
+    event that will play takes the lock only to compare-and-swap its slot,
+    so two hooks firing together cannot both play. Each session has its
+    own state, so sessions never debounce each other.
+    """
+    debounce_ms = get_debounce_ms()
+    now_ms = int(time.time() * 1000)
+    namespace = _SESSION[0]
+
+    try:
+        state = _open_debounce_state(namespace)
+        generation, last_ms = _read_debounce_slot(state, hook_type, namespace)
+        if last_ms is not None and 0 <= now_ms - last_ms < debounce_ms:
+            log_debug("Debouncing %s: %sms < %sms", hook_type, now_ms - last_ms, debounce_ms)
+            return True
+
+        with FileLock(_debounce_files(namespace)[1]):
+            now_ms = int(time.time() * 1000)
+            current = _generation(state)
+            offset = _debounce_slot(state, hook_type, create=True, namespace=namespace)
+            if offset is None:
+                log_error("Debounce state has no free slot for %s", hook_type)
+                return False
+            if current != generation:
+                # Another hook wrote since our read; compare again
+                last_ms = DEBOUNCE_TIMESTAMP.unpack_from(state, offset + DEBOUNCE_TIMESTAMP_OFFSET)[0]
+                if 0 <= now_ms - last_ms < debounce_ms:
+                    log_debug("Debouncing %s: lost race to a concurrent event", hook_type)
+                    return True
+            _write_slot_field(state, DEBOUNCE_TIMESTAMP, offset + DEBOUNCE_TIMESTAMP_OFFSET, now_ms)
+    except (OSError, ValueError, TimeoutError) as e:
+        log_error("Debounce state unavailable: %s", e)
+
+    return False
+
+
+def _refill(tokens: float, refill_ms: int, now_ms: int, per_minute: float, burst: int) -> float:
+    """Tokens in a bucket at now_ms, given its last stored state."""
+    if refill_ms <= 0 or now_ms < refill_ms:
+        # New bucket, or the clock went backwards
+        return float(burst)
+    return min(float(burst), tokens + (now_ms - refill_ms) * per_minute / 60000.0)
+
+
+def _take_token(name: str, per_minute: float, burst: int, namespace: Optional[str]) -> tuple:
+    """Take a token from a bucket slot under its state's lock.
+
+    Returns (allowed, tokens left). Raises OSError/ValueError/TimeoutError
+    if the state is unavailable, or ValueError if it has no free slot.
+    """
+    state = _open_debounce_state(namespace)
+    with FileLock(_debounce_files(namespace)[1]):
+        now_ms = int(time.time() * 1000)
+        offset = _debounce_slot(state, name, create=True, namespace=namespace)
+        if offset is None:
+            raise ValueError(f"no free slot for {name}")
+        tokens, refill_ms = DEBOUNCE_BUCKET.unpack_from(state, offset + DEBOUNCE_BUCKET_OFFSET)
+        tokens = _refill(tokens, refill_ms, now_ms, per_minute, burst)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        _write_slot_field(state, DEBOUNCE_BUCKET, offset + DEBOUNCE_BUCKET_OFFSET, tokens, now_ms)
+    return allowed, tokens
+
+
+def take_rate_token(hook_type: str, per_minute: float, burst: int) -> bool:
+    """Take a token from a hook's bucket; False means the event is over its limit.
+
+    A bucket starts with burst tokens and refills at per_minute tokens per
+    minute, so short bursts play and sustained floods are thinned out.
+    Buckets are kept per session.
+    """
+    try:
+        allowed, tokens = _take_token(hook_type, per_minute, burst, _SESSION[0])
+    except (OSError, ValueError, TimeoutError) as e:
+        log_error("Rate limit state unavailable: %s", e)
+        return True
+
+    if not allowed:
+        log_debug("Rate limiting %s: %.2f tokens left", hook_type, tokens)
+    return allowed
+
+
+def take_global_token(per_minute: float, burst: int) -> bool:
+    """Take a token from the machine-wide bucket shared by all sessions.
+
+    An empty bucket is detected with a lock-free read, so the shared lock
+    is only taken by events that will probably play. That is at most
+    burst plus per_minute a minute, however many sessions are running.
+    """
+    try:
+        state = _open_debounce_state()
+        _, values = _read_slot_field(state, GLOBAL_BUCKET_SLOT, DEBOUNCE_BUCKET, DEBOUNCE_BUCKET_OFFSET)
+        if values is not None:
+            tokens = _refill(values[0], values[1], int(time.time() * 1000), per_minute, burst)
+            if tokens < 1.0:
+                log_debug("Machine-wide sound rate reached: %.2f tokens left", tokens)
+                return False
+        allowed, tokens = _take_token(GLOBAL_BUCKET_SLOT, per_minute, burst, None)
+    except (OSError, ValueError, TimeoutError) as e:
+        log_error("Global rate limit state unavailable: %s", e)
+        return True
+
+    if not allowed:
+        log_debug("Machine-wide sound rate reached: %.2f tokens left", tokens)
+    return allowed
+
+
+def apply_rate_limit(hook_type: str, audio_file: Path) -> Optional[str]:
+    """Return the trigger status when a hook is over its rate limit, else None.
+
+    With aggregation on (and the queue enabled) a suppressed event is folded
+    into one summary sound that plays when the burst has been quiet for
+    quiet_ms. An event within its hook's limit can still be THROTTLED by
+    the machine-wide global_rate_limit.
+    """
+    limit = get_rate_limit(hook_type)
+    if limit is None or take_rate_token(hook_type, limit["per_minute"], limit["burst"]):
+        arbiter = get_config_snapshot()["global_rate_limit"]
+        if arbiter is None or take_global_token(arbiter["per_minute"], arbiter["burst"]):
+            return None
+        return "THROTTLED"
+    if limit["aggregate"] and is_queue_enabled():
+        try:
+            return enqueue_summary(hook_type, audio_file, limit["quiet_ms"])
+        except OSError as e:
+            log_error("Playback queue unavailable for burst summary: %s", e)
+    return "RATE_LIMITED"
+
+# =============================================================================
+# MP3 DURATION PARSING
+# =============================================================================
+
+# Per-file facts (duration, content hash) keyed by path, validated by size/mtime
+AUDIO_INFO_CACHE_FILE = QUEUE_DIR / "audio_info.json"
+
+# Bitrates in kbps by (MPEG-1?, layer) and the header's 4-bit index
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates by the header's 2-bit version field (MPEG 2.5, -, 2, 1)
+_MP3_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+# Files larger than this are estimated from the bitrate instead of walked
+MP3_WALK_LIMIT_BYTES = 4 * 1024 * 1024
+
+_AUDIO_INFO_CACHE: Dict[str, Any] = {"entries": None, "dirty": False}
+
+
+def _parse_mp3_frame_header(data: bytes, offset: int) -> Optional[Dict[str, Any]]:
+    """Decode the 4-byte MPEG audio frame header at offset, if valid."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    mono = (b3 >> 6) & 0x03 == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = (samples // 8) * bitrate // sample_rate + padding
+
+    return {
+        "mpeg1": mpeg1,
+        "mono": mono,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def _skip_id3v2(data: bytes) -> int:
+    """Return the offset of the first byte after an ID3v2 tag, if present."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _find_first_frame(data: bytes, start: int) -> Optional[int]:
+    """Find the first frame header that is followed by another valid frame."""
+    offset = data.find(b"\xff", start)
+    while offset != -1 and offset + 4 <= len(data):
+        header = _parse_mp3_frame_header(data, offset)
+        if header:
+            following = offset + header["length"]
+            if following + 4 > len(data) or _parse_mp3_frame_header(data, following):
+                return offset
+        offset = data.find(b"\xff", offset + 1)
+    return None
+
+
+def parse_mp3_duration(data: bytes) -> Optional[float]:
+    """Compute the playing time of an MP3 from its frame headers.
+
+    Uses the frame count from a Xing/Info or VBRI header when present;
+    otherwise walks every frame (or, for very large files, estimates from
+    the first frame's bitrate). Returns None if no MPEG audio is found.
+    """
+    first = _find_first_frame(data, _skip_id3v2(data))
+    if first is None:
+        return None
+    header = _parse_mp3_frame_header(data, first)
+
+    # Xing/Info tag sits after the side information of the first frame
+    if header["mpeg1"]:
+        side_info = 17 if header["mono"] else 32
+    else:
+        side_info = 9 if header["mono"] else 17
+    xing = first + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing + 4:xing + 8], "big")
+        if flags & 0x01:
+            frames = int.from_bytes(data[xing + 8:xing + 12], "big")
+            return frames * header["samples"] / header["sample_rate"]
+
+    vbri = first + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames = int.from_bytes(data[vbri + 14:vbri + 18], "big")
+        return frames * header["samples"] / header["sample_rate"]
+
+    audio_end = len(data) - (128 if data[-128:-125] == b"TAG" else 0)
+    if len(data) > MP3_WALK_LIMIT_BYTES:
+        return (audio_end - first) * 8 / header["bitrate"]
+
+    duration = 0.0
+    offset = first
+    while offset < audio_end:
+        frame = _parse_mp3_frame_header(data, offset)
+        if not frame or frame["length"] <= 0:
+            break
+        duration += frame["samples"] / frame["sample_rate"]
+        offset += frame["length"]
+    return duration
+
+
+def _load_audio_info_cache() -> Dict[str, Any]:
+    if _AUDIO_INFO_CACHE["entries"] is None:
+        try:
+            entries = json.loads(AUDIO_INFO_CACHE_FILE.read_text(encoding="utf-8"))
+            _AUDIO_INFO_CACHE["entries"] = entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            _AUDIO_INFO_CACHE["entries"] = {}
+    return _AUDIO_INFO_CACHE["entries"]
+
+
+def _save_audio_info_cache() -> None:
+    if not _AUDIO_INFO_CACHE["dirty"]:
+        return
+    tmp_file = AUDIO_INFO_CACHE_FILE.with_name(f"{AUDIO_INFO_CACHE_FILE.name}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text(json.dumps(_AUDIO_INFO_CACHE["entries"]), encoding="utf-8")
+        os.replace(str(tmp_file), str(AUDIO_INFO_CACHE_FILE))
+        _AUDIO_INFO_CACHE["dirty"] = False
+    except OSError as e:
+        log_debug("Could not write audio info cache: %s", e)
+
+
+def _audio_info(audio_file: Path) -> Optional[Dict[str, Any]]:
+    """Return the cached info entry for a file, resetting it if the file changed.
+
+    Assets under AUDIO_DIR come straight from the audio manifest; other
+    files (PCM cache entries, mixes) use audio_info.json.
+    """
+    try:
+        stat = audio_file.stat()
+    except OSError:
+        return None
+    asset = get_audio_manifest()["assets"].get(os.path.normpath(str(audio_file)))
+    if asset is not None and asset["size"] == stat.st_size and asset["mtime_ns"] == stat.st_mtime_ns:
+        return asset
+    entries = _load_audio_info_cache()
+    key = str(audio_file)
+    info = entries.get(key)
+    if not isinstance(info, dict) or info.get("size") != stat.st_size \
+            or info.get("mtime_ns") != stat.st_mtime_ns:
+        info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        entries[key] = info
+    return info
+
+
+def _decode_duration(audio_file: Path, codec: str, data: Optional[bytes] = None) -> Optional[float]:
+    """Work out an MP3 or WAV clip's length in seconds; None if unknown."""
+    duration = None
+    if codec == "mp3":
+        try:
+            duration = parse_mp3_duration(audio_file.read_bytes() if data is None else data)
+        except (OSError, IndexError, ZeroDivisionError) as e:
+            log_debug("Could not parse %s: %s", audio_file, e)
+    elif codec == "wav":
+        import wave
+
+        try:
+            with wave.open(str(audio_file), "rb") as wav:
+                duration = wav.getnframes() / wav.getframerate()
+        except (OSError, EOFError, wave.Error, ZeroDivisionError) as e:
+            log_debug("Could not parse %s: %s", audio_file, e)
+    return None if duration is None else round(duration, 3)
+
+
+def get_audio_duration(audio_file: Path) -> Optional[float]:
+    """Return an audio file's duration in seconds (cached per file)."""
+    info = _audio_info(audio_file)
+    if info is None:
+        return None
+    if "duration" in info:
+        return info["duration"]
+
+    duration = _decode_duration(audio_file, audio_file.suffix.lower().lstrip("."))
+    log_debug("Duration of %s: %ss", audio_file.name, duration)
+
+    info["duration"] = duration
+    _AUDIO_INFO_CACHE["dirty"] = True
+    _save_audio_info_cache()
+    return duration
+
+
+def get_content_hash(audio_file: Path) -> Optional[str]:
+    """Return the SHA-1 of a file's contents (cached per file)."""
+    info = _audio_info(audio_file)
+    if info is None:
+        return None
+    if info.get("sha1"):
+        return info["sha1"]
+
+    import hashlib
+
+    try:
+        digest = hashlib.sha1(audio_file.read_bytes()).hexdigest()
+    except OSError as e:
+        log_debug("Could not hash %s: %s", audio_file, e)
+        return None
+    info["sha1"] = digest
+    _AUDIO_INFO_CACHE["dirty"] = True
+    _save_audio_info_cache()
+    return digest
+
+
+def playback_hold_ms(audio_file: Path, default_seconds: float) -> int:
+    """How long a fire-and-forget player (PowerShell) should stay alive."""
+    duration = get_audio_duration(audio_file)
+    if duration is None:
+        return int(default_seconds * 1000)
+    # Small tail so the end of the clip is not cut off
+    return int(duration * 1000) + 150
+
+# =============================================================================
+# AUDIO MANIFEST
+# =============================================================================
+
+# Every asset under AUDIO_DIR with its size, mtime, hash, codec and length,
+# from one scan of the tree. Directories whose mtime has not changed are
+# taken from the previous scan without listing them again.
+AUDIO_MANIFEST_FILE = QUEUE_DIR / "audio_manifest.json"
+AUDIO_MANIFEST_SCHEMA = 1
+
+# Leading bytes that identify each container; MP3 is recognised separately
+_AUDIO_MAGIC = ((b"RIFF", "wav"), (b"OggS", "ogg"), (b"fLaC", "flac"))
+
+_AUDIO_MANIFEST: Dict[str, Any] = {"manifest": None}
+
+
+def sniff_codec(data: bytes) -> Optional[str]:
+    """Identify an audio file's format from its first bytes."""
+    for magic, codec in _AUDIO_MAGIC:
+        if data.startswith(magic):
+            return None if codec == "wav" and data[8:12] != b"WAVE" else codec
+    if data.startswith(b"ID3") or (len(data) > 1 and data[0] == 0xFF and (data[1] & 0xE0) == 0xE0):
+        return "mp3"
+    return None
+
+
+def _probe_asset(path: str, stat: os.stat_result) -> Dict[str, Any]:
+    """Hash and decode one asset; problem says why it cannot be played."""
+    import hashlib
+
+    entry: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                             "sha1": None, "codec": None, "duration": None}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        entry["problem"] = f"unreadable ({e.strerror})"
+        return entry
+    entry["sha1"] = hashlib.sha1(data).hexdigest()
+    codec = sniff_codec(data)
+    entry["codec"] = codec
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if not data:
+        entry["problem"] = "empty file"
+    elif codec is None:
+        entry["problem"] = "not a recognised audio format"
+    elif codec != extension:
+        entry["problem"] = f"contains {codec} data but is named .{extension}"
+    else:
+        entry["duration"] = _decode_duration(Path(path), codec, data)
+        if codec in ("mp3", "wav") and not entry["duration"]:
+            entry["problem"] = "no playable audio frames"
+    return entry
+
+
+def _audio_root() -> str:
+    """AUDIO_DIR in the normalized form the manifest is keyed by."""
+    return os.path.normpath(str(AUDIO_DIR))
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"schema": AUDIO_MANIFEST_SCHEMA, "root": _audio_root(), "dirs": {}, "assets": {}}
+
+
+def _load_audio_manifest() -> Dict[str, Any]:
+    """Read the manifest file; an unusable one is replaced by an empty manifest."""
+    try:
+        manifest = json.loads(AUDIO_MANIFEST_FILE.read_text(encoding="utf-8"))
+        if manifest.get("schema") == AUDIO_MANIFEST_SCHEMA and manifest.get("root") == _audio_root():
+            return manifest
+    except (OSError, ValueError, AttributeError):
+        pass
+    return _empty_manifest()
+
+
+def refresh_audio_manifest() -> Dict[str, Any]:
+    """Bring the manifest up to date with the audio tree and return it.
+
+    Costs one stat per directory when nothing changed. A directory whose
+    mtime moved is listed again, and only files whose size or mtime changed
+    are hashed and decoded. Editing a file in place does not touch its
+    directory's mtime, so such an edit is picked up when a file is added,
+    removed or renamed next to it.
+    """
+    old = _AUDIO_MANIFEST["manifest"] or _load_audio_manifest()
+    manifest = _empty_manifest()
+    changed = False
+    pending = [_audio_root()]
+    while pending:
+        directory = pending.pop()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            changed = changed or directory in old["dirs"]
+            continue
+        known = old["dirs"].get(directory)
+        if known and known["mtime_ns"] == mtime_ns:
+            for name in known["files"]:
+                path = os.path.join(directory, name)
+                if path in old["assets"]:
+                    manifest["assets"][path] = old["assets"][path]
+            manifest["dirs"][directory] = known
+            pending.extend(os.path.join(directory, name) for name in known["subdirs"])
+            continue
+
+        changed = True
+        record = {"mtime_ns": mtime_ns, "subdirs": [], "files": []}
+        try:
+            listing = sorted(os.scandir(directory), key=lambda item: item.name)
+        except OSError as e:
+            log_debug("Could not list %s: %s", directory, e)
+            listing = []
+        for item in listing:
+            if item.name.startswith("."):
+                continue
+            try:
+                if item.is_dir():
+                    record["subdirs"].append(item.name)
+                    pending.append(item.path)
+                    continue
+                stat = item.stat()
+            except OSError:
+                continue
+            record["files"].append(item.name)
+            previous = old["assets"].get(item.path)
+            if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                manifest["assets"][item.path] = previous
+            else:
+                manifest["assets"][item.path] = _probe_asset(item.path, stat)
+        manifest["dirs"][directory] = record
+
+    if changed or set(manifest["dirs"]) != set(old["dirs"]):
+        log_debug("Audio manifest refreshed: %s assets", len(manifest["assets"]))
+        tmp_file = AUDIO_MANIFEST_FILE.with_name(f"{AUDIO_MANIFEST_FILE.name}.{os.getpid()}.tmp")
+        try:
+            tmp_file.write_text(json.dumps(manifest), encoding="utf-8")
+            os.replace(str(tmp_file), str(AUDIO_MANIFEST_FILE))
+        except OSError as e:
+            log_debug("Could not write audio manifest: %s", e)
+    _AUDIO_MANIFEST["manifest"] = manifest
+    return manifest
+
+
+def get_audio_manifest() -> Dict[str, Any]:
+    """Return this process's manifest, scanning the tree on first use."""
+    return _AUDIO_MANIFEST["manifest"] or refresh_audio_manifest()
+
+
+def asset_problem(audio_file: Path) -> Optional[str]:
+    """Say why an audio file cannot be played, or None if it looks fine.
+
+    Files under AUDIO_DIR are answered from the manifest; anything else
+    only gets an existence check.
+    """
+    path = os.path.normpath(str(audio_file))
+    if not path.startswith(os.path.join(_audio_root(), "")):
+        return None if os.path.isfile(path) else "not found"
+    asset = get_audio_manifest()["assets"].get(path)
+    if asset is None:
+        return "not found"
+    return asset.get("problem")
+
+
+def audio_manifest_problems(manifest: Dict[str, Any]) -> List[Dict[str, str]]:
+    """List broken assets plus default assets that are missing."""
+    problems = [{"path": path, "problem": asset["problem"]}
+                for path, asset in sorted(manifest["assets"].items()) if asset.get("problem")]
+    for default_file in sorted(set(DEFAULT_AUDIO_FILES.values())):
+        path = os.path.join(_audio_root(), "default", default_file)
+        if path not in manifest["assets"]:
+            problems.append({"path": path, "problem": "missing"})
+    return problems
+
+
+def print_audio_manifest() -> int:
+    """Refresh the manifest and print it with its problems as JSON."""
+    manifest = refresh_audio_manifest()
+    print(json.dumps({
+        "root": manifest["root"],
+        "assets": manifest["assets"],
+        "problems": audio_manifest_problems(manifest),
+    }, indent=2))
+    return 0
+
+# =============================================================================
+# AUDIO PLAYER REGISTRY
+# =============================================================================
+
+PLAYER_REGISTRY_FILE = QUEUE_DIR / "players.json"
+PLAYER_REGISTRY_SCHEMA = 3
+
+# Known Linux backends in order of preference. "formats" lists the file
+# types the player can open itself ("*" for anything ffmpeg decodes;
+# mpg123 only decodes MPEG audio, paplay/aplay only handle PCM containers
+# such as WAV); "playlist" marks players that play several files given on
+# one command line back to back; "probe" is a harmless invocation used to
+# measure startup latency.
+LINUX_PLAYER_SPECS = [
+    {"name": "mpg123", "args": ["-q"], "formats": ["mp3"], "playlist": True, "probe": ["--version"]},
+    {"name": "ffplay", "args": ["-nodisp", "-autoexit", "-hide_banner", "-loglevel", "quiet"],
+     "formats": ["*"], "playlist": False, "probe": ["-version"]},
+    {"name": "paplay", "args": [], "formats": ["wav", "ogg", "flac", "aiff"], "playlist": False,
+     "probe": ["--version"]},
+    {"name": "aplay", "args": [], "formats": ["wav"], "playlist": True, "probe": ["--version"]},
+]
+
+# Tools that can decode an MP3 into a WAV file, in order of preference.
+# "{src}" and "{dst}" are replaced with the input and output paths.
+MP3_DECODER_SPECS = [
+    {"name": "mpg123", "args": ["-q", "-w", "{dst}", "{src}"]},
+    {"name": "ffmpeg", "args": ["-nostdin", "-loglevel", "quiet", "-y", "-i", "{src}", "{dst}"]},
+]
+
+PLAYER_PROBE_TIMEOUT = 2.0
+
+_PLAYER_REGISTRY: Dict[str, Any] = {"registry": None}
+
+
+def probe_players() -> Dict[str, Any]:
+    """Find installed Linux players and measure how quickly each starts."""
+    import shutil
+
+    players = []
+    for rank, spec in enumerate(LINUX_PLAYER_SPECS):
+        path = shutil.which(spec["name"])
+        if not path:
+            continue
+        latency_ms = None
+        try:
+            started = time.perf_counter()
+            subprocess.run(
+                [path] + spec["probe"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=PLAYER_PROBE_TIMEOUT,
+            )
+            latency_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        except (OSError, subprocess.SubprocessError) as e:
+            log_debug("Probe of %s failed: %s", spec["name"], e)
+        stat_key = _stat_key(Path(path))
+        players.append({
+            "name": spec["name"],
+            "path": path,
+            "mtime_ns": stat_key[1] if stat_key else None,
+            "args": spec["args"],
+            "formats": spec["formats"],
+            "playlist": spec["playlist"],
+            "latency_ms": latency_ms,
+            "rank": rank,
+        })
+        log_debug("Found player %s at %s (startup %s ms)", spec["name"], path, latency_ms)
+
+    decoders = []
+    for spec in MP3_DECODER_SPECS:
+        path = shutil.which(spec["name"])
+        if path:
+            stat_key = _stat_key(Path(path))
+            decoders.append({
+                "name": spec["name"],
+                "path": path,
+                "mtime_ns": stat_key[1] if stat_key else None,
+                "args": spec["args"],
+            })
+
+    return {
+        "schema": PLAYER_REGISTRY_SCHEMA,
+        "path_env": os.environ.get("PATH", ""),
+        "players": players,
+        "decoders": decoders,
+    }
+
+
+def _player_registry_is_current(registry: Dict[str, Any]) -> bool:
+    """A registry is stale once PATH or any recorded binary changes."""
+    if registry.get("schema") != PLAYER_REGISTRY_SCHEMA:
+        return False
+    if registry.get("path_env") != os.environ.get("PATH", ""):
+        return False
+    for player in registry.get("players", []) + registry.get("decoders", []):
+        key = _stat_key(Path(player["path"]))
+        if key is None or key[1] != player["mtime_ns"]:
+            return False
+    return True
+
+
+def get_player_registry(refresh: bool = False) -> Dict[str, Any]:
+    """Return the persisted player registry, probing only when it is stale."""
+    registry = _PLAYER_REGISTRY["registry"]
+    if registry is not None and not refresh:
+        return registry
+
+    registry = None
+    if not refresh:
+        try:
+            registry = json.loads(PLAYER_REGISTRY_FILE.read_text(encoding="utf-8"))
+            if not _player_registry_is_current(registry):
+                registry = None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            registry = None
+
+    if registry is None:
+        log_debug("Probing audio players")
+        registry = probe_players()
+        tmp_file = PLAYER_REGISTRY_FILE.with_name(f"{PLAYER_REGISTRY_FILE.name}.{os.getpid()}.tmp")
+        try:
+            tmp_file.write_text(json.dumps(registry), encoding="utf-8")
+            os.replace(str(tmp_file), str(PLAYER_REGISTRY_FILE))
+        except OSError as e:
+            log_debug("Could not write player registry: %s", e)
+
+    _PLAYER_REGISTRY["registry"] = registry
+    return registry
+
+
+def _startup_order(player: Dict[str, Any]) -> tuple:
+    # Unmeasured players sort last; preference order breaks ties
+    return (player["latency_ms"] is None, player["latency_ms"] or 0.0, player["rank"])
+
+
+def fastest_player(file_format: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Pick the fastest installed player that can open files of a format."""
+    candidates = [
+        player for player in get_player_registry(refresh)["players"]
+        if file_format in player["formats"] or "*" in player["formats"]
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=_startup_order)
+
+
+def select_player(audio_file: Path, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Pick the fastest installed player that can open the given file."""
+    return fastest_player(audio_file.suffix.lower().lstrip("."), refresh)
+
+
+def playlist_player(files: List[Path], refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """Pick the fastest player that can play all of the files in one run."""
+    formats = {audio_file.suffix.lower().lstrip(".") for audio_file in files}
+    candidates = [
+        player for player in get_player_registry(refresh)["players"]
+        if player["playlist"] and ("*" in player["formats"] or formats <= set(player["formats"]))
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=_startup_order)
+
+# =============================================================================
+# DECODED PCM CACHE
+# =============================================================================
+
+# WAV copies of MP3 assets, named by content hash so a renamed or duplicated
+# asset shares one entry and an edited asset never hits a stale decode
+PCM_CACHE_DIR = QUEUE_DIR / "pcm_cache"
+PCM_DECODE_TIMEOUT = 10.0
+
+# Set in the queue worker and daemon, where decoding on a cache miss cannot
+# delay the hook that triggered the sound
+_IN_BACKGROUND = [False]
+
+_PCM_CACHE: Dict[str, Any] = {"cache": None}
+
+
+class PcmCache:
+    """A directory of decoded WAV files bounded by total size.
+
+    Entries are evicted least recently used first. A hit refreshes the
+    file's mtime, so the directory listing itself is the LRU order and no
+    index has to be kept consistent between processes.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int,
+                 decoder: Optional[Callable[[Path, Path], bool]] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.decoder = decoder
+        self.hits = 0
+        self.decodes = 0
+
+    def path_for(self, digest: str) -> Path:
+        return self.directory / f"{digest}.wav"
+
+    def lookup(self, digest: str) -> Optional[Path]:
+        """Return the cached WAV for a content hash without decoding."""
+        path = self.path_for(digest)
+        try:
+            os.utime(str(path))
+        except OSError:
+            return None
+        self.hits += 1
+        return path
+
+    def get(self, source: Path, digest: str) -> Optional[Path]:
+        """Return the cached WAV for source, decoding it on a miss."""
+        cached = self.lookup(digest)
+        if cached is not None or self.decoder is None:
+            return cached
+
+        path = self.path_for(digest)
+        # Decoders pick the output format from the extension, so the
+        # temporary name keeps ".wav"; the leading dot hides it from evict()
+        tmp_file = self.directory / f".{digest}.{os.getpid()}.wav"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if not self.decoder(source, tmp_file) or not tmp_file.exists():
+                log_debug("Could not decode %s to PCM", source.name)
+                return None
+            # Publishing by rename means readers never see a partial WAV
+            os.replace(str(tmp_file), str(path))
+        except OSError as e:
+            log_debug("PCM cache write failed: %s", e)
+            return None
+        finally:
+            try:
+                tmp_file.unlink()
+            except OSError:
+                pass
+
+        self.decodes += 1
+        self.evict()
+        return path if path.exists() else None
+
+    def total_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        try:
+            with os.scandir(str(self.directory)) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.name.endswith(".wav"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits its limit."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log_debug("Could not evict %s: %s", path, e)
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            log_debug("Evicted %s PCM cache entries (%s bytes left)", removed, total)
+        return removed
+
+
+def decode_to_wav(source: Path, target: Path) -> bool:
+    """Decode an audio file to WAV with the first installed decoder."""
+    substitutions = {"{src}": str(source), "{dst}": str(target)}
+    for decoder in get_player_registry().get("decoders", []):
+        cmd = [decoder["path"]] + [substitutions.get(arg, arg) for arg in decoder["args"]]
+        try:
+            result = subprocess.run(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=PCM_DECODE_TIMEOUT,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            log_debug("%s could not decode %s: %s", decoder["name"], source.name, e)
+            continue
+        if result.returncode == 0:
+            log_debug("Decoded %s with %s", source.name, decoder["name"])
+            return True
+    return False
+
+
+def get_pcm_cache() -> PcmCache:
+    """Return the PCM cache configured by playback_settings."""
+    max_bytes = get_config_snapshot()["pcm_cache_max_mb"] * 1024 * 1024
+    cache = _PCM_CACHE["cache"]
+    if cache is None or cache.max_bytes != max_bytes:
+        cache = PcmCache(PCM_CACHE_DIR, max_bytes, decode_to_wav)
+        _PCM_CACHE["cache"] = cache
+    return cache
+
+
+def pcm_source_for(audio_file: Path) -> Path:
+    """Return the file a Linux player should open for an asset.
+
+    A cached WAV replaces an MP3 only when the fastest PCM player starts
+    sooner than the fastest MP3 player, or no MP3 player is installed.
+    Misses are decoded only where that cannot delay a hook (the queue
+    worker and daemon) or when nothing else could play the file.
+    """
+    if audio_file.suffix.lower() != ".mp3" or not get_config_snapshot()["pcm_cache"]:
+        return audio_file
+    wav_player = fastest_player("wav")
+    if wav_player is None:
+        return audio_file
+    mp3_player = fastest_player("mp3")
+    if mp3_player is not None and _startup_order(mp3_player) <= _startup_order(wav_player):
+        return audio_file
+
+    digest = get_content_hash(audio_file)
+    if digest is None:
+        return audio_file
+    cache = get_pcm_cache()
+    if mp3_player is None or _IN_BACKGROUND[0]:
+        wav = cache.get(audio_file, digest)
+    else:
+        wav = cache.lookup(digest)
+    if wav is None:
+        return audio_file
+    log_debug("Using cached PCM for %s: %s", audio_file.name, wav.name)
+    return wav
+
+# =============================================================================
+# SOFTWARE MIXER
+# =============================================================================
+
+# Mixed clips are interleaved signed 16-bit little-endian PCM
+PCM_SAMPLE_WIDTH = 2
+PCM_MIN = -32768
+PCM_MAX = 32767
+
+
+def _numpy():
+    """Return the numpy module, or None when it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def read_wav(path: Path) -> Optional[Dict[str, Any]]:
+    """Read a 16-bit PCM WAV file into {"rate", "channels", "frames"}."""
+    import wave
+
+    try:
+        with wave.open(str(path), "rb") as wav:
+            if wav.getsampwidth() != PCM_SAMPLE_WIDTH or wav.getcomptype() != "NONE":
+                log_debug("Cannot mix %s: not 16-bit PCM", path.name)
+                return None
+            return {
+                "rate": wav.getframerate(),
+                "channels": wav.getnchannels(),
+                "frames": wav.readframes(wav.getnframes()),
+            }
+    except (OSError, EOFError, wave.Error) as e:
+        log_debug("Could not read %s: %s", path, e)
+        return None
+
+
+def write_wav(path: Path, clip: Dict[str, Any]) -> None:
+    """Write a clip from read_wav()/mix_clips() as a WAV file."""
+    import wave
+
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(clip["channels"])
+        wav.setsampwidth(PCM_SAMPLE_WIDTH)
+        wav.setframerate(clip["rate"])
+        wav.writeframes(clip["frames"])
+
+
+def load_clip_pcm(audio_file: Path) -> Optional[Dict[str, Any]]:
+    """Decode an asset for mixing, through the PCM cache for compressed files."""
+    if audio_file.suffix.lower() == ".wav":
+        return read_wav(audio_file)
+    digest = get_content_hash(audio_file)
+    wav = get_pcm_cache().get(audio_file, digest) if digest else None
+    return read_wav(wav) if wav else None
+
+
+def _mix_numpy(np, layers: List[tuple], rate: int, channels: int, length: int) -> bytes:
+    out = np.zeros(length * channels, dtype=np.float64)
+    for clip, gain, offset in layers:
+        data = np.frombuffer(clip["frames"], dtype="<i2").reshape(-1, clip["channels"])
+        count = len(data) * rate // clip["rate"]
+        if clip["rate"] != rate:
+            # Nearest-neighbour resampling is enough for notification chimes
+            data = data[np.arange(count) * clip["rate"] // rate]
+        if clip["channels"] != channels:
+            data = np.repeat(data, channels, axis=1)
+        start = offset * channels
+        out[start:start + count * channels] += data.reshape(-1) * gain
+    return np.clip(np.rint(out), PCM_MIN, PCM_MAX).astype("<i2").tobytes()
+
+
+def _mix_array(layers: List[tuple], rate: int, channels: int, length: int) -> bytes:
+    from array import array
+
+    out = [0.0] * (length * channels)
+    for clip, gain, offset in layers:
+        src = array("h")
+        src.frombytes(clip["frames"])
+        if sys.byteorder == "big":
+            src.byteswap()
+        src_channels = clip["channels"]
+        count = len(src) // src_channels * rate // clip["rate"]
+        for index in range(count):
+            frame = (index * clip["rate"] // rate) * src_channels
+            base = (offset + index) * channels
+            for channel in range(channels):
+                sample = src[frame + (channel if src_channels == channels else 0)]
+                out[base + channel] += sample * gain
+    # round() and numpy.rint() both round half to even, so the two paths
+    # produce identical bytes
+    mixed = array("h", (min(PCM_MAX, max(PCM_MIN, int(round(v)))) for v in out))
+    if sys.byteorder == "big":
+        mixed.byteswap()
+    return mixed.tobytes()
+
+
+def mix_clips(layers: List[tuple], use_numpy: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """Sum (clip, gain, offset_seconds) layers into one clip.
+
+    The output takes the first layer's sample rate and the widest channel
+    count; mono layers are duplicated across channels and other rates are
+    resampled. Samples are summed in float64, rounded and clipped to
+    16 bits, so the result is deterministic with or without NumPy.
+    Returns None when the layers cannot be combined.
+    """
+    if not layers:
+        return None
+    rate = layers[0][0]["rate"]
+    channels = max(clip["channels"] for clip, _, _ in layers)
+    placed = []
+    length = 0
+    for clip, gain, offset_seconds in layers:
+        if clip["channels"] not in (1, channels):
+            log_debug("Cannot mix %s-channel audio into %s channels", clip["channels"], channels)
+            return None
+        offset = int(round(max(0.0, offset_seconds) * rate))
+        frames = len(clip["frames"]) // (PCM_SAMPLE_WIDTH * clip["channels"])
+        length = max(length, offset + frames * rate // clip["rate"])
+        placed.append((clip, gain, offset))
+
+    np = _numpy() if use_numpy is not False else None
+    if np is not None:
+        frames = _mix_numpy(np, placed, rate, channels, length)
+    else:
+        frames = _mix_array(placed, rate, channels, length)
+    return {"rate": rate, "channels": channels, "frames": frames}
+
+
+def mix_to_file(audio_files: List[Path], offsets: List[float], gain: float,
+                target: Path) -> Optional[float]:
+    """Mix assets into a WAV file; return its duration in seconds or None."""
+    layers = []
+    for audio_file, offset in zip(audio_files, offsets):
+        clip = load_clip_pcm(audio_file)
+        if clip is None:
+            return None
+        layers.append((clip, gain, offset))
+    mixed = mix_clips(layers)
+    if mixed is None:
+        return None
+    try:
+        write_wav(target, mixed)
+    except (OSError, EOFError) as e:
+        log_error("Could not write mix to %s: %s", target, e)
+        return None
+    frames = len(mixed["frames"]) // (PCM_SAMPLE_WIDTH * mixed["channels"])
+    return frames / mixed["rate"]
+
+# =============================================================================
+# AUDIO PLAYBACK FUNCTIONS
+# =============================================================================
+
+# Player processes started by this process. A one-shot hook exits long before
+# they finish; the daemon reaps them between events.
+_LIVE_PLAYERS: List[subprocess.Popen] = []
+
+
+def track_player(proc: subprocess.Popen) -> None:
+    """Remember a started player process."""
+    _LIVE_PLAYERS.append(proc)
+
+
+def reap_players() -> int:
+    """Reap finished player processes and return how many are still running."""
+    _LIVE_PLAYERS[:] = [p for p in _LIVE_PLAYERS if p.poll() is None]
+    return len(_LIVE_PLAYERS)
+
+
+def play_audio_windows(audio_file: Path) -> bool:
+    """Play audio on Windows using multiple fallback methods."""
+    # Escape path for PowerShell
+    win_path = str(audio_file).replace("\\", "/")
+    win_path_escaped = escape_powershell_string(win_path)
+    hold_ms = playback_hold_ms(audio_file, 3)
+
+    log_debug("Windows audio playback: %s", win_path)
+
+    # Method 1: Direct PowerShell command with MediaPlayer
+    try:
+        ps_cmd = (
+            'Add-Type -AssemblyName presentationCore; '
+            '$p = New-Object System.Windows.Media.MediaPlayer; '
+            f'$p.Open("{win_path_escaped}"); '
+            'Start-Sleep -Milliseconds 500; '
+            '$p.Play(); '
+            f'Start-Sleep -Milliseconds {hold_ms}; '
+            '$p.Stop(); $p.Close()'
+        )
+        proc = subprocess.Popen(
+            ["powershell.exe", "-ExecutionPolicy", "Bypass", "-WindowStyle", "Hidden", "-Command", ps_cmd],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        track_player(proc)
+        log_debug("Started PowerShell MediaPlayer (PID: %s)", proc.pid)
+        return True
+    except FileNotFoundError:
+        log_debug("PowerShell not found, trying fallback")
+    except Exception as e:
+        log_error("PowerShell MediaPlayer failed: %s", e)
+
+    # Method 2: Use PowerShell script file
+    try:
+        temp_dir = get_safe_temp_dir()
+        script_file = temp_dir / f"claude_audio_{os.getpid()}_{int(time.time())}.ps1"
+
+        ps_script = f'''
+Add-Type -AssemblyName presentationCore
+$player = New-Object System.Windows.Media.MediaPlayer
+$player.Open("{win_path_escaped}")
+Start-Sleep -Milliseconds 500
+$player.Play()
+Start-Sleep -Milliseconds {hold_ms}
+$player.Stop()
+$player.Close()
+Remove-Item -Path $MyInvocation.MyCommand.Path -Force -ErrorAction SilentlyContinue
+'''
+        script_file.write_text(ps_script, encoding="utf-8")
+        log_debug("Created PowerShell script: %s", script_file)
+
+        proc = subprocess.Popen(
+            ["powershell.exe", "-ExecutionPolicy", "Bypass", "-WindowStyle", "Hidden", "-File", str(script_file)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        track_player(proc)
+        log_debug("Started PowerShell script (PID: %s)", proc.pid)
+        return True
+    except Exception as e:
+        log_error("PowerShell script method failed: %s", e)
+
+    # Method 3: Use WMPlayer.OCX COM object
+    try:
+        ps_cmd = f'$w = New-Object -ComObject WMPlayer.OCX; $w.URL = "{win_path_escaped}"; Start-Sleep -Milliseconds {hold_ms}'
+        proc = subprocess.Popen(
+            ["powershell.exe", "-Command", ps_cmd],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        )
+        track_player(proc)
+        log_debug("Started WMPlayer.OCX (PID: %s)", proc.pid)
+        return True
+    except Exception as e:
+        log_error("WMPlayer.OCX method failed: %s", e)
+        return False
+
+
+def play_audio_macos(audio_file: Path) -> bool:
+    """Play audio on macOS using afplay."""
+    log_debug("macOS audio playback: %s", audio_file)
+    try:
+        proc = subprocess.Popen(
+            ["afplay", str(audio_file)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        track_player(proc)
+        log_debug("Started afplay (PID: %s)", proc.pid)
+        return True
+    except FileNotFoundError:
+        log_error("afplay not found")
+        return False
+    except Exception as e:
+        log_error("afplay failed: %s", e)
+        return False
+
+
+def play_audio_linux(audio_file: Path) -> bool:
+    """Play audio on Linux using the best available player."""
+    log_debug("Linux audio playback: %s", audio_file)
+    audio_file = pcm_source_for(audio_file)
+
+    # A binary that vanished since the last probe forces one re-probe
+    for refresh in (False, True):
+        player = select_player(audio_file, refresh=refresh)
+        if player is None:
+            break
+        try:
+            with profile_phase("popen"):
+                proc = subprocess.Popen(
+                    [player["path"]] + player["args"] + [str(audio_file)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+            track_player(proc)
+            log_debug("Started %s (PID: %s)", player["name"], proc.pid)
+            return True
+        except FileNotFoundError:
+            log_debug("%s disappeared, re-probing players", player["name"])
+            continue
+        except Exception as e:
+            log_error("%s failed: %s", player["name"], e)
+            return False
+
+    log_error("No audio player found on Linux that can play %s", audio_file.suffix or audio_file.name)
+    return False
+
+
+def play_audio_wsl(audio_file: Path) -> bool:
+    """Play audio in WSL by copying to Windows temp and using PowerShell."""
+    log_debug("WSL audio playback: %s", audio_file)
+
+    try:
+        import shutil
+
+        # Get Windows temp directory
+        # Try multiple methods to find a writable Windows temp
+        win_temp_candidates = []
+
+        # Method 1: Use WSLENV or inherited Windows env vars
+        for env_var in ["TEMP", "TMP", "USERPROFILE"]:
+            val = os.environ.get(env_var)
+            if val and val.startswith("/mnt/"):
+                win_temp_candidates.append(Path(val))
+
+        # Method 2: Use wslvar to get Windows TEMP
+        try:
+            win_temp_path = subprocess.check_output(
+                ["wslvar", "TEMP"],
+                text=True,
+                stderr=subprocess.DEVNULL
+            ).strip()
+            if win_temp_path:
+                # Convert Windows path to WSL path
+                wsl_path = subprocess.check_output(
+                    ["wslpath", "-u", win_temp_path],
+                    text=True,
+                    stderr=subprocess.DEVNULL
+                ).strip()
+                win_temp_candidates.append(Path(wsl_path))
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            pass
+
+        # Method 3: Standard Windows temp locations via /mnt
+        windir = os.environ.get("WINDIR", "")
+        if windir and windir.startswith("/mnt/"):
+            win_temp_candidates.append(Path(windir) / "Temp")
+
+        win_temp_candidates.extend([
+            Path("/mnt/c/Windows/Temp"),
+            Path("/mnt/c/Users") / os.environ.get("USER", "Public") / "AppData/Local/Temp",
+        ])
+
+        # Find first writable temp directory
+        win_temp = None
+        for candidate in win_temp_candidates:
+            try:
+                if candidate.exists() and os.access(str(candidate), os.W_OK):
+                    win_temp = candidate
+                    break
+            except Exception:
+                continue
+
+        if not win_temp:
+            log_error("Could not find writable Windows temp directory from WSL")
+            # Fallback to native Linux playback
+            return play_audio_linux(audio_file)
+
+        log_debug("Using Windows temp: %s", win_temp)
+
+        # Copy audio file to Windows temp
+        temp_filename = f"claude_audio_{int(time.time())}_{os.getpid()}.mp3"
+        wsl_temp_file = win_temp / temp_filename
+        with profile_phase("wsl_copy"):
+            shutil.copy(str(audio_file), str(wsl_temp_file))
+        log_debug("Copied audio to: %s", wsl_temp_file)
+
+        # Convert to Windows path for PowerShell
+        try:
+            win_path = subprocess.check_output(
+                ["wslpath", "-w", str(wsl_temp_file)],
+                text=True,
+                stderr=subprocess.DEVNULL
+            ).strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            # Manual conversion
+            path_str = str(wsl_temp_file)
+            if path_str.startswith("/mnt/"):
+                drive = path_str[5].upper()
+                win_path = f"{drive}:{path_str[6:]}".replace("/", "\\")
+            else:
+                log_error("Could not convert WSL path to Windows path")
+                return play_audio_linux(audio_file)
+
+        log_debug("Windows path: %s", win_path)
+        win_path_escaped = escape_powershell_string(win_path.replace("\\", "/"))
+        hold_ms = playback_hold_ms(audio_file, 4)
+
+        # Play using PowerShell
+        ps_command = f'''
+Add-Type -AssemblyName presentationCore
+$player = New-Object System.Windows.Media.MediaPlayer
+$player.Open("{win_path_escaped}")
+Start-Sleep -Milliseconds 500
+$player.Play()
+Start-Sleep -Milliseconds {hold_ms}
+$player.Stop()
+$player.Close()
+Remove-Item -Path "{win_path_escaped}" -ErrorAction SilentlyContinue
+'''
+
+        with profile_phase("popen"):
+            proc = subprocess.Popen(
+                ["powershell.exe", "-Command", ps_command],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        track_player(proc)
+        log_debug("Started WSL PowerShell playback (PID: %s)", proc.pid)
+        return True
+
+    except Exception as e:
+        log_error("WSL audio playback failed: %s", e)
+        # Fallback to native Linux playback
+        log_debug("Falling back to native Linux playback")
+        return play_audio_linux(audio_file)
+
+
+def play_audio(audio_file: Path) -> bool:
+    """Play audio file using platform-specific method.
+
+    Started players are entered in the shared player table (see
+    reserve_player_slot()); if nothing starts, this process's reservation
+    is given back.
+    """
+    first_new = len(_LIVE_PLAYERS)
+    played = _play_audio_on_platform(audio_file)
+    if played:
+        duration = get_audio_duration(audio_file)
+        for proc in _LIVE_PLAYERS[first_new:]:
+            register_player(proc, duration)
+    else:
+        release_player_slot()
+    return played
+
+
+def _play_audio_on_platform(audio_file: Path) -> bool:
+    system = SYSTEM
+    log_debug("Platform: %s", system)
+
+    if system == "Windows":
+        return play_audio_windows(audio_file)
+    elif system == "Darwin":
+        return play_audio_macos(audio_file)
+    elif system == "Linux":
+        if IS_WSL:
+            log_debug("Detected WSL environment")
+            return play_audio_wsl(audio_file)
+        return play_audio_linux(audio_file)
+    else:
+        log_error("Unsupported platform: %s", system)
+        return False
+
+# =============================================================================
+# PLAYER SUPERVISOR
+# =============================================================================
+
+# Players started by every hook process, queue worker and daemon, read and
+# rewritten under PLAYERS_LOCK_FILE. Each entry records the player's PID and
+# the time by which its clip should have ended. A process first reserves a
+# slot (pid null, "owner" set), so the limit holds while its player starts.
+PLAYERS_FILE = QUEUE_DIR / "live_players.json"
+PLAYERS_LOCK_FILE = QUEUE_DIR / "live_players.lock"
+
+# A reservation that never turned into a player is dropped after this long
+PLAYER_RESERVATION_SECONDS = 10
+
+# Sounds whose players an arriving hook stops, when preemption is enabled
+PLAYER_PREEMPTS = {
+    "notification": ("pretooluse", "posttooluse"),
+}
+
+
+def _read_players() -> List[Dict[str, Any]]:
+    try:
+        entries = json.loads(PLAYERS_FILE.read_text(encoding="utf-8"))
+        return entries if isinstance(entries, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def _write_players(entries: List[Dict[str, Any]]) -> None:
+    tmp_file = PLAYERS_FILE.with_name(f"{PLAYERS_FILE.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(entries), encoding="utf-8")
+    os.replace(str(tmp_file), str(PLAYERS_FILE))
+
+
+def _process_start_ticks(pid: int) -> Optional[int]:
+    """Start time of a process from /proc (Linux), to tell reused PIDs apart.
+
+    Returns -1 for a zombie and None where /proc is unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    if fields[0] == b"Z":
+        return -1
+    return int(fields[19])
+
+
+def _pid_running(pid: int) -> bool:
+    """Whether a process exists (POSIX); Windows cannot check cheaply."""
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    except OSError:
+        return False
+    return True
+
+
+def _player_running(entry: Dict[str, Any]) -> bool:
+    """Whether the player (or reservation) an entry describes is still live."""
+    if entry.get("pid") is None:
+        return (time.time() - float(entry.get("reserved", 0)) < PLAYER_RESERVATION_SECONDS
+                and _pid_running(int(entry.get("owner", 0))))
+    if os.name == "nt":
+        # Without a cheap liveness check, an entry lasts until its deadline
+        return time.time() < float(entry.get("deadline", 0))
+    if not _pid_running(int(entry["pid"])):
+        return False
+    ticks = _process_start_ticks(int(entry["pid"]))
+    if ticks == -1:
+        return False
+    return entry.get("start") is None or ticks is None or ticks == entry["start"]
+
+
+def _stop_player(entry: Dict[str, Any], status: str) -> None:
+    """Terminate a listed player; only verified PIDs are signalled.
+
+    A player started by another process is only signalled when its recorded
+    start time still matches /proc. Without that check (no /proc, or no
+    recorded start) the PID may have been reused, so it is left alone.
+    """
+    pid = int(entry["pid"])
+    for proc in _LIVE_PLAYERS:
+        if proc.pid == pid:
+            proc.terminate()
+            break
+    else:
+        start = entry.get("start")
+        if os.name == "nt" or start is None or _process_start_ticks(pid) != start:
+            log_debug("Not stopping player %s: cannot verify it is still the player", pid)
+            return
+        try:
+            import signal
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            log_debug("Could not stop player %s: %s", pid, e)
+            return
+    log_trigger(str(entry.get("hook") or "unknown"), status, f"PID {pid}")
+
+
+def _live_players(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop finished players and stop those running past their deadline."""
+    now = time.time()
+    live = []
+    for entry in entries:
+        if not _player_running(entry):
+            continue
+        if entry.get("pid") is not None and now > float(entry.get("deadline", now)):
+            log_error("Player %s (%s) overran its clip, stopping it", entry["pid"], entry.get("hook"))
+            _stop_player(entry, "OVERRUN")
+            continue
+        live.append(entry)
+    return live
+
+
+def _preempt(entries: List[Dict[str, Any]], hook_type: str) -> List[Dict[str, Any]]:
+    """Stop players that hook_type may preempt; return the ones left."""
+    victims = PLAYER_PREEMPTS.get(hook_type, ())
+    if not victims or not get_config_snapshot()["preempt"]:
+        return entries
+    kept = []
+    for entry in entries:
+        if entry.get("pid") is not None and entry.get("hook") in victims:
+            _stop_player(entry, "PREEMPTED")
+        else:
+            kept.append(entry)
+    return kept
+
+
+def reserve_player_slot(hook_type: str) -> bool:
+    """Claim one of the max_players slots before starting a player.
+
+    Players the hook may preempt are stopped first. Returns False when every
+    slot is taken; a process holds at most one reservation at a time.
+    """
+    try:
+        with FileLock(PLAYERS_LOCK_FILE):
+            entries = _preempt(_live_players(_read_players()), hook_type)
+            pid = os.getpid()
+            if not any(e.get("pid") is None and e.get("owner") == pid for e in entries):
+                if len(entries) >= get_config_snapshot()["max_players"]:
+                    _write_players(entries)
+                    log_debug("Player limit reached, %s playing", len(entries))
+                    return False
+                entries.append({"pid": None, "owner": pid, "hook": hook_type,
+                                "reserved": time.time()})
+            _write_players(entries)
+        return True
+    except OSError as e:
+        # The supervisor is best effort; never block playback on it
+        log_debug("Player table unavailable: %s", e)
+        return True
+
+
+def register_player(proc: subprocess.Popen, duration: Optional[float]) -> None:
+    """Turn this process's reservation into a live player entry."""
+    started = time.time()
+    length = duration if duration is not None else PLAYBACK_TIMEOUT_SECONDS
+    try:
+        with FileLock(PLAYERS_LOCK_FILE):
+            entries = _read_players()
+            owner = os.getpid()
+            entry = next((e for e in entries if e.get("pid") is None and e.get("owner") == owner), None)
+            if entry is None:
+                entry = {"owner": owner, "hook": ""}
+                entries.append(entry)
+            entry.update({
+                "pid": proc.pid,
+                "start": _process_start_ticks(proc.pid),
+                "started": started,
+                "deadline": started + length + PLAYBACK_GRACE_SECONDS,
+            })
+            _write_players(entries)
+    except OSError as e:
+        log_debug("Could not register player %s: %s", proc.pid, e)
+
+
+def release_player_slot() -> None:
+    """Give back this process's reservation when no player was started."""
+    try:
+        with FileLock(PLAYERS_LOCK_FILE):
+            entries = _read_players()
+            owner = os.getpid()
+            kept = [e for e in entries if not (e.get("pid") is None and e.get("owner") == owner)]
+            if len(kept) != len(entries):
+                _write_players(kept)
+    except OSError as e:
+        log_debug("Player table unavailable: %s", e)
+
+
+def preempt_players(hook_type: str) -> None:
+    """Stop players an urgent hook preempts, without claiming a slot."""
+    if hook_type not in PLAYER_PREEMPTS:
+        return
+    try:
+        with FileLock(PLAYERS_LOCK_FILE):
+            _write_players(_preempt(_live_players(_read_players()), hook_type))
+    except OSError as e:
+        log_debug("Player table unavailable: %s", e)
+
+
+def supervise_players() -> int:
+    """Prune the player table, stop overrunning players, return the live count."""
+    try:
+        with FileLock(PLAYERS_LOCK_FILE):
+            entries = _live_players(_read_players())
+            _write_players(entries)
+            return len(entries)
+    except OSError as e:
+        log_debug("Player table unavailable: %s", e)
+        return 0
+
+
+def wait_for_player_slot(hook_type: str, deadline: float) -> bool:
+    """Reserve a slot, polling until one frees up or deadline (epoch) passes."""
+    while not reserve_player_slot(hook_type):
+        if time.time() >= deadline:
+            return False
+        time.sleep(QUEUE_POLL_SECONDS)
+    return True
+
+# =============================================================================
+# PLAYBACK QUEUE
+# =============================================================================
+
+# Pending sounds, read and rewritten under QUEUE_LOCK_FILE (held briefly)
+QUEUE_FILE = QUEUE_DIR / "playback_queue.json"
+QUEUE_LOCK_FILE = QUEUE_DIR / "playback_queue.lock"
+
+# Held by the worker that drains the queue for as long as it runs
+WORKER_LOCK_FILE = QUEUE_DIR / "playback_worker.lock"
+
+# Entries older than this when the worker reaches them are skipped
+QUEUE_MAX_AGE_SECONDS = 30
+
+# A player still running this long after its clip should have ended is
+# killed so the queue moves on; clips of unknown length get the full timeout
+PLAYBACK_GRACE_SECONDS = 5
+PLAYBACK_TIMEOUT_SECONDS = 30
+# How often a worker waiting for a burst summary checks for new sounds
+QUEUE_POLL_SECONDS = 0.1
+# Most queued sounds handed to one playlist player at a time
+PLAYLIST_MAX_BATCH = 8
+
+
+def _lock_fd(fd: int, blocking: bool) -> bool:
+    """Take an exclusive lock on an open file descriptor."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_fd(fd: int) -> None:
+    """Release a lock taken with _lock_fd()."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+# Lock acquisitions by this process, how many had to wait, and for how long
+LOCK_STATS = {"acquired": 0, "contended": 0, "wait_us": 0}
+
+
+class FileLock:
+    """Exclusive cross-process lock backed by flock (msvcrt on Windows).
+
+    The kernel drops the lock when its holder exits, so a crashed worker can
+    never leave a stale lock behind. With record_pid the holder's PID is
+    written into the file to show who owns it.
+    """
+
+    def __init__(self, path: Path, blocking: bool = True, record_pid: bool = False):
+        self.path = path
+        self.blocking = blocking
+        self.record_pid = record_pid
+        self.fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Take the lock; returns False if it is held (non-blocking) or fails."""
+        if self.fd is not None:
+            return True
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        locked = _lock_fd(fd, False)
+        if not locked and self.blocking:
+            # Count waits so contention on shared state can be measured
+            waited = time.perf_counter()
+            locked = _lock_fd(fd, True)
+            LOCK_STATS["contended"] += 1
+            LOCK_STATS["wait_us"] += int((time.perf_counter() - waited) * 1e6)
+        if not locked:
+            os.close(fd)
+            return False
+        LOCK_STATS["acquired"] += 1
+        if self.record_pid:
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, str(os.getpid()).encode("ascii"))
+        self.fd = fd
+        return True
+
+    def release(self) -> None:
+        """Release the lock if held."""
+        if self.fd is None:
+            return
+        _unlock_fd(self.fd)
+        os.close(self.fd)
+        self.fd = None
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise TimeoutError(f"Could not lock {self.path}")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def _read_queue() -> List[Dict[str, Any]]:
+    """Read pending entries; caller must hold QUEUE_LOCK_FILE."""
+    try:
+        entries = json.loads(QUEUE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return entries if isinstance(entries, list) else []
+
+
+def _write_queue(entries: List[Dict[str, Any]]) -> None:
+    """Replace pending entries; caller must hold QUEUE_LOCK_FILE."""
+    tmp_file = QUEUE_FILE.with_name(f"{QUEUE_FILE.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(entries), encoding="utf-8")
+    os.replace(str(tmp_file), str(QUEUE_FILE))
+
+
+def _entry_priority(entry: Dict[str, Any]) -> int:
+    """Priority a queue entry was enqueued with (older entries: hook default)."""
+    priority = entry.get("priority")
+    if isinstance(priority, int) and not isinstance(priority, bool):
+        return priority
+    return get_hook_priority(str(entry.get("hook", "unknown")))
+
+
+def _evict_for(entries: List[Dict[str, Any]], priority: int) -> Optional[Dict[str, Any]]:
+    """Remove the lowest-priority entry if it ranks below priority.
+
+    The oldest entry loses a tie. Returns the evicted entry, or None if
+    nothing ranks below the newcomer. Caller must hold QUEUE_LOCK_FILE.
+    """
+    if not entries:
+        return None
+    victim = min(entries, key=lambda entry: (_entry_priority(entry), float(entry.get("ts", 0))))
+    if _entry_priority(victim) >= priority:
+        return None
+    entries.remove(victim)
+    return victim
+
+
+def _requeue(items: List[Dict[str, Any]]) -> None:
+    """Put entries taken by the worker back so they play after what outranks them."""
+    with FileLock(QUEUE_LOCK_FILE):
+        _write_queue(items + _read_queue())
+
+
+def _outranked(priority: int) -> bool:
+    """Check whether a due entry above priority is waiting in the queue."""
+    with FileLock(QUEUE_LOCK_FILE):
+        entries = _read_queue()
+    now = time.time()
+    return any(_entry_priority(entry) > priority and float(entry.get("due", 0)) <= now
+               for entry in entries)
+
+
+def enqueue_playback(hook_type: str, audio_file: Path) -> str:
+    """Add a sound to the priority queue and make sure a worker is draining it.
+
+    Never waits for earlier sounds. When the queue is full the lowest
+    priority entry below this hook's priority is evicted to make room.
+    Returns the trigger status to log: QUEUED, COALESCED (queue full, same
+    sound already waiting) or DROPPED (queue full of equal or higher
+    priority sounds).
+    """
+    max_size = get_config_snapshot()["max_queue_size"]
+    priority = get_hook_priority(hook_type)
+    evicted = None
+    with FileLock(QUEUE_LOCK_FILE):
+        entries = _read_queue()
+        if len(entries) >= max_size:
+            if any(entry.get("file") == str(audio_file) for entry in entries):
+                status = "COALESCED"
+            else:
+                evicted = _evict_for(entries, priority)
+                status = "DROPPED" if evicted is None else "QUEUED"
+        else:
+            status = "QUEUED"
+        if status == "QUEUED":
+            entries.append({
+                "hook": hook_type,
+                "file": str(audio_file),
+                "ts": time.time(),
+                "priority": priority,
+            })
+            _write_queue(entries)
+    log_debug("Queue %s: %s (%d/%d pending)", status.lower(), hook_type, len(entries), max_size)
+    if evicted is not None:
+        log_trigger(str(evicted.get("hook", "unknown")), "EVICTED", _entry_name(evicted))
+
+    # An urgent sound cuts short a low-value one the worker is playing
+    preempt_players(hook_type)
+    ensure_queue_worker()
+    return status
+
+
+def enqueue_summary(hook_type: str, audio_file: Path, quiet_ms: int) -> str:
+    """Fold a rate-limited event into its hook's pending burst summary.
+
+    The summary entry comes due quiet_ms after the latest suppressed event,
+    so it plays once at the end of the burst and carries the number of
+    events it stands for. A full queue evicts like enqueue_playback().
+    Returns AGGREGATED, or DROPPED if nothing could be evicted.
+    """
+    max_size = get_config_snapshot()["max_queue_size"]
+    priority = get_hook_priority(hook_type)
+    now = time.time()
+    evicted = None
+    with FileLock(QUEUE_LOCK_FILE):
+        entries = _read_queue()
+        summary = next((entry for entry in entries
+                        if entry.get("summary") and entry.get("hook") == hook_type), None)
+        if summary is not None:
+            summary["count"] = int(summary.get("count", 1)) + 1
+            summary["ts"] = now
+            summary["due"] = now + quiet_ms / 1000.0
+            status = "AGGREGATED"
+        else:
+            if len(entries) >= max_size:
+                evicted = _evict_for(entries, priority)
+            if len(entries) >= max_size:
+                status = "DROPPED"
+            else:
+                entries.append({
+                    "hook": hook_type,
+                    "file": str(audio_file),
+                    "ts": now,
+                    "due": now + quiet_ms / 1000.0,
+                    "summary": True,
+                    "count": 1,
+                    "priority": priority,
+                })
+                status = "AGGREGATED"
+        if status == "AGGREGATED":
+            _write_queue(entries)
+    log_debug("Burst summary for %s: %s", hook_type, status.lower())
+    if evicted is not None:
+        log_trigger(str(evicted.get("hook", "unknown")), "EVICTED", _entry_name(evicted))
+
+    ensure_queue_worker()
+    return status
+
+
+def ensure_queue_worker() -> None:
+    """Start a detached queue worker unless one is already running."""
+    probe = FileLock(WORKER_LOCK_FILE, blocking=False)
+    if not probe.acquire():
+        return  # A live worker holds the lock and will pick the entry up
+    probe.release()
+
+    cmd = [sys.executable, str(HOOK_RUNNER), "--drain-queue"]
+    kwargs: Dict[str, Any] = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+        "close_fds": True,
+    }
+    if SYSTEM == "Windows":
+        kwargs["creationflags"] = (
+            getattr(subprocess, "DETACHED_PROCESS", 0)
+            | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+            | getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        proc = subprocess.Popen(cmd, **kwargs)
+        log_debug("Started queue worker (PID: %s)", proc.pid)
+    except OSError as e:
+        log_error("Failed to start queue worker: %s", e)
+
+
+def play_and_wait(audio_file: Path, duration: Optional[float] = None) -> bool:
+    """Play a sound and block until the player process exits."""
+    if duration is None:
+        duration = get_audio_duration(audio_file)
+    if duration is None:
+        timeout = PLAYBACK_TIMEOUT_SECONDS
+    else:
+        timeout = duration + PLAYBACK_GRACE_SECONDS
+
+    first_new = len(_LIVE_PLAYERS)
+    if not play_audio(audio_file):
+        return False
+    for proc in _LIVE_PLAYERS[first_new:]:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            log_error("Player %s still running after %.1fs, killing it", proc.pid, timeout)
+            proc.kill()
+            proc.wait()
+    reap_players()
+    return True
+
+
+def play_playlist(files: List[Path],
+                  on_start: Optional[Callable[[int], None]] = None) -> bool:
+    """Play files gaplessly through one player and wait for the last one.
+
+    Needs a Linux player that takes several files (mpg123, aplay) and known
+    clip lengths; on_start(index) is called as each clip begins, timed by
+    those lengths. Returns False without playing anything when that is not
+    possible, so the caller can fall back to sequential playback.
+    """
+    if SYSTEM != "Linux" or IS_WSL:
+        return False
+    durations = [get_audio_duration(audio_file) for audio_file in files]
+    if None in durations:
+        return False
+    sources = [pcm_source_for(audio_file) for audio_file in files]
+    player = playlist_player(sources)
+    if player is None:
+        return False
+
+    try:
+        proc = subprocess.Popen(
+            [player["path"]] + player["args"] + [str(source) for source in sources],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError as e:
+        log_error("%s failed to start a playlist: %s", player["name"], e)
+        release_player_slot()
+        return False
+    track_player(proc)
+    register_player(proc, sum(durations))
+    log_debug("Started %s with %s clips (PID: %s)", player["name"], len(files), proc.pid)
+
+    started = time.monotonic()
+    offset = 0.0
+    for index, duration in enumerate(durations):
+        wait = started + offset - time.monotonic()
+        if wait > 0:
+            try:
+                proc.wait(timeout=wait)
+                break  # The player stopped early
+            except subprocess.TimeoutExpired:
+                pass
+        if on_start:
+            on_start(index)
+        offset += duration
+
+    timeout = started + offset + PLAYBACK_GRACE_SECONDS - time.monotonic()
+    try:
+        proc.wait(timeout=max(0.0, timeout))
+    except subprocess.TimeoutExpired:
+        log_error("Player %s still running after %.1fs playlist, killing it", proc.pid, offset)
+        proc.kill()
+        proc.wait()
+    if proc.returncode > 0:
+        log_error("%s exited with status %s during a playlist", player["name"], proc.returncode)
+    reap_players()
+    return True
+
+
+def _collect_mix_batch(first: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Wait out the mix window opened by first and take what arrived in it."""
+    window_end = float(first.get("ts", 0)) + get_config_snapshot()["mix_window_ms"] / 1000.0
+    remaining = window_end - time.time()
+    if remaining > 0:
+        time.sleep(remaining)
+    with FileLock(QUEUE_LOCK_FILE):
+        entries = _read_queue()
+        now = time.time()
+        batch = [entry for entry in entries
+                 if float(entry.get("ts", 0)) <= window_end and float(entry.get("due", 0)) <= now]
+        if batch:
+            _write_queue([entry for entry in entries if entry not in batch])
+    return batch
+
+
+def play_mixed(batch: List[Dict[str, Any]]) -> bool:
+    """Mix queue entries into one clip and play it through a single player.
+
+    Each sound starts at its arrival offset from the first entry; a sound
+    queued twice in the window is mixed once. Returns False without
+    playing anything when a clip cannot be decoded, so the caller can fall
+    back to sequential playback.
+    """
+    start = float(batch[0].get("ts", 0))
+    files: List[Path] = []
+    offsets: List[float] = []
+    for entry in batch:
+        audio_file = Path(str(entry.get("file", "")))
+        if audio_file not in files:
+            files.append(audio_file)
+            offsets.append(float(entry.get("ts", 0)) - start)
+
+    # Only the worker holding WORKER_LOCK_FILE mixes, so one name suffices
+    target = QUEUE_DIR / "mix.wav"
+    try:
+        duration = mix_to_file(files, offsets, get_config_snapshot()["mix_gain"], target)
+        if duration is None:
+            log_debug("Mixing unavailable, playing sounds one by one")
+            return False
+        log_debug("Mixed %s sounds into %.2fs", len(files), duration)
+        return play_and_wait(target, duration)
+    finally:
+        try:
+            target.unlink()
+        except OSError:
+            pass
+
+
+def _entry_name(entry: Dict[str, Any]) -> str:
+    """Describe a queue entry for the trigger log."""
+    name = Path(str(entry.get("file", ""))).name
+    if entry.get("summary"):
+        return f"{name} (summary of {int(entry.get('count', 1))} events)"
+    return name
+
+
+def drain_queue() -> int:
+    """Play queued sounds, most urgent first, until the queue is empty.
+
+    Runs in a detached process started by ensure_queue_worker(). Only one
+    worker can hold WORKER_LOCK_FILE; extra workers exit immediately. Burst
+    summaries wait in the queue until they come due, and the worker stays
+    alive until they have played.
+    """
+    worker_lock = FileLock(WORKER_LOCK_FILE, blocking=False, record_pid=True)
+    if not worker_lock.acquire():
+        return 0
+    _IN_BACKGROUND[0] = True
+    start_log_flusher()
+
+    try:
+        while True:
+            with FileLock(QUEUE_LOCK_FILE):
+                entries = _read_queue()
+                if not entries:
+                    # Give up the worker lock while still holding the queue
+                    # lock, so a concurrent enqueue either lands before this
+                    # check or sees no worker and starts a new one.
+                    worker_lock.release()
+                    return 0
+                now = time.time()
+                # Highest priority first, oldest first within a priority
+                due = sorted((i for i, item in enumerate(entries) if float(item.get("due", 0)) <= now),
+                             key=lambda i: (-_entry_priority(entries[i]), float(entries[i].get("ts", 0))))
+                mixing = get_config_snapshot()["mix_enabled"]
+                # Waiting sounds of the top priority are played as one playlist
+                top = [i for i in due if _entry_priority(entries[i]) == _entry_priority(entries[due[0]])]
+                taken = top[:1] if mixing else top[:PLAYLIST_MAX_BATCH]
+                batch = [entries[i] for i in taken]
+                if batch:
+                    _write_queue([item for i, item in enumerate(entries) if i not in taken])
+                else:
+                    wait = min(float(item.get("due", 0)) for item in entries) - now
+
+            if not batch:
+                time.sleep(min(wait, QUEUE_POLL_SECONDS))
+                continue
+
+            if mixing:
+                batch += _collect_mix_batch(batch[0])
+
+            _EVENT_START[0] = time.perf_counter()
+            live = []
+            for item in batch:
+                if time.time() - float(item.get("ts", 0)) > QUEUE_MAX_AGE_SECONDS:
+                    log_trigger(str(item.get("hook", "unknown")), "EXPIRED", _entry_name(item))
+                else:
+                    live.append(item)
+            if not live:
+                continue
+
+            # Wait for a free player slot for as long as the sounds stay fresh
+            oldest = min(float(item.get("ts", 0)) for item in live)
+            if not wait_for_player_slot(str(live[0].get("hook", "unknown")),
+                                        oldest + QUEUE_MAX_AGE_SECONDS):
+                for item in live:
+                    log_trigger(str(item.get("hook", "unknown")), "BUSY", _entry_name(item))
+                continue
+
+            if mixing and len(live) > 1 and play_mixed(live):
+                for item in live:
+                    log_trigger(str(item.get("hook", "unknown")), "PLAYED",
+                                f"{_entry_name(item)} (mixed)")
+                continue
+
+            started: List[int] = []
+
+            def _started(index: int) -> None:
+                item = live[index]
+                started.append(index)
+                log_trigger(str(item.get("hook", "unknown")), "PLAYED",
+                            f"{_entry_name(item)} (playlist)")
+
+            if len(live) > 1 and play_playlist(
+                    [Path(str(item.get("file", ""))) for item in live], on_start=_started):
+                # A preempted playlist leaves its unplayed sounds to the queue
+                if len(started) < len(live):
+                    _requeue(live[len(started):])
+                continue
+
+            priority = _entry_priority(live[0])
+            for index, item in enumerate(live):
+                # Something more urgent arrived: it plays before the rest
+                if index and _outranked(priority):
+                    _requeue(live[index:])
+                    break
+                hook_type = str(item.get("hook", "unknown"))
+                audio_file = Path(str(item.get("file", "")))
+                if not wait_for_player_slot(hook_type, float(item.get("ts", 0)) + QUEUE_MAX_AGE_SECONDS):
+                    log_trigger(hook_type, "BUSY", _entry_name(item))
+                    continue
+                if play_and_wait(audio_file):
+                    log_trigger(hook_type, "PLAYED", _entry_name(item))
+                else:
+                    log_trigger(hook_type, "PLAY_FAILED", _entry_name(item))
+                    log_error("Failed to play audio: %s", audio_file)
+    except Exception as e:
+        log_error("Queue worker failed: %s", e)
+        return 1
+    finally:
+        worker_lock.release()
+
+# =============================================================================
+# HOOK EVENT PAYLOAD
+# =============================================================================
+
+# Top-level payload fields the runner uses; everything else is skipped.
+# Scanning stops once EVENT_FIELDS are all seen; optional fields are only
+# kept if they come first.
+EVENT_FIELDS = ("hook_event_name", "tool_name", "session_id", "cwd")
+EVENT_OPTIONAL_FIELDS = ("error",)
+# Bytes scanned for those fields before giving up; the rest is drained
+EVENT_SCAN_LIMIT = 256 * 1024
+EVENT_CHUNK_SIZE = 8192
+# Longest field value kept; longer values are skipped like any other
+EVENT_MAX_FIELD_BYTES = 4096
+
+# Claude Code event names and the hook types that handle them
+EVENT_HOOK_TYPES = {
+    "Notification": "notification",
+    "Stop": "stop",
+    "PreToolUse": "pretooluse",
+    "PostToolUse": "posttooluse",
+    "PostToolUseFailure": "posttooluse",
+    "UserPromptSubmit": "userpromptsubmit",
+    "SubagentStop": "subagent_stop",
+    "PreCompact": "precompact",
+    "SessionStart": "session_start",
+    "SessionEnd": "session_end",
+}
+
+# Compiled by the first _EventReader, not at import
+_JSON_STRING_SPECIAL = rb'["\\]'
+_JSON_NESTED_SPECIAL = rb'["{}\[\]]'
+_JSON_SCALAR_END = rb'[,}\]\s]'
+
+
+class _EventReader:
+    """Incremental JSON scanner over a binary stream.
+
+    Consumed bytes are dropped as scanning moves on, so skipping a large
+    value costs at most one chunk of memory.
+    """
+
+    def __init__(self, stream, limit: int):
+        self.stream = stream
+        self.limit = limit
+        self.buf = b""
+        self.pos = 0
+        self.scanned = 0
+        self.string_special = re.compile(_JSON_STRING_SPECIAL)
+        self.nested_special = re.compile(_JSON_NESTED_SPECIAL)
+        self.scalar_end = re.compile(_JSON_SCALAR_END)
+
+    def fill(self) -> bool:
+        """Read the next chunk; False at EOF or once the scan limit is hit."""
+        if self.scanned >= self.limit:
+            return False
+        chunk = self.stream.read(EVENT_CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.scanned += len(chunk)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[int]:
+        """Return the next non-whitespace byte without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in b" \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return None
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char[0]:
+            raise ValueError(f"expected {char!r}")
+        self.pos += 1
+
+    def string(self, keep: bool) -> Optional[bytes]:
+        """Consume a string (opening quote next); return its raw body if kept."""
+        self.expect(b'"')
+        parts: List[bytes] = []
+        kept = 0
+        while True:
+            match = self.string_special.search(self.buf, self.pos)
+            if match is None or (match.group() == b"\\" and match.end() >= len(self.buf)):
+                # Need more input; keep what was scanned so far if wanted
+                end = match.start() if match else len(self.buf)
+                if keep and kept <= EVENT_MAX_FIELD_BYTES:
+                    parts.append(self.buf[self.pos:end])
+                    kept += end - self.pos
+                self.pos = end
+                if not self.fill():
+                    raise ValueError("truncated string")
+                continue
+            if match.group() == b"\\":
+                end = match.end() + 1
+                if keep and kept <= EVENT_MAX_FIELD_BYTES:
+                    parts.append(self.buf[self.pos:end])
+                    kept += end - self.pos
+                self.pos = end
+                continue
+            if keep and kept <= EVENT_MAX_FIELD_BYTES:
+                parts.append(self.buf[self.pos:match.start()])
+                kept += match.start() - self.pos
+            self.pos = match.end()
+            if not keep or kept > EVENT_MAX_FIELD_BYTES:
+                return None
+            return b"".join(parts)
+
+    def skip_value(self) -> None:
+        """Consume one JSON value of any type without materializing it."""
+        first = self.peek()
+        if first is None:
+            raise ValueError("truncated value")
+        if first == ord('"'):
+            self.string(keep=False)
+            return
+        if first not in b"{[":
+            while True:
+                match = self.scalar_end.search(self.buf, self.pos)
+                if match:
+                    self.pos = match.start()
+                    return
+                self.pos = len(self.buf)
+                if not self.fill():
+                    return
+        depth = 0
+        while True:
+            match = self.nested_special.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise ValueError("truncated value")
+                continue
+            token = match.group()
+            if token == b'"':
+                self.pos = match.start()
+                self.string(keep=False)
+                continue
+            self.pos = match.end()
+            depth += 1 if token in b"{[" else -1
+            if depth == 0:
+                return
+
+
+def read_hook_event(stream=None, limit: int = EVENT_SCAN_LIMIT) -> Dict[str, str]:
+    """Pull EVENT_FIELDS from the hook's JSON payload without buffering it.
+
+    Scans the top-level object only until every wanted field has been seen
+    (or limit bytes were read), then drains the rest of the stream in
+    fixed-size chunks. Malformed or truncated input yields whatever fields
+    were found before the problem.
+    """
+    if stream is None:
+        stream = getattr(sys.stdin, "buffer", None)
+        if stream is None:
+            return {}
+
+    fields: Dict[str, str] = {}
+    reader = _EventReader(stream, limit)
+    try:
+        reader.expect(b"{")
+        while reader.peek() not in (None, ord("}")):
+            key = reader.string(keep=True)
+            reader.expect(b":")
+            name = key.decode("utf-8", "replace") if key is not None else ""
+            if (name in EVENT_FIELDS or name in EVENT_OPTIONAL_FIELDS) \
+                    and reader.peek() == ord('"'):
+                raw = reader.string(keep=True)
+                if raw is not None:
+                    fields[name] = json.loads(b'"' + raw + b'"')
+            else:
+                reader.skip_value()
+            if all(field in fields for field in EVENT_FIELDS):
+                break
+            if reader.peek() == ord(","):
+                reader.pos += 1
+    except (ValueError, UnicodeDecodeError) as e:
+        log_debug("Stopped reading hook payload: %s", e)
+
+    try:
+        while stream.read(65536):
+            pass
+    except (OSError, ValueError):
+        pass
+    log_debug("Hook payload fields: %s (%s bytes scanned)", fields, reader.scanned)
+    return fields
+
+
+def event_hook_type(event: Dict[str, str]) -> Optional[str]:
+    """Map a payload's hook_event_name to the hook type that handles it."""
+    return EVENT_HOOK_TYPES.get(event.get("hook_event_name", ""))
+
+# =============================================================================
+# EARLY DETACH
+# =============================================================================
+
+# With detach on, a one-shot hook returns to Claude Code as soon as it has
+# decided the event is enabled and not debounced; a detached grandchild
+# selects, queues or plays the sound.
+DETACH_ENV = os.environ.get("CLAUDE_HOOKS_DETACH", "").lower()
+
+
+def should_detach() -> bool:
+    """Whether this event's remaining work should move to a detached process."""
+    if _IN_BACKGROUND[0] or not hasattr(os, "fork") or not hasattr(os, "setsid"):
+        return False
+    if DETACH_ENV in ("1", "true", "yes"):
+        return True
+    if DETACH_ENV in ("0", "false", "no"):
+        return False
+    return get_config_snapshot()["detach"]
+
+
+def detach() -> bool:
+    """Double-fork so the rest of the event runs outside the hook process.
+
+    Returns True in the original process, which should return at once, and
+    False in the detached grandchild, which carries on with the event. The
+    grandchild starts a new session and points stdio at os.devnull, so
+    Claude Code is not kept waiting on its pipes either. It then blocks on
+    a pipe until the hook process has exited, so its work never competes
+    with the exit Claude Code is waiting for. If a fork fails, the event
+    carries on attached.
+    """
+    flush_logs()
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except (AttributeError, OSError, ValueError):
+            pass
+    try:
+        exit_barrier, exit_signal = os.pipe()
+    except OSError as e:
+        log_debug("Could not detach, running attached: %s", e)
+        return False
+    try:
+        pid = os.fork()
+    except OSError as e:
+        os.close(exit_barrier)
+        os.close(exit_signal)
+        log_debug("Could not detach, running attached: %s", e)
+        return False
+    if pid:
+        # The write end stays open until this process exits
+        os.close(exit_barrier)
+        # The intermediate child exits straight away; reap it
+        os.waitpid(pid, 0)
+        _PROFILE_STATUS[0] = "DETACHED"
+        return True
+
+    os.close(exit_signal)
+    # Let go of Claude Code's pipes before anything else, so they close
+    # as soon as the hook process exits
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    if devnull > 2:
+        os.close(devnull)
+    try:
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+    except OSError:
+        # Carry on here; the hook process then waits for the event as usual
+        pass
+    else:
+        # Reads EOF once the hook process has exited
+        try:
+            os.read(exit_barrier, 1)
+        except OSError:
+            pass
+    os.close(exit_barrier)
+    # The hook process already recorded the phases it waited for
+    del _PROFILE_PHASES[:]
+    return False
+
+# =============================================================================
+# MAIN HOOK EXECUTION
+# =============================================================================
+
+def run_hook(hook_type: str, event: Optional[Dict[str, str]] = None) -> int:
+    """
+    Main hook execution function.
+
+    Hands the event (and the payload fields read by read_hook_event()) to
+    the playback daemon when one is running, otherwise handles it in this
+    process.
+
+    Returns:
+        0 on success (hook executed or disabled)
+        Non-zero on error
+    """
+    with profile_phase("daemon_send"):
+        sent = send_to_daemon({"hook": hook_type, "event": event or {}})
+    if sent:
+        return 0
+    return run_hook_local(hook_type, event)
+
+
+def run_hook_local(hook_type: str, event: Optional[Dict[str, str]] = None) -> int:
+    """Handle a hook event in the current process."""
+    _EVENT_START[0] = time.perf_counter()
+    event = event or {}
+    begin_session(hook_type, event)
+    log_debug("=== Running hook: %s ===", hook_type)
+    if event.get("tool_name"):
+        log_debug("Tool: %s", event["tool_name"])
+    log_debug("Project dir: %s", PROJECT_DIR)
+    log_debug("Audio dir: %s", AUDIO_DIR)
+    log_debug("Queue dir: %s", QUEUE_DIR)
+
+    # Check if hook is enabled
+    with profile_phase("config"):
+        enabled = is_hook_enabled(hook_type)
+    if not enabled:
+        log_trigger(hook_type, "DISABLED")
+        return 0
+
+    # Check debounce
+    with profile_phase("debounce"):
+        debounced = should_debounce(hook_type)
+    if debounced:
+        log_trigger(hook_type, "DEBOUNCED")
+        return 0
+
+    # Everything after the decision can happen after Claude Code moves on
+    if should_detach():
+        with profile_phase("detach"):
+            detached = detach()
+        if detached:
+            return 0
+
+    # Get audio file
+    with profile_phase("select_audio"):
+        audio_file = get_audio_file(hook_type, event)
+
+    if not audio_file:
+        log_trigger(hook_type, "NO_AUDIO_CONFIG")
+        return 0
+
+    if not audio_file.exists():
+        log_trigger(hook_type, "FILE_NOT_FOUND", str(audio_file))
+        log_error("Audio file not found: %s", audio_file)
+        return 0
+
+    with profile_phase("rate_limit"):
+        limited = apply_rate_limit(hook_type, audio_file)
+    if limited:
+        log_trigger(hook_type, limited, audio_file.name)
+        return 0
+
+    # Hand the sound to the queue worker so sounds never overlap
+    if is_queue_enabled():
+        try:
+            with profile_phase("enqueue"):
+                status = enqueue_playback(hook_type, audio_file)
+            log_trigger(hook_type, status, audio_file.name)
+            return 0
+        except OSError as e:
+            log_error("Playback queue unavailable, playing directly: %s", e)
+
+    # Play audio, unless max_players are already playing
+    if not reserve_player_slot(hook_type):
+        log_trigger(hook_type, "BUSY", audio_file.name)
+        return 0
+    with profile_phase("play"):
+        success = play_audio(audio_file)
+
+    if success:
+        log_trigger(hook_type, "PLAYED", audio_file.name)
+    else:
+        log_trigger(hook_type, "PLAY_FAILED", audio_file.name)
+        log_error("Failed to play audio: %s", audio_file)
+
+    return 0
+
+
+def resolve_hook(hook_type: str, event: Optional[Dict[str, str]] = None) -> str:
+    """Make every per-event decision for the bash hooks in one call.
+
+    Returns a single tab-separated line: enabled, queued, debounced, audio
+    path. The flags are "1"/"0"; the audio path is empty when the hook is
+    disabled, debounced, rate limited or has no playable file, and
+    "debounced" is also 1 for a rate-limited event. Updates the debounce
+    timestamp and token bucket exactly like run_hook_local() does.
+
+    When the queue is enabled the sound is handed to the playback queue here
+    and "queued" is 1, so the caller only plays it itself when it is 0.
+    """
+    begin_session(hook_type, event)
+    with profile_phase("config"):
+        enabled = is_hook_enabled(hook_type)
+    debounced = False
+    audio = ""
+
+    if enabled:
+        with profile_phase("debounce"):
+            debounced = should_debounce(hook_type)
+
+    if not enabled:
+        log_trigger(hook_type, "DISABLED")
+    elif debounced:
+        log_trigger(hook_type, "DEBOUNCED")
+    else:
+        with profile_phase("select_audio"):
+            audio_file = get_audio_file(hook_type, event)
+        if not audio_file:
+            log_trigger(hook_type, "NO_AUDIO_CONFIG")
+        elif not audio_file.exists():
+            log_trigger(hook_type, "FILE_NOT_FOUND", str(audio_file))
+        else:
+            with profile_phase("rate_limit"):
+                limited = apply_rate_limit(hook_type, audio_file)
+            if limited:
+                debounced = True
+                log_trigger(hook_type, limited, audio_file.name)
+            else:
+                audio = str(audio_file)
+
+    queued = False
+    if audio and is_queue_enabled():
+        try:
+            with profile_phase("enqueue"):
+                status = enqueue_playback(hook_type, Path(audio))
+            log_trigger(hook_type, status, Path(audio).name)
+            queued = True
+        except OSError as e:
+            log_error("Playback queue unavailable: %s", e)
+
+    return "\t".join([
+        "1" if enabled else "0",
+        "1" if queued else "0",
+        "1" if debounced else "0",
+        audio,
+    ])
+
+def run_playlist(items: List[str]) -> int:
+    """Play hook sounds or audio files back to back (`--playlist`).
+
+    Each item is a hook type (its configured sound) or a file path. A line
+    is printed as each clip starts; the call returns once the last clip has
+    finished, so callers need no fixed sleeps.
+    """
+    files: List[Path] = []
+    for item in items:
+        hook_type = item.lower().replace("-", "_")
+        audio_file = get_audio_file(hook_type) if hook_type in DEFAULT_AUDIO_FILES else Path(item)
+        if not audio_file or not audio_file.exists():
+            print(f"Skipping {item}: audio file not found", file=sys.stderr)
+            continue
+        files.append(audio_file)
+    if not files:
+        return 1
+
+    def _started(index: int) -> None:
+        duration = get_audio_duration(files[index])
+        length = f"{duration:.1f}s" if duration is not None else "unknown length"
+        print(f"  Playing {files[index].name} ({length})", flush=True)
+
+    if play_playlist(files, on_start=_started):
+        return 0
+    played = True
+    for index, audio_file in enumerate(files):
+        _started(index)
+        played = play_and_wait(audio_file) and played
+    return 0 if played else 1
+
+# =============================================================================
+# DAEMON MODE
+# =============================================================================
+
+DAEMON_SOCKET = QUEUE_DIR / "daemon.sock"
+
+# Clients give up quickly so a wedged daemon can never stall Claude Code
+DAEMON_CLIENT_TIMEOUT = 0.25
+
+# How often the daemon wakes up to reap finished players when idle
+DAEMON_IDLE_TICK = 1.0
+
+MAX_DAEMON_MESSAGE = 64 * 1024
+
+
+def send_to_daemon(message: Dict[str, Any]) -> bool:
+    """Send one message to the playback daemon.
+
+    Returns True only if the daemon acknowledged it. Any failure (no daemon,
+    stale socket, unsupported platform, timeout) returns False so the caller
+    can fall back to in-process handling.
+    """
+    if os.environ.get("CLAUDE_HOOKS_NO_DAEMON", "").lower() in ("1", "true", "yes"):
+        return False
+    # Cheap pre-check so the common no-daemon case never imports socket
+    if not os.path.exists(str(DAEMON_SOCKET)):
+        return False
+
+    import socket
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(DAEMON_CLIENT_TIMEOUT)
+        sock.connect(str(DAEMON_SOCKET))
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        ack = sock.recv(16)
+        return ack.startswith(b"OK")
+    except (OSError, ValueError) as e:
+        log_debug("Daemon unavailable: %s", e)
+        return False
+    finally:
+        sock.close()
+
+
+def _read_daemon_message(conn) -> Optional[Dict[str, Any]]:
+    """Read a single newline-terminated JSON message from a client."""
+    data = b""
+    while b"\n" not in data and len(data) < MAX_DAEMON_MESSAGE:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    try:
+        message = json.loads(data.split(b"\n", 1)[0].decode("utf-8"))
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+def run_daemon() -> int:
+    """Run the persistent playback daemon in the foreground.
+
+    Config, resolved paths and player processes stay in memory, so each
+    event costs a socket round-trip instead of a full hook_runner start.
+    """
+    import signal
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: daemon mode requires Unix domain sockets", file=sys.stderr)
+        return 1
+
+    if send_to_daemon({"cmd": "ping"}):
+        print(f"Daemon already running on {DAEMON_SOCKET}", file=sys.stderr)
+        return 1
+
+    # A socket file left behind by a crashed daemon would block bind()
+    try:
+        DAEMON_SOCKET.unlink()
+    except FileNotFoundError:
+        pass
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Create the socket private: a chmod after bind() leaves a window in
+    # which other users could connect
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(str(DAEMON_SOCKET))
+    except OSError as e:
+        log_error("Daemon failed to bind %s: %s", DAEMON_SOCKET, e)
+        print(f"Error: cannot bind {DAEMON_SOCKET}: {e}", file=sys.stderr)
+        server.close()
+        return 1
+    finally:
+        os.umask(old_umask)
+    os.chmod(str(DAEMON_SOCKET), 0o600)
+    server.listen(64)
+    server.settimeout(DAEMON_IDLE_TICK)
+
+    running = [True]
+    # Events are acknowledged before they are handled
+    _IN_BACKGROUND[0] = True
+    start_log_flusher()
+
+    def _stop(signum, frame):
+        running[0] = False
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    log_debug("Daemon listening on %s (PID: %s)", DAEMON_SOCKET, os.getpid())
+    try:
+        while running[0]:
+            if reap_players():
+                supervise_players()
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except InterruptedError:
+                continue
+
+            with conn:
+                try:
+                    conn.settimeout(DAEMON_CLIENT_TIMEOUT)
+                    message = _read_daemon_message(conn)
+                    if message is None:
+                        conn.sendall(b"ERR\n")
+                        continue
+                    # Acknowledge before doing any work: the client only
+                    # needs to know the event was accepted.
+                    conn.sendall(b"OK\n")
+                except OSError as e:
+                    log_debug("Daemon client error: %s", e)
+                    continue
+
+            cmd = message.get("cmd")
+            if cmd == "stop":
+                running[0] = False
+            elif cmd is None and message.get("hook"):
+                begin_profile()
+                refresh_config_snapshot()
+                try:
+                    event = message.get("event")
+                    run_hook_local(str(message["hook"]), event if isinstance(event, dict) else None)
+                except Exception as e:
+                    log_error("Daemon failed to handle %s: %s", message.get("hook"), e)
+                flush_profile(str(message["hook"]))
+    finally:
+        server.close()
+        try:
+            DAEMON_SOCKET.unlink()
+        except OSError:
+            pass
+        log_debug("Daemon stopped")
+
+    return 0
+
+
+def stop_daemon() -> int:
+    """Ask a running daemon to shut down."""
+    if send_to_daemon({"cmd": "stop"}):
+        print("Daemon stopped")
+        return 0
+    print("No daemon running", file=sys.stderr)
+    return 1
+
+
+def main() -> int:
+    """Main entry point."""
+    add_phase("module", _MODULE_START, time.perf_counter())
+
+    # Check Python version
+    if sys.version_info < (3, 6):
+        print("Error: Python 3.6 or higher is required", file=sys.stderr)
+        return 1
+
+    if len(sys.argv) < 2:
+        print("Usage: python hook_runner.py <hook_type>", file=sys.stderr)
+        print("       python hook_runner.py --daemon | --stop-daemon", file=sys.stderr)
+        print("       python hook_runner.py --resolve <hook_type>", file=sys.stderr)
+        print("       python hook_runner.py --event  (hook type from the stdin payload)", file=sys.stderr)
+        print("       python hook_runner.py --playlist <hook_type|file>...", file=sys.stderr)
+        print("       python hook_runner.py --manifest  (audio assets and problems as JSON)", file=sys.stderr)
+        print("       python hook_runner.py --ingest-history  (store spooled trigger history)", file=sys.stderr)
+        print("Hook types: notification, stop, pretooluse, posttooluse, userpromptsubmit,", file=sys.stderr)
+        print("            subagent_stop, precompact, session_start, session_end", file=sys.stderr)
+        print("\nEnvironment variables:", file=sys.stderr)
+        print("  CLAUDE_HOOKS_DEBUG=1      Enable debug logging", file=sys.stderr)
+        print("  CLAUDE_HOOKS_LOG_LEVEL=L  debug, info, error or off", file=sys.stderr)
+        print("  CLAUDE_HOOKS_NO_DAEMON=1  Never hand events to the daemon", file=sys.stderr)
+        print("  CLAUDE_HOOKS_DETACH=1|0   Return before playback (overrides the config)", file=sys.stderr)
+        print("  CLAUDE_HOOKS_LOG_DIR=DIR  Write logs and trigger history to DIR", file=sys.stderr)
+        print("  CLAUDE_HOOKS_ENV_CACHE=F  Cache the resolved environment in F", file=sys.stderr)
+        print("  CLAUDE_HOOKS_PROFILE=1    Record per-phase timings in profile.log", file=sys.stderr)
+        return 1
+
+    if sys.argv[1] == "--daemon":
+        return run_daemon()
+    if sys.argv[1] == "--stop-daemon":
+        return stop_daemon()
+    if sys.argv[1] == "--drain-queue":
+        return drain_queue()
+    if sys.argv[1] == "--manifest":
+        return print_audio_manifest()
+    if sys.argv[1] == "--ingest-history":
+        print(ingest_history())
+        return 0
+    if sys.argv[1] == "--playlist":
+        if len(sys.argv) < 3:
+            print("Usage: python hook_runner.py --playlist <hook_type|file>...", file=sys.stderr)
+            return 1
+        return run_playlist(sys.argv[2:])
+    if sys.argv[1] == "--resolve":
+        if len(sys.argv) < 3:
+            print("Usage: python hook_runner.py --resolve <hook_type>", file=sys.stderr)
+            return 1
+        hook_type = sys.argv[2].lower().replace("-", "_")
+        # The bash hooks pass Claude Code's payload through for its session_id
+        event = {}
+        if sys.stdin is not None and not sys.stdin.isatty():
+            with profile_phase("read_event"):
+                event = read_hook_event()
+        print(resolve_hook(hook_type, event))
+        flush_profile(hook_type)
+        return 0
+
+    # Read the fields we need from Claude Code's JSON input and drain the
+    # rest so the writer never blocks
+    with profile_phase("read_event"):
+        event = read_hook_event()
+
+    if sys.argv[1] == "--event":
+        hook_type = event_hook_type(event)
+        if hook_type is None:
+            log_error("Cannot route hook event: %r", event.get("hook_event_name"))
+            return 0
+    else:
+        hook_type = sys.argv[1].lower().replace("-", "_")
+
+    log_debug("Hook runner started: %s", hook_type)
+    log_debug("Python version: %s", sys.version)
+    if log_enabled("debug"):
+        import platform
+        log_debug("Platform: %s %s", platform.system(), platform.release())
+
+    result = run_hook(hook_type, event)
+    flush_profile(hook_type)
+    return result
+
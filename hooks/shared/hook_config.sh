@@ -54,6 +54,9 @@ PROJECT_DIR="$(get_project_dir)"
 AUDIO_DIR="$PROJECT_DIR/audio"
 CONFIG_FILE="$PROJECT_DIR/config/user_preferences.json"
 
+# Python hook runner (installed next to the shared/ directory)
+HOOK_RUNNER="$(dirname "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)")/hook_runner.py"
+
 # Cross-platform temp directory
 if [[ "$OSTYPE" == "msys" ]] || [[ "$OSTYPE" == "mingw"* ]] || [[ "$OSTYPE" == "cygwin" ]]; then
     # Windows (Git Bash, MSYS2, Cygwin) - use Windows TEMP
@@ -63,36 +66,78 @@ else
     QUEUE_DIR="/tmp/claude_audio_hooks_queue"
 fi
 LOCK_FILE="$QUEUE_DIR/audio.lock"
+# How long a queued sound waits for the audio lock before playing anyway
+AUDIO_LOCK_WAIT_SECONDS=10
 
 # Debug mode (set CLAUDE_HOOKS_DEBUG=1 to enable)
 CLAUDE_HOOKS_DEBUG="${CLAUDE_HOOKS_DEBUG:-}"
 
+# Logs roll over to numbered segments (file.log.1, file.log.2, ...) past a
+# size limit, matching hook_runner.py; only the newest segments are kept
+LOG_KEEP_SEGMENTS=3
+
+# Append one line to a log, rotating it once it exceeds max_bytes
+append_log() {
+    local log_file="$1"
+    local max_bytes="$2"
+    local line="$3"
+
+    echo "$line" >> "$log_file"
+
+    local size
+    size=$(wc -c < "$log_file" 2>/dev/null) || return 0
+    size="${size//[[:space:]]/}"
+    if ! [[ "$size" =~ ^[0-9]+$ ]] || (( size <= max_bytes )); then
+        return 0
+    fi
+
+    # Another hook may have rotated it first
+    local private="$log_file.rotating-$$"
+    mv "$log_file" "$private" 2>/dev/null || return 0
+
+    local seg num max=0
+    for seg in "$log_file".[0-9]*; do
+        num="${seg##*.}"
+        if [[ "$num" =~ ^[0-9]+$ ]] && (( 10#$num > max )); then
+            max=$(( 10#$num ))
+        fi
+    done
+
+    # ln refuses to replace a segment another hook has just created
+    local next=$(( max + 1 ))
+    while ! ln "$private" "$log_file.$next" 2>/dev/null; do
+        if [ ! -e "$log_file.$next" ]; then
+            mv -f "$private" "$log_file.$next" 2>/dev/null
+            break
+        fi
+        next=$(( next + 1 ))
+    done
+    rm -f "$private" 2>/dev/null
+
+    for seg in "$log_file".[0-9]*; do
+        num="${seg##*.}"
+        if [[ "$num" =~ ^[0-9]+$ ]] && (( 10#$num <= next - LOG_KEEP_SEGMENTS )); then
+            rm -f "$seg" 2>/dev/null
+        fi
+    done
+}
+
 # Debug logging function
 log_debug() {
     if [[ "$CLAUDE_HOOKS_DEBUG" == "1" ]] || [[ "$CLAUDE_HOOKS_DEBUG" == "true" ]]; then
-        local log_dir="$QUEUE_DIR/logs"
+        local log_dir="${CLAUDE_HOOKS_LOG_DIR:-$QUEUE_DIR/logs}"
         mkdir -p "$log_dir" 2>/dev/null
-        local log_file="$log_dir/debug.log"
         local timestamp=$(date '+%Y-%m-%d %H:%M:%S')
-        echo "$timestamp | DEBUG | $1" >> "$log_file"
-        # Keep only last 500 lines
-        if [ -f "$log_file" ]; then
-            tail -500 "$log_file" > "$log_file.tmp" 2>/dev/null && mv "$log_file.tmp" "$log_file" 2>/dev/null || true
-        fi
+        append_log "$log_dir/debug.log" 262144 "$timestamp | DEBUG | $1"
     fi
 }
 
 # Error logging function (always logged)
 log_error() {
-    local log_dir="$QUEUE_DIR/logs"
+    local log_dir="${CLAUDE_HOOKS_LOG_DIR:-$QUEUE_DIR/logs}"
     mkdir -p "$log_dir" 2>/dev/null
-    local log_file="$log_dir/errors.log"
     local timestamp=$(date '+%Y-%m-%d %H:%M:%S')
-    echo "$timestamp | ERROR | $1" >> "$log_file"
-    # Keep only last 200 lines
-    if [ -f "$log_file" ]; then
-        tail -200 "$log_file" > "$log_file.tmp" 2>/dev/null && mv "$log_file.tmp" "$log_file" 2>/dev/null || true
-    fi
+    append_log "$log_dir/errors.log" 65536 "$timestamp | ERROR | $1"
 }
 
 # =============================================================================
@@ -251,6 +296,40 @@ EOF
     fi
 }
 
+# Resolve every per-event decision with a single Python launch
+# Prints one tab-separated line: enabled, queued, debounced, audio path
+# (queued=1 means hook_runner.py already handed the sound to its playback queue)
+# Returns non-zero if no working Python/hook_runner.py is available
+resolve_hook() {
+    local hook_type="$1"
+
+    if [ ! -f "$HOOK_RUNNER" ]; then
+        return 1
+    fi
+
+    local runner_for_python=$(convert_path_for_python "$HOOK_RUNNER")
+
+    # Try candidates directly instead of probing "--version" first, so the
+    # common case costs exactly one interpreter launch. A Python 2 interpreter
+    # fails to compile the runner and we move on to the next candidate.
+    local cmd line
+    for cmd in "$CLAUDE_HOOKS_PYTHON_CMD" python3 python py; do
+        [ -n "$cmd" ] || continue
+        command -v "$cmd" &> /dev/null || continue
+        # With profiling on, EPOCHREALTIME (bash 5) lets the runner time its own start-up
+        line=$(CLAUDE_HOOKS_PROFILE_START="${CLAUDE_HOOKS_PROFILE:+${EPOCHREALTIME:-}}" \
+            "$cmd" "$runner_for_python" --resolve "$hook_type" 2>/dev/null) || continue
+        case "$line" in
+            [01]$'\t'*)
+                echo "$line"
+                return 0
+                ;;
+        esac
+    done
+
+    return 1
+}
+
 # =============================================================================
 # AUDIO PLAYBACK FUNCTIONS
 # =============================================================================
@@ -457,75 +536,133 @@ except:
 EOF
 }
 
+# Take the audio lock atomically (noclobber) and record the owner's PID
+# The PID is written by the same redirect that creates the file, so a lock
+# is only ever empty for an instant; a lock whose owner is no longer
+# running is stale and gets taken over
+acquire_audio_lock() {
+    local owner_pid="${1:-$$}"
+
+    if ( set -C; echo "$owner_pid" > "$LOCK_FILE" ) 2>/dev/null; then
+        return 0
+    fi
+
+    local owner=""
+    read -r owner < "$LOCK_FILE" 2>/dev/null
+    if [ -z "$owner" ]; then
+        # Its creator may not have written its PID yet; look again
+        sleep 0.1
+        read -r owner < "$LOCK_FILE" 2>/dev/null
+    fi
+    if [[ "$owner" =~ ^[0-9]+$ ]] && kill -0 "$owner" 2>/dev/null; then
+        return 1  # Held by a live process
+    fi
+
+    log_debug "Removing stale audio lock (owner: ${owner:-unknown})"
+    rm -f "$LOCK_FILE"
+    ( set -C; echo "$owner_pid" > "$LOCK_FILE" ) 2>/dev/null
+}
+
 # Play audio with queue management (prevents overlapping sounds)
+# Optional second argument: queue flag ("1"/"0") already resolved by the caller
+# Used when Python is unavailable; hook_runner.py has a real FIFO queue
 play_audio_queued() {
     local audio_file="$1"
+    local queue_flag="$2"
 
     # Initialize queue directory
     init_queue
 
     # Check if queue is enabled
-    if ! is_queue_enabled; then
+    if [ -z "$queue_flag" ]; then
+        is_queue_enabled && queue_flag="1" || queue_flag="0"
+    fi
+    if [ "$queue_flag" != "1" ]; then
         # Queue disabled, play directly
         play_audio_internal "$audio_file"
         return $?
     fi
 
-    # Implement simple lock-based queue
-    local max_wait=10  # Maximum wait time in seconds
-    local waited=0
-
-    while [ -f "$LOCK_FILE" ] && [ $waited -lt $max_wait ]; do
-        sleep 0.1
-        waited=$((waited + 1))
-    done
-
-    # If still locked after max wait, play anyway (avoid hanging)
-    if [ $waited -ge $max_wait ]; then
-        play_audio_internal "$audio_file" &
-        return 0
-    fi
-
-    # Acquire lock
-    touch "$LOCK_FILE"
-
-    # Play audio
-    play_audio_internal "$audio_file"
-    local result=$?
-
-    # Wait for playback to complete (estimated based on typical audio length)
-    sleep 3
+    # Wait for the lock in the background so the hook returns at once. The
+    # waiting process owns the lock and releases it when its player exits;
+    # a sound still waiting after AUDIO_LOCK_WAIT_SECONDS plays anyway
+    # rather than being lost
+    (
+        # $BASHPID needs bash 4; sh's parent is this subshell on bash 3
+        local owner="${BASHPID:-$(exec sh -c 'echo "$PPID"')}"
+        local tries=0
+        local max_tries=$(( AUDIO_LOCK_WAIT_SECONDS * 10 ))
+
+        while ! acquire_audio_lock "$owner"; do
+            if (( tries >= max_tries )); then
+                log_debug "Audio lock still busy after ${AUDIO_LOCK_WAIT_SECONDS}s, playing $audio_file anyway"
+                play_audio_internal "$audio_file"
+                wait
+                exit 0
+            fi
+            sleep 0.1
+            tries=$(( tries + 1 ))
+        done
 
-    # Release lock
-    rm -f "$LOCK_FILE"
+        play_audio_internal "$audio_file"
+        wait
+        rm -f "$LOCK_FILE"
+    ) > /dev/null 2>&1 &
 
-    return $result
+    return 0
 }
 
 # =============================================================================
 # DEBOUNCE SYSTEM
 # =============================================================================
 
+# Set NOW_MS to the current time in milliseconds
+# Uses $EPOCHREALTIME (bash 5+) to avoid forking; falls back to whole seconds
+_now_ms() {
+    if [ -n "$EPOCHREALTIME" ]; then
+        local now="${EPOCHREALTIME/[.,]/}"
+        NOW_MS=$(( 10#$now / 1000 ))
+    else
+        NOW_MS=$(( $(date +%s) * 1000 ))
+    fi
+}
+
 # Check if we should debounce (skip) this notification
+# Timestamps are stored as fractional seconds, compatible with hook_runner.py
 should_debounce() {
     local hook_type="$1"
     local debounce_file="$QUEUE_DIR/${hook_type}_last_played"
     local debounce_ms=$(get_debounce_ms)
-    local debounce_sec=$(echo "scale=3; $debounce_ms / 1000" | bc 2>/dev/null || echo "0.5")
+    if ! [[ "$debounce_ms" =~ ^[0-9]+$ ]]; then
+        debounce_ms=500
+    fi
+
+    [ -d "$QUEUE_DIR" ] || init_queue
+
+    _now_ms
+    local now_ms=$NOW_MS
 
     # If debounce file exists and is recent, skip
     if [ -f "$debounce_file" ]; then
-        local current_time=$(date +%s.%N)
-        local last_time=$(cat "$debounce_file" 2>/dev/null || echo "0")
-        local time_diff=$(echo "$current_time - $last_time" | bc 2>/dev/null || echo "999")
+        local last=""
+        read -r last < "$debounce_file" 2>/dev/null
+        local last_sec="${last%%.*}"
+        local last_frac="000"
+        if [[ "$last" == *.* ]]; then
+            last_frac="${last#*.}000"
+        fi
+        last_frac="${last_frac:0:3}"
 
-        if (( $(echo "$time_diff < $debounce_sec" | bc -l 2>/dev/null || echo "0") )); then
-            return 0  # Should debounce (skip)
+        if [[ "$last_sec" =~ ^[0-9]+$ ]] && [[ "$last_frac" =~ ^[0-9]+$ ]]; then
+            local last_ms=$(( 10#$last_sec * 1000 + 10#$last_frac ))
+            if (( now_ms - last_ms < debounce_ms )); then
+                return 0  # Should debounce (skip)
+            fi
         fi
     fi
 
     # Update debounce timestamp
-    date +%s.%N > "$debounce_file"
+    printf '%d.%03d\n' $(( now_ms / 1000 )) $(( now_ms % 1000 )) > "$debounce_file" 2>/dev/null
     return 1  # Should not debounce (play)
 }
 
@@ -540,22 +677,42 @@ get_and_play_audio() {
     local default_audio_file="$2"
 
     # Log directory
-    local log_dir="/tmp/claude_hooks_log"
+    local log_dir="${CLAUDE_HOOKS_LOG_DIR:-/tmp/claude_hooks_log}"
     local log_file="$log_dir/hook_triggers.log"
     mkdir -p "$log_dir" 2>/dev/null
 
-    # Check if hook is enabled
-    if ! is_hook_enabled "$hook_type"; then
-        exit 0  # Hook disabled, exit silently
-    fi
+    local audio_file=""
+    local queue_flag=""
+    local resolution
 
-    # Check debounce (prevent rapid-fire notifications)
-    if should_debounce "$hook_type"; then
-        exit 0  # Debounced, exit silently
-    fi
+    if resolution=$(resolve_hook "$hook_type"); then
+        # Fast path: one Python launch answered everything
+        local enabled debounced
+        IFS=$'\t' read -r enabled queue_flag debounced audio_file <<< "$resolution"
 
-    # Get audio file path
-    local audio_file=$(get_audio_file "$hook_type" "$default_audio_file")
+        if [ "$enabled" != "1" ]; then
+            exit 0  # Hook disabled, exit silently
+        fi
+        if [ "$debounced" = "1" ]; then
+            exit 0  # Debounced, exit silently
+        fi
+        if [ -z "$audio_file" ]; then
+            exit 0  # Rate limited or nothing playable, already logged
+        fi
+    else
+        # Check if hook is enabled
+        if ! is_hook_enabled "$hook_type"; then
+            exit 0  # Hook disabled, exit silently
+        fi
+
+        # Check debounce (prevent rapid-fire notifications)
+        if should_debounce "$hook_type"; then
+            exit 0  # Debounced, exit silently
+        fi
+
+        # Get audio file path
+        audio_file=$(get_audio_file "$hook_type" "$default_audio_file")
+    fi
 
     # Verify audio file exists
     if [ ! -f "$audio_file" ]; then
@@ -568,17 +725,16 @@ get_and_play_audio() {
         fi
     fi
 
-    # Log the trigger
-    local timestamp=$(date '+%Y-%m-%d %H:%M:%S')
-    echo "$timestamp | $hook_type | $(basename "$audio_file")" >> "$log_file"
-
-    # Keep only last 200 entries
-    if [ -f "$log_file" ]; then
-        tail -n 200 "$log_file" > "$log_file.tmp" && mv "$log_file.tmp" "$log_file"
+    # Log the trigger (hook_runner.py --resolve has already logged it)
+    if [ -z "$resolution" ]; then
+        local timestamp=$(date '+%Y-%m-%d %H:%M:%S')
+        append_log "$log_file" 65536 "$timestamp | $hook_type | ${audio_file##*/}"
     fi
 
-    # Play audio with queue management
-    play_audio_queued "$audio_file"
+    # Play audio with queue management (unless hook_runner.py already queued it)
+    if [ -z "$resolution" ] || [ "$queue_flag" != "1" ]; then
+        play_audio_queued "$audio_file" "$queue_flag"
+    fi
 
     exit 0
 }
@@ -626,6 +782,7 @@ cleanup_hooks() {
 
 # Export functions for use in hook scripts
 export -f is_hook_enabled
+export -f resolve_hook
 export -f get_audio_file
 export -f play_audio_internal
 export -f play_audio_queued
@@ -637,3 +794,4 @@ export -f cleanup_hooks
 export PROJECT_DIR
 export AUDIO_DIR
 export CONFIG_FILE
+export HOOK_RUNNER
@@ -0,0 +1,105 @@
+"""
+Shared harness for the Python test suites in this directory
+
+sandbox() must run before a suite imports the hook runner: it creates a
+throwaway directory and points the runner's temp dir, logs and environment
+cache into it, so a test run never touches real state or the hooks tree.
+run_test(), print_header() and print_summary() print results the same way
+as test-path-utils.sh.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent.parent
+
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+YELLOW = "\033[1;33m"
+BLUE = "\033[0;34m"
+RESET = "\033[0m"
+
+TESTS = {"run": 0, "passed": 0, "failed": 0}
+
+_SANDBOX = []
+
+
+def sandbox(prefix: str, **env: Optional[str]) -> str:
+    """Create the suite's sandbox and make it the runner's whole world.
+
+    Extra keyword arguments are set as environment variables afterwards;
+    None removes a variable.
+    """
+    path = tempfile.mkdtemp(prefix=prefix)
+    _SANDBOX.append(path)
+    os.environ["TMPDIR"] = path
+    os.environ["CLAUDE_HOOKS_LOG_DIR"] = str(Path(path) / "logs")
+    os.environ["CLAUDE_HOOKS_ENV_CACHE"] = str(Path(path) / "env_cache.json")
+    for name, value in env.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    sys.path.insert(0, str(PROJECT_DIR / "hooks"))
+    return path
+
+
+def remove_sandbox() -> None:
+    # Flush now so the runner's exit-time flush does not recreate the logs
+    runner = sys.modules.get("audio_hooks.runner")
+    if runner:
+        runner.flush_logs()
+    for path in _SANDBOX:
+        shutil.rmtree(path, ignore_errors=True)
+    del _SANDBOX[:]
+
+
+def run_test(name, condition, details=""):
+    TESTS["run"] += 1
+    print(f"Testing {name}... ", end="")
+    if condition:
+        print(f"{GREEN}✓ PASS{RESET}")
+        TESTS["passed"] += 1
+    else:
+        print(f"{RED}✗ FAIL{RESET}")
+        if details:
+            print(f"  {details}")
+        TESTS["failed"] += 1
+
+
+def print_header(title: str) -> None:
+    print("")
+    print("================================================")
+    print(f"  {title}")
+    print("================================================")
+    print("")
+
+
+def print_summary() -> int:
+    """Print the totals; returns the suite's exit code."""
+    print_header("Test Results")
+    print(f"Tests Run:   {TESTS['run']}")
+    print(f"Passed:      {TESTS['passed']}")
+    print(f"Failed:      {TESTS['failed']}")
+    print("")
+
+    if TESTS["failed"] == 0:
+        print(f"{GREEN}✓ All tests passed!{RESET}")
+        return 0
+    print(f"{RED}✗ Some tests failed{RESET}")
+    return 1
+
+
+def run(main: Callable[[], int], cleanup: Optional[Callable[[], None]] = None) -> None:
+    """Run a suite's main(), then clean up and exit with its status."""
+    try:
+        sys.exit(main())
+    finally:
+        if cleanup:
+            cleanup()
+        remove_sandbox()
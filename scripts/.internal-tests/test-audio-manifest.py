@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the audio asset manifest
+Builds a small audio tree with good, missing and broken assets and checks
+the scan, the incremental refresh and the lookups that use it
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import wave
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("manifest_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+AUDIO = Path(SANDBOX) / "audio"
+SOURCE = PROJECT_DIR / "audio" / "default"
+PROBED = []
+
+
+def make_wav(path, seconds):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\0\0" * int(8000 * seconds))
+
+
+def touch_dir(directory):
+    """Move a directory's mtime on, whatever the filesystem's granularity."""
+    stat = directory.stat()
+    os.utime(str(directory), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+
+def build_tree():
+    (AUDIO / "default").mkdir(parents=True)
+    (AUDIO / "custom").mkdir()
+    for name in ("task-complete.mp3", "notification-urgent.mp3"):
+        shutil.copy(str(SOURCE / name), str(AUDIO / "default" / name))
+    make_wav(AUDIO / "custom" / "beep.wav", 0.5)
+    (AUDIO / "custom" / "garbage.mp3").write_bytes(b"this is not audio at all")
+    (AUDIO / "custom" / "empty.mp3").write_bytes(b"")
+    make_wav(AUDIO / "custom" / "renamed.mp3", 0.2)
+    (AUDIO / "custom" / ".gitkeep").write_bytes(b"")
+
+
+def counting_probe(original):
+    def probe(path, stat):
+        PROBED.append(os.path.basename(path))
+        return original(path, stat)
+    return probe
+
+
+def main():
+    print_header("Audio Manifest Test Suite")
+
+    build_tree()
+    hook_runner.AUDIO_DIR = AUDIO
+    hook_runner._probe_asset = counting_probe(hook_runner._probe_asset)
+
+    manifest = hook_runner.refresh_audio_manifest()
+    assets = {Path(path).name: asset for path, asset in manifest["assets"].items()}
+    urgent = assets.get("notification-urgent.mp3", {})
+    data = (SOURCE / "notification-urgent.mp3").read_bytes()
+    run_test("one scan finds every asset",
+             sorted(assets) == ["beep.wav", "empty.mp3", "garbage.mp3", "notification-urgent.mp3",
+                                "renamed.mp3", "task-complete.mp3"], f"got {sorted(assets)}")
+    run_test("MP3 entry has size, hash, codec and length",
+             urgent.get("size") == len(data) and urgent.get("codec") == "mp3"
+             and urgent.get("duration") == round(hook_runner.parse_mp3_duration(data), 3)
+             and len(urgent.get("sha1") or "") == 40 and "problem" not in urgent, f"got {urgent}")
+    run_test("WAV entry is decoded", assets["beep.wav"]["codec"] == "wav" and assets["beep.wav"]["duration"] == 0.5,
+             f"got {assets['beep.wav']}")
+
+    problems = {Path(item["path"]).name: item["problem"] for item in hook_runner.audio_manifest_problems(manifest)}
+    run_test("corrupt, empty and misnamed files are flagged",
+             "recognised" in problems.get("garbage.mp3", "") and problems.get("empty.mp3") == "empty file"
+             and "wav data" in problems.get("renamed.mp3", ""), f"got {problems}")
+    run_test("missing default assets are flagged",
+             problems.get("session-start.mp3") == "missing"
+             and "task-complete.mp3" not in problems, f"got {problems}")
+
+    # Unchanged directories are not listed or probed again, and nothing is rewritten
+    written = hook_runner.AUDIO_MANIFEST_FILE.stat().st_mtime_ns
+    PROBED.clear()
+    hook_runner._AUDIO_MANIFEST["manifest"] = None
+    again = hook_runner.refresh_audio_manifest()
+    run_test("unchanged tree is reused from the file", PROBED == [] and again == manifest
+             and hook_runner.AUDIO_MANIFEST_FILE.stat().st_mtime_ns == written, f"probed {PROBED}")
+
+    make_wav(AUDIO / "custom" / "new.wav", 0.25)
+    (AUDIO / "custom" / "empty.mp3").unlink()
+    touch_dir(AUDIO / "custom")
+    PROBED.clear()
+    manifest = hook_runner.refresh_audio_manifest()
+    names = sorted(Path(path).name for path in manifest["assets"])
+    run_test("a changed directory only probes new files", PROBED == ["new.wav"], f"probed {PROBED}")
+    run_test("removed files leave the manifest", "empty.mp3" not in names and "new.wav" in names, f"got {names}")
+
+    # Lookups answer from the manifest
+    hook_runner.refresh_config_snapshot()
+    resolved = hook_runner._resolve_audio_path("custom/garbage.mp3", "task-complete.mp3")
+    run_test("broken custom sound falls back to the default",
+             resolved == str(AUDIO / "default" / "task-complete.mp3"), f"got {resolved}")
+    run_test("playable custom sound is used",
+             hook_runner._resolve_audio_path("custom/beep.wav", "task-complete.mp3") == str(AUDIO / "custom" / "beep.wav"))
+    outside = Path(SANDBOX) / "outside.mp3"
+    outside.write_bytes(data)
+    run_test("files outside the tree get an existence check",
+             hook_runner.asset_problem(outside) is None
+             and hook_runner.asset_problem(Path(SANDBOX) / "nope.mp3") == "not found")
+    run_test("hash and length come from the manifest",
+             hook_runner.get_content_hash(AUDIO / "default" / "notification-urgent.mp3") == urgent["sha1"]
+             and hook_runner.get_audio_duration(AUDIO / "custom" / "new.wav") == 0.25
+             and not hook_runner.AUDIO_INFO_CACHE_FILE.exists())
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        hook_runner.print_audio_manifest()
+    printed = json.loads(output.getvalue())
+    run_test("--manifest prints assets and problems",
+             len(printed["assets"]) == len(manifest["assets"]) and len(printed["problems"]) >= 3)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
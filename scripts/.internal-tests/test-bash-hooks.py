@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for the bash hook library
+Sources hooks/shared/hook_config.sh with a recording player and checks the
+single hook_runner.py --resolve call, the per-setting fallback used when
+the runner or Python is unavailable, and the fallback's audio lock
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("bash_hooks_test_")
+LOGS = Path(SANDBOX) / "logs"
+PLAYED = Path(SANDBOX) / "played.txt"
+CONFIG = Path(SANDBOX) / "user_preferences.json"
+AUDIO = PROJECT_DIR / "audio"
+
+# Point the library at the sandbox, record instead of playing, then run one hook
+DRIVER = """
+source {library}
+QUEUE_DIR={queue}
+LOCK_FILE="$QUEUE_DIR/audio.lock"
+CONFIG_FILE={config}
+play_audio_internal() {{ echo "$1" >> {played}; }}
+{setup}
+{command}
+"""
+
+
+def bash(command, setup=""):
+    script = DRIVER.format(library=str(PROJECT_DIR / "hooks" / "shared" / "hook_config.sh"),
+                           queue=str(Path(SANDBOX) / "bash_queue"), config=str(CONFIG),
+                           played=str(PLAYED), setup=setup, command=command)
+    # No payload on stdin, or --resolve would wait for one
+    return subprocess.run(["bash", "-c", script], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, timeout=30)
+
+
+def played(wait=0.0):
+    """Return and clear the recorded sounds, waiting for a background player."""
+    deadline = time.time() + wait
+    while not PLAYED.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    if not PLAYED.exists():
+        return []
+    lines = PLAYED.read_text(encoding="utf-8").splitlines()
+    PLAYED.unlink()
+    return lines
+
+
+def triggers():
+    log_file = LOGS / "hook_triggers.log"
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def reset_debounce():
+    shutil.rmtree(str(Path(SANDBOX) / "bash_queue"), ignore_errors=True)
+
+
+def main():
+    print_header("Bash Hook Library Test Suite")
+
+    if shutil.which("bash") is None:
+        print("  bash unavailable, skipping")
+        return print_summary()
+
+    CONFIG.write_text(json.dumps({
+        "enabled_hooks": {"stop": True, "notification": False},
+        "audio_files": {"stop": "default/task-complete.mp3"},
+        "playback_settings": {"queue_enabled": False, "debounce_ms": 60000},
+    }), encoding="utf-8")
+    stop_sound = str(AUDIO / "default" / "task-complete.mp3")
+
+    # Fast path: one runner call answers for the hook
+    result = bash('resolve_hook pretooluse')
+    run_test("resolver answers in one tab-separated line",
+             result.returncode == 0 and result.stdout == "0\t0\t0\t\n", repr(result.stdout + result.stderr))
+    result = bash('resolve_hook pretooluse', setup="CLAUDE_HOOKS_PYTHON_CMD=false")
+    run_test("a broken interpreter candidate is skipped",
+             result.returncode == 0 and result.stdout.startswith("0\t"), repr(result.stdout))
+    bash('get_and_play_audio pretooluse task-starting.mp3')
+    run_test("resolved disabled hook plays nothing", not played())
+    # An empty path means the runner found nothing to play and logged why
+    no_audio = "resolve_hook() { printf '1\\t0\\t0\\t\\n'; }"
+    bash('get_and_play_audio stop task-complete.mp3', setup=no_audio)
+    run_test("resolved hook without a sound plays nothing, not the default", not played())
+
+    # Fallback: no runner, so every setting is read by its own helper
+    no_runner = "HOOK_RUNNER=/nonexistent/hook_runner.py"
+    result = bash('resolve_hook stop', setup=no_runner)
+    run_test("resolver fails without the runner", result.returncode != 0 and result.stdout == "")
+    bash('get_and_play_audio stop task-complete.mp3', setup=no_runner)
+    run_test("fallback plays the configured sound", played() == [stop_sound])
+    run_test("fallback logs the trigger", "| stop | task-complete.mp3" in triggers(), triggers())
+    bash('get_and_play_audio stop task-complete.mp3', setup=no_runner)
+    run_test("fallback debounces a repeat", not played())
+    bash('get_and_play_audio notification notification-urgent.mp3', setup=no_runner)
+    run_test("fallback respects a disabled hook", not played())
+
+    # No Python at all: the critical hooks play their default sounds
+    reset_debounce()
+    no_python = no_runner + "\nget_python_cmd() { :; }"
+    bash('get_and_play_audio notification notification-urgent.mp3', setup=no_python)
+    run_test("without Python a default-on hook plays its default sound",
+             played(wait=5.0) == [str(AUDIO / "default" / "notification-urgent.mp3")])
+    bash('get_and_play_audio posttooluse task-complete.mp3', setup=no_python)
+    run_test("without Python a default-off hook stays silent", not played())
+
+    # Without Python, queued sounds take turns on the audio lock
+    reset_debounce()
+    lock = Path(SANDBOX) / "bash_queue" / "audio.lock"
+    lock.parent.mkdir()
+    lock.write_text(f"{os.getpid()}\n")
+    bash('get_and_play_audio notification notification-urgent.mp3', setup=no_python)
+    run_test("sound waits while a live process holds the lock", not played(wait=0.5) and lock.exists())
+    lock.unlink()
+    run_test("waiting sound plays once the lock is free", len(played(wait=5.0)) == 1)
+    run_test("lock is released after playing", wait_for(lambda: not lock.exists()))
+
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    lock.write_text(f"{dead.pid}\n")
+    bash('get_and_play_audio stop task-complete.mp3', setup=no_python)
+    run_test("lock left by a dead process is taken over", len(played(wait=5.0)) == 1)
+    run_test("taken-over lock is released too", wait_for(lambda: not lock.exists()))
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
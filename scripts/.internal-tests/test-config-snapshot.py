@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled config snapshot
+Checks that the snapshot is reused while the config is unchanged, and that
+a config edit, an audio directory change, a schema bump or a corrupt file
+rebuilds it; also checks enabled_hooks normalization
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue, snapshot and log files out of the real temp directory
+SANDBOX = harness.sandbox("snapshot_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+CONFIG = Path(SANDBOX) / "user_preferences.json"
+AUDIO = Path(SANDBOX) / "audio"
+COMPILED = []
+
+
+def write_config(config):
+    CONFIG.write_text(json.dumps(config), encoding="utf-8")
+
+
+def bump_mtime(path):
+    """Move a path's mtime on, whatever the filesystem's granularity."""
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+
+def lookup():
+    """Look the snapshot up as a fresh hook process would."""
+    hook_runner.refresh_config_snapshot()
+    del COMPILED[:]
+    return hook_runner.get_config_snapshot()
+
+
+def counting_compile(original):
+    def compile_config(config):
+        COMPILED.append(config)
+        return original(config)
+    return compile_config
+
+
+def main():
+    print_header("Config Snapshot Test Suite")
+
+    shutil.copytree(str(PROJECT_DIR / "audio" / "default"), str(AUDIO / "default"))
+    hook_runner.CONFIG_FILE = CONFIG
+    hook_runner.AUDIO_DIR = AUDIO
+    hook_runner.compile_config = counting_compile(hook_runner.compile_config)
+    write_config({"enabled_hooks": {"stop": True}, "playback_settings": {"debounce_ms": 250}})
+
+    # Built once, then reused until something it depends on changes
+    snapshot = lookup()
+    run_test("first lookup compiles and persists the snapshot",
+             len(COMPILED) == 1 and hook_runner.SNAPSHOT_FILE.exists() and snapshot["debounce_ms"] == 250)
+    snapshot = lookup()
+    run_test("unchanged config reuses the snapshot", not COMPILED and snapshot["debounce_ms"] == 250)
+
+    write_config({"enabled_hooks": {"stop": True}, "playback_settings": {"debounce_ms": 1000}})
+    snapshot = lookup()
+    run_test("config edit rebuilds the snapshot", len(COMPILED) == 1 and snapshot["debounce_ms"] == 1000,
+             f"compiled {len(COMPILED)}, debounce {snapshot['debounce_ms']}")
+
+    # Same size, new contents: the mtime alone must invalidate it
+    write_config({"enabled_hooks": {"stop": True}, "playback_settings": {"debounce_ms": 2000}})
+    bump_mtime(CONFIG)
+    snapshot = lookup()
+    run_test("same-size edit rebuilds via the mtime", len(COMPILED) == 1 and snapshot["debounce_ms"] == 2000)
+
+    bump_mtime(AUDIO / "default")
+    lookup()
+    run_test("audio directory change rebuilds the snapshot", len(COMPILED) == 1)
+
+    stale = json.loads(hook_runner.SNAPSHOT_FILE.read_text(encoding="utf-8"))
+    stale["schema"] = hook_runner.SNAPSHOT_SCHEMA - 1
+    hook_runner.SNAPSHOT_FILE.write_text(json.dumps(stale), encoding="utf-8")
+    snapshot = lookup()
+    run_test("older schema rebuilds the snapshot",
+             len(COMPILED) == 1 and snapshot["schema"] == hook_runner.SNAPSHOT_SCHEMA)
+
+    hook_runner.SNAPSHOT_FILE.write_text('{"schema": ', encoding="utf-8")
+    snapshot = lookup()
+    run_test("corrupt snapshot is rebuilt", len(COMPILED) == 1 and snapshot["debounce_ms"] == 2000)
+    hook_runner.SNAPSHOT_FILE.write_text("[]", encoding="utf-8")
+    lookup()
+    run_test("snapshot of the wrong type is rebuilt", len(COMPILED) == 1)
+
+    # The in-process copy is kept until refreshed, as the daemon relies on
+    write_config({"enabled_hooks": {"stop": False}})
+    run_test("in-process snapshot is kept until refreshed", hook_runner.is_hook_enabled("stop"))
+    lookup()
+    run_test("refresh picks up the edit", not hook_runner.is_hook_enabled("stop"))
+
+    # enabled_hooks: dict form with an alias, list form, defaults
+    enabled = hook_runner.normalize_enabled_hooks({"subagent": True, "stop": False, "_comment": "x"})
+    run_test("dict form keeps defaults for unmentioned hooks",
+             enabled["subagent_stop"] and not enabled["stop"] and enabled["notification"]
+             and not enabled["posttooluse"], f"got {enabled}")
+    enabled = hook_runner.normalize_enabled_hooks(["stop", "subagent"])
+    run_test("list form enables only the listed hooks",
+             enabled["stop"] and enabled["subagent_stop"] and not enabled["notification"]
+             and not enabled["session_end"], f"got {enabled}")
+    enabled = hook_runner.normalize_enabled_hooks("stop")
+    run_test("unexpected form falls back to the defaults",
+             {name for name, on in enabled.items() if on} == hook_runner.DEFAULT_ENABLED_HOOKS)
+
+    CONFIG.unlink()
+    snapshot = lookup()
+    run_test("missing config compiles the defaults",
+             len(COMPILED) == 1 and snapshot["key"] is None
+             and snapshot["debounce_ms"] == hook_runner.DEFAULT_DEBOUNCE_MS
+             and snapshot["audio_files"]["stop"] == str(AUDIO / "default" / "task-complete.mp3"))
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the playback daemon
+Checks that hooks hand events to a running daemon, that they fall back to
+in-process handling when no daemon is running, it is opted out of or its
+socket is stale, and that the daemon can be stopped cleanly
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue, socket and log files out of the real temp directory
+SANDBOX = harness.sandbox("daemon_test_", CLAUDE_HOOKS_NO_DAEMON=None)
+LOGS = Path(SANDBOX) / "logs"
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+STARTUP_TIMEOUT = 10.0
+
+
+def triggers():
+    hook_runner.flush_logs()
+    log_file = LOGS / "hook_triggers.log"
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+def start_daemon():
+    proc = subprocess.Popen([sys.executable, str(PROJECT_DIR / "hooks" / "hook_runner.py"), "--daemon"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline and proc.poll() is None:
+        if hook_runner.send_to_daemon({"cmd": "ping"}):
+            break
+        time.sleep(0.05)
+    return proc
+
+
+def raw_request(payload):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(2.0)
+        sock.connect(str(hook_runner.DAEMON_SOCKET))
+        sock.sendall(payload)
+        return sock.recv(16)
+    finally:
+        sock.close()
+
+
+def main():
+    print_header("Playback Daemon Test Suite")
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("  Unix domain sockets unavailable, skipping")
+        return print_summary()
+
+    # No daemon: the event is handled in this process
+    run_test("no socket means no hand-off", not hook_runner.send_to_daemon({"cmd": "ping"}))
+    hook_runner.run_hook("pretooluse")
+    run_test("hook falls back to in-process handling", "| pretooluse | DISABLED" in triggers(), triggers())
+
+    # A socket file left behind by a dead daemon is not trusted
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(hook_runner.DAEMON_SOCKET))
+    stale.close()
+    started = time.perf_counter()
+    sent = hook_runner.send_to_daemon({"cmd": "ping"})
+    waited = time.perf_counter() - started
+    run_test("stale socket falls back quickly", not sent and waited < hook_runner.DAEMON_CLIENT_TIMEOUT * 2,
+             f"sent {sent} after {waited:.3f}s")
+
+    # A live daemon takes over the stale socket and acknowledges events
+    proc = start_daemon()
+    try:
+        run_test("daemon replaces a stale socket and answers", hook_runner.send_to_daemon({"cmd": "ping"}),
+                 proc.stderr.read().decode() if proc.poll() is not None else "")
+        run_test("socket is private to the user", hook_runner.DAEMON_SOCKET.stat().st_mode & 0o077 == 0)
+        second = subprocess.run([sys.executable, str(PROJECT_DIR / "hooks" / "hook_runner.py"), "--daemon"],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=STARTUP_TIMEOUT)
+        run_test("second daemon refuses to start",
+                 second.returncode == 1 and b"already running" in second.stderr, second.stderr.decode())
+        run_test("malformed message is rejected", raw_request(b"not json\n").startswith(b"ERR"))
+
+        hook_runner.flush_logs()
+        run_test("hook hands its event to the daemon",
+                 hook_runner.run_hook("session_end") == 0 and not hook_runner._LOG_RECORDS,
+                 f"handled in this process: {hook_runner._LOG_RECORDS}")
+
+        os.environ["CLAUDE_HOOKS_NO_DAEMON"] = "1"
+        run_test("CLAUDE_HOOKS_NO_DAEMON skips the daemon", not hook_runner.send_to_daemon({"cmd": "ping"}))
+        del os.environ["CLAUDE_HOOKS_NO_DAEMON"]
+
+        stopped = hook_runner.stop_daemon()
+        proc.wait(timeout=STARTUP_TIMEOUT)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    run_test("stop request shuts the daemon down", stopped == 0 and proc.returncode == 0,
+             f"stop {stopped}, exit {proc.returncode}")
+    run_test("daemon removes its socket", not hook_runner.DAEMON_SOCKET.exists())
+    run_test("daemon handled the event before exiting", "| session_end | DISABLED" in triggers(), triggers())
+    run_test("stopping without a daemon reports it", hook_runner.stop_daemon() == 1)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
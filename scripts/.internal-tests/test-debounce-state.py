@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared debounce state
+Verifies the mmap layout and that concurrent events for one hook play once
+"""
+
+import multiprocessing
+import time
+
+import harness
+from harness import YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+harness.sandbox("debounce_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+WORKERS = 24
+
+
+def set_debounce_ms(value):
+    hook_runner.get_debounce_ms = lambda: value
+
+
+def reset_state():
+    hook_runner._DEBOUNCE_STATE["map"] = None
+    hook_runner._DEBOUNCE_STATE["slots"] = {}
+
+
+def race(start_at, hook_type):
+    # Each forked process maps the file itself, like a separate hook
+    reset_state()
+    time.sleep(max(0.0, start_at - time.time()))
+    return hook_runner.should_debounce(hook_type)
+
+
+def main():
+    print_header("Debounce State Test Suite")
+
+    set_debounce_ms(60000)
+    run_test("first event plays", hook_runner.should_debounce("stop") is False)
+    run_test("repeat event is debounced", hook_runner.should_debounce("stop") is True)
+    run_test("other hooks have their own slot", hook_runner.should_debounce("notification") is False)
+
+    state_file = hook_runner.DEBOUNCE_STATE_FILE
+    run_test("state file has a fixed size",
+             state_file.stat().st_size == hook_runner.DEBOUNCE_STATE_SIZE,
+             f"size={state_file.stat().st_size}")
+    generation = hook_runner._generation(hook_runner._open_debounce_state())
+    run_test("generation counts two steps per update", generation == 4, f"generation={generation}")
+
+    set_debounce_ms(0)
+    run_test("zero debounce never skips", hook_runner.should_debounce("stop") is False)
+
+    # A corrupt header is rebuilt instead of trusted
+    reset_state()
+    state_file.write_bytes(b"garbage")
+    set_debounce_ms(60000)
+    run_test("corrupt state is reinitialized", hook_runner.should_debounce("stop") is False)
+    run_test("reinitialized state debounces", hook_runner.should_debounce("stop") is True)
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        start_at = time.time() + 0.5
+        with context.Pool(WORKERS) as pool:
+            results = pool.starmap(race, [(start_at, "subagent_stop")] * WORKERS)
+        played = results.count(False)
+        run_test(f"{WORKERS} concurrent events play once", played == 1, f"played {played} times")
+    else:
+        print(f"{YELLOW}Skipping concurrency test: fork is not available{RESET}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
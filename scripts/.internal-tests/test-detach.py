@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for early-detach mode
+Checks that the hook process returns as soon as it has detached, that the
+detached grandchild waits for it to exit and finishes the event, and that
+buffered logs are neither lost nor written twice across the fork
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("detach_test_", CLAUDE_HOOKS_LOG_LEVEL="debug", CLAUDE_HOOKS_DETACH=None)
+LOGS = Path(SANDBOX) / "logs"
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+# How long the detached side keeps working; the hook must not wait for it
+DETACHED_WORK_SECONDS = 1.5
+# How long the hook process lingers before exiting
+HOOK_EXIT_DELAY_SECONDS = 0.3
+
+# A hook process that detaches, then lingers briefly before exiting
+DETACH_SCRIPT = """
+import json, os, sys, time
+sys.path.insert(0, {hooks!r})
+from audio_hooks import runner as hook_runner
+marker = {marker!r}
+hook_runner.log_debug("before the fork")
+if hook_runner.detach():
+    time.sleep({delay})
+    with open(marker + ".hook", "w") as handle:
+        handle.write(repr(time.time()))
+    sys.exit(0)
+started = time.time()
+hook_runner.log_debug("after the fork")
+time.sleep({work})
+with open(marker + ".tmp", "w") as handle:
+    json.dump([started, os.getpid(), os.getsid(0)], handle)
+os.replace(marker + ".tmp", marker)
+"""
+
+# A full event in detach mode, with the player replaced by a marker file
+EVENT_SCRIPT = """
+import os, sys
+sys.path.insert(0, {hooks!r})
+from audio_hooks import runner as hook_runner
+marker = {marker!r}
+
+def play(audio_file, duration=None):
+    with open(marker, "w") as handle:
+        handle.write(str(os.getpid()))
+    return True
+
+hook_runner.play_audio = play
+hook_runner.refresh_config_snapshot()
+hook_runner._SNAPSHOT["snapshot"] = dict(hook_runner.get_config_snapshot(), detach=True, queue_enabled=False,
+                                         debounce_ms=0, rate_limits={{}}, global_rate_limit=None,
+                                         enabled=dict(stop=True), rules=[])
+hook_runner.run_hook_local("stop")
+print(hook_runner._PROFILE_STATUS[0], os.getpid())
+"""
+
+
+def wait_for(path, timeout=10.0):
+    deadline = time.time() + timeout
+    while not path.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    return path.exists()
+
+
+def wait_gone(pid, timeout=10.0):
+    """Wait for a detached process (not our child) to exit and flush its logs."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def run_script(template, marker):
+    source = template.format(hooks=str(PROJECT_DIR / "hooks"), marker=str(marker),
+                             delay=HOOK_EXIT_DELAY_SECONDS, work=DETACHED_WORK_SECONDS)
+    started = time.perf_counter()
+    # Pipes, as with Claude Code: run() waits until every holder closes them
+    result = subprocess.run([sys.executable, "-c", source], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result, time.perf_counter() - started
+
+
+def read(name):
+    log_file = LOGS / name
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+def main():
+    print_header("Early Detach Test Suite")
+
+    if not hasattr(os, "fork") or not hasattr(os, "setsid"):
+        print(f"{YELLOW}Skipping: detach needs fork() and setsid(){RESET}")
+        return print_summary()
+
+    # When to detach
+    hook_runner.refresh_config_snapshot()
+    snapshot = dict(hook_runner.get_config_snapshot(), detach=True)
+    hook_runner._SNAPSHOT["snapshot"] = snapshot
+    run_test("config detach turns it on", hook_runner.should_detach() is True)
+    hook_runner.DETACH_ENV = "0"
+    run_test("CLAUDE_HOOKS_DETACH=0 overrides the config", hook_runner.should_detach() is False)
+    hook_runner.DETACH_ENV = ""
+    hook_runner._IN_BACKGROUND[0] = True
+    run_test("the daemon and queue worker never detach", hook_runner.should_detach() is False)
+    hook_runner._IN_BACKGROUND[0] = False
+    run_test("detach is off by default", hook_runner.compile_config({})["detach"] is False)
+
+    # The hook process returns without waiting for the detached work
+    marker = Path(SANDBOX) / "detached"
+    result, elapsed = run_script(DETACH_SCRIPT, marker)
+    run_test("hook process returns before the detached work ends",
+             result.returncode == 0 and elapsed < DETACHED_WORK_SECONDS, f"took {elapsed:.2f}s")
+    finished = wait_for(marker)
+    run_test("detached grandchild finishes the work", finished)
+    if finished:
+        started, pid, sid = json.loads(marker.read_text())
+        wait_gone(pid)
+        hook_exit = float(Path(f"{marker}.hook").read_text())
+        run_test("grandchild waits for the hook process to exit", started >= hook_exit,
+                 f"started {started - hook_exit:+.3f}s after the hook exited")
+        run_test("grandchild runs in its own session", sid != os.getsid(0) and pid != os.getpid())
+    lines = read("debug.log")
+    run_test("buffered logs are written once across the fork",
+             lines.count("before the fork") == 1 and lines.count("after the fork") == 1, lines)
+
+    # A whole event: the hook process records DETACHED, the grandchild plays
+    marker = Path(SANDBOX) / "played"
+    result, elapsed = run_script(EVENT_SCRIPT, marker)
+    status, hook_pid = result.stdout.decode().split()
+    run_test("hook process stops at the decision", status == "DETACHED", f"got {status}")
+    played = wait_for(marker)
+    run_test("the sound is played by the detached process",
+             played and marker.read_text() != hook_pid, result.stderr.decode())
+    if played:
+        wait_gone(int(marker.read_text()))
+    run_test("the detached process logs the trigger", read("hook_triggers.log").count("| stop | PLAYED") == 1,
+             read("hook_triggers.log"))
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for diagnose.py check execution
+Verifies checks run concurrently, time out individually and report JSON
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# A fake home with an installed hooks directory pointing at this checkout
+SANDBOX = harness.sandbox("diagnose_test_")
+os.environ["HOME"] = SANDBOX
+os.environ["USERPROFILE"] = SANDBOX
+sys.path.insert(0, str(PROJECT_DIR / "scripts"))
+
+import diagnose  # noqa: E402
+
+CHECK_DELAY = 0.4
+
+
+def install():
+    hooks_dir = Path(SANDBOX) / ".claude" / "hooks"
+    hooks_dir.mkdir(parents=True)
+    (hooks_dir / "hook_runner.py").write_text("", encoding="utf-8")
+    (hooks_dir / "audio_hooks").mkdir()
+    (hooks_dir / "audio_hooks" / "runner.py").write_text("", encoding="utf-8")
+    project = Path(SANDBOX) / "project"
+    (project / "config").mkdir(parents=True)
+    (project / "config" / "user_preferences.json").write_text(
+        json.dumps({"enabled_hooks": {"stop": True}}), encoding="utf-8")
+    shutil.copytree(str(PROJECT_DIR / "audio" / "default"), str(project / "audio" / "default"))
+    (hooks_dir / ".project_path").write_text(str(project), encoding="utf-8")
+    (Path(SANDBOX) / ".claude" / "settings.json").write_text(
+        json.dumps({"hooks": {name: [] for name in ("Stop", "Notification")}}), encoding="utf-8")
+
+
+def slow(func, delay):
+    def wrapper(*args):
+        time.sleep(delay)
+        return func(*args)
+    return wrapper
+
+
+def run_json(**kwargs):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        started = time.perf_counter()
+        code = diagnose.run_diagnostics(as_json=True, **kwargs)
+        elapsed = time.perf_counter() - started
+    return code, json.loads(output.getvalue()), elapsed
+
+
+def main():
+    print_header("Diagnose Check Runner Test Suite")
+
+    install()
+    code, result, _ = run_json()
+    checks = {check["name"]: check for check in result["checks"]}
+    run_test("healthy install passes", code == 0 and result["ok"] and result["issues"] == 0,
+             f"got {code}, {result}")
+    run_test("every check is reported in order",
+             list(checks) == ["python_version", "platform", "hooks_directory", "project_path",
+                              "audio_files", "settings_json", "config", "logs"], f"got {list(checks)}")
+    run_test("each check has a duration",
+             all(isinstance(check["duration_ms"], float) for check in checks.values()))
+    run_test("missing logs are a warning, not an issue", checks["logs"]["status"] == "warn",
+             f"got {checks['logs']}")
+
+    # Three slow independent checks overlap instead of adding up
+    originals = {name: getattr(diagnose, name)
+                 for name in ("check_settings_json", "check_logs", "check_config")}
+    for name, func in originals.items():
+        setattr(diagnose, name, slow(func, CHECK_DELAY))
+    code, result, elapsed = run_json()
+    run_test("slow checks run concurrently", elapsed < 2 * CHECK_DELAY,
+             f"took {elapsed:.2f}s for three {CHECK_DELAY}s checks")
+    slowest = max(check["duration_ms"] for check in result["checks"])
+    run_test("durations measure the check itself", slowest >= CHECK_DELAY * 1000,
+             f"slowest {slowest:.1f} ms")
+
+    # A hung check is abandoned at its timeout and counted as a failure
+    diagnose.check_settings_json = slow(originals["check_settings_json"], 5)
+    code, result, elapsed = run_json(timeout=0.2)
+    checks = {check["name"]: check for check in result["checks"]}
+    run_test("hung check times out", elapsed < 2 * CHECK_DELAY and "timed out" in checks["settings_json"]["message"],
+             f"took {elapsed:.2f}s, got {checks['settings_json']}")
+    run_test("timed-out check counts as an issue", code == 1 and checks["settings_json"]["status"] == "fail"
+             and checks["settings_json"]["duration_ms"] is None, f"got {checks['settings_json']}")
+    run_test("slow warning check reports as a warning", checks["config"]["status"] == "warn",
+             f"got {checks['config']}")
+    run_test("abandoned checks are remembered for exit",
+             "settings_json" in diagnose.ABANDONED_CHECKS, f"got {diagnose.ABANDONED_CHECKS}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    try:
+        code = main()
+    finally:
+        harness.remove_sandbox()
+    # The abandoned check thread is still sleeping
+    sys.stdout.flush()
+    os._exit(code)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for the trigger history store
+Checks the indexed schema, old-row pruning, that a full spool is ingested
+rather than pruned, and that diagnose.py --history counts, filters and tails
+stored triggers without writing to the store
+"""
+
+import contextlib
+import io
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("history_test_", CLAUDE_HOOKS_LOG_LEVEL=None, CLAUDE_HOOKS_DEBUG=None)
+LOGS = Path(SANDBOX) / "logs"
+sys.path.insert(0, str(PROJECT_DIR / "scripts"))
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+import diagnose  # noqa: E402
+
+DAY = 86400
+
+
+def stored_rows():
+    conn = sqlite3.connect(str(LOGS / hook_runner.HISTORY_DB_NAME))
+    try:
+        return conn.execute("SELECT ts, hook, status, details FROM triggers ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def query(**kwargs):
+    conn = diagnose.open_history_db()
+    try:
+        return diagnose.query_history(conn, **kwargs)
+    finally:
+        conn.close()
+
+
+def main():
+    print_header("Trigger History Test Suite")
+
+    hook_runner.configure_logging({"level": "info", "sample": {}})
+    now = time.time()
+
+    # One-shot triggers are spooled, then ingested into the indexed table
+    hook_runner.log_trigger("stop", "PLAYED", "task-complete.mp3")
+    hook_runner.log_trigger("posttooluse", "DEBOUNCED")
+    hook_runner.flush_logs()
+    run_test("one-shot hook does not open the database",
+             not (LOGS / hook_runner.HISTORY_DB_NAME).exists() and (LOGS / hook_runner.HISTORY_SPOOL_NAME).exists())
+    run_test("ingest stores the spooled rows", hook_runner.ingest_history() == 2)
+    rows = stored_rows()
+    run_test("rows keep hook, status and details",
+             [row[1:] for row in rows] == [("stop", "PLAYED", "task-complete.mp3"), ("posttooluse", "DEBOUNCED", None)]
+             and all(abs(row[0] - now) < 60 for row in rows), f"got {rows}")
+
+    conn = sqlite3.connect(str(LOGS / hook_runner.HISTORY_DB_NAME))
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    plan = " ".join(str(row) for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM triggers WHERE hook = ? AND ts >= ?", ("stop", now - 3600)))
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    run_test("schema has the ts, hook and status indexes",
+             {"idx_triggers_ts", "idx_triggers_hook_ts", "idx_triggers_status_ts"} <= indexes, f"got {indexes}")
+    run_test("hook queries use the hook index", "idx_triggers_hook_ts" in plan, plan)
+    run_test("database is versioned and in WAL mode",
+             version == hook_runner.HISTORY_SCHEMA_VERSION and mode == "wal", f"{version}, {mode}")
+
+    # Rows past the retention window are pruned every HISTORY_PRUNE_INTERVAL inserts
+    interval = hook_runner.HISTORY_PRUNE_INTERVAL
+    old = now - hook_runner.HISTORY_RETENTION_SECONDS - DAY
+    hook_runner.ingest_history([(old, "stop", "PLAYED", 1.0, None)])
+    run_test("old rows wait for the next prune", any(row[0] == old for row in stored_rows()))
+    filler = [(now - 60, "notification", "PLAYED", 1.0, None)] * interval
+    hook_runner.ingest_history(filler)
+    run_test("prune drops rows past the retention window", not any(row[0] == old for row in stored_rows())
+             and len(stored_rows()) == 2 + interval)
+
+    # Queries: counts, filters, the window and the tail
+    hook_runner.ingest_history([
+        (now - 2 * 3600, "precompact", "PLAYED", 5.0, "old.mp3"),
+        (now - 30, "precompact", "DEBOUNCED", 2.0, None),
+        (now - 20, "precompact", "PLAYED", 9.0, "first.mp3"),
+        (now - 10, "precompact", "PLAYED", 3.0, "second.mp3"),
+    ])
+    result = query(since_seconds=3600, hook="precompact")
+    counts = {row["status"]: row["count"] for row in result["counts"]}
+    run_test("counts group by hook and status within the window",
+             counts == {"PLAYED": 2, "DEBOUNCED": 1} and result["total"] == 3, f"got {counts}")
+    played = next(row for row in result["counts"] if row["status"] == "PLAYED")
+    run_test("latency is summarized per group",
+             played["avg_latency_ms"] == 6.0 and played["max_latency_ms"] == 9.0, f"got {played}")
+    result = query(since_seconds=3600, hook="precompact", status="debounced")
+    run_test("status filter is case-insensitive", result["total"] == 1
+             and [event["status"] for event in result["recent"]] == ["DEBOUNCED"])
+    result = query(since_seconds=3600, hook="precompact", tail=2)
+    run_test("tail returns the newest events, oldest first",
+             [event["details"] for event in result["recent"]] == ["first.mp3", "second.mp3"],
+             f"got {result['recent']}")
+    run_test("time windows are parsed",
+             diagnose.parse_window("30m") == 1800 and diagnose.parse_window("7d") == 7 * DAY)
+    try:
+        diagnose.parse_window("soon")
+        rejected = False
+    except ValueError:
+        rejected = True
+    run_test("invalid time window is rejected", rejected)
+
+    # Querying reads only the database and never claims or stores the spool
+    hook_runner.log_trigger("session_start", "PLAYED")
+    hook_runner.flush_logs()
+    spool = (LOGS / hook_runner.HISTORY_SPOOL_NAME).read_bytes()
+    before = len(stored_rows())
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        code = diagnose.run_history("1h", "session_start", None, 5)
+    run_test("history points at triggers still in the spool",
+             code == 0 and "session_start" not in output.getvalue() and "--ingest" in output.getvalue(),
+             output.getvalue())
+    run_test("history leaves the spool and database untouched",
+             (LOGS / hook_runner.HISTORY_SPOOL_NAME).read_bytes() == spool and len(stored_rows()) == before)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        code = diagnose.run_history("1h", "session_start", None, 5, ingest=True)
+    run_test("--ingest moves the spool into the database",
+             code == 0 and not (LOGS / hook_runner.HISTORY_SPOOL_NAME).exists() and len(stored_rows()) == before + 1
+             and "session_start" in output.getvalue(), output.getvalue())
+
+    # A full spool is ingested by the hook that fills it, never pruned
+    before = len(stored_rows())
+    row = (now, "posttooluse", "DEBOUNCED", 1.0, None)
+    per_flush = 200
+    flushes = 0
+    while not stored_rows()[before:] and flushes < 1000:
+        hook_runner._HISTORY_ROWS.extend([row] * per_flush)
+        hook_runner.flush_logs()
+        flushes += 1
+    spooled = LOGS / hook_runner.HISTORY_SPOOL_NAME
+    run_test("full spool is moved into the database",
+             len(stored_rows()) - before == flushes * per_flush and not spooled.exists()
+             and not hook_runner.list_log_segments(spooled),
+             f"{len(stored_rows()) - before} of {flushes * per_flush} rows stored")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
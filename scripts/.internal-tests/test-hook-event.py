@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the bounded hook payload reader
+Verifies field extraction, early stop, the scan limit and draining
+"""
+
+import io
+import json
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+harness.sandbox("hook_event_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+
+class TrickleStream(io.BytesIO):
+    """Returns at most a few bytes per read, like a slow pipe."""
+
+    def __init__(self, data, step=3):
+        super().__init__(data)
+        self.step = step
+
+    def read(self, size=-1):
+        chunk = super().read(min(self.step, size) if size and size > 0 else self.step)
+        return chunk
+
+
+class CountingStream(io.BytesIO):
+    """Records how many bytes the scanner read before draining began."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+def payload(**fields):
+    return json.dumps(fields).encode("utf-8")
+
+
+def main():
+    print_header("Hook Payload Reader Test Suite")
+
+    wanted = {
+        "session_id": "abc-123",
+        "cwd": "/home/user/project with \"quotes\" \\ and ünïcode",
+        "hook_event_name": "PostToolUse",
+        "tool_name": "Bash",
+    }
+    data = payload(transcript_path="/tmp/t.jsonl", tool_input={"command": "ls [}{]\"x\""},
+                   count=3, flag=True, nothing=None, **wanted)
+    stream = io.BytesIO(data)
+    run_test("extracts the wanted fields", hook_runner.read_hook_event(stream) == wanted,
+             f"got {hook_runner.read_hook_event(io.BytesIO(data))}")
+    run_test("drains the whole stream", stream.tell() == len(data))
+
+    run_test("handles values split across reads",
+             hook_runner.read_hook_event(TrickleStream(data)) == wanted)
+
+    # Fields first, then a huge tool response: scanning stops early
+    huge = payload(**wanted, tool_response={"stdout": "x" * (5 * 1024 * 1024)})
+    stream = CountingStream(huge)
+    fields = hook_runner.read_hook_event(stream)
+    scanned = stream.reads[0]
+    run_test("stops scanning once all fields are found",
+             fields == wanted and scanned == hook_runner.EVENT_CHUNK_SIZE
+             and all(size <= 65536 for size in stream.reads),
+             f"fields={fields} reads={stream.reads[:3]}...")
+
+    # Fields after a value larger than the scan limit are given up on
+    late = b'{"tool_input": {"data": "' + b"y" * (hook_runner.EVENT_SCAN_LIMIT * 2) \
+        + b'"}, "tool_name": "Edit"}'
+    stream = io.BytesIO(late)
+    run_test("respects the scan limit", hook_runner.read_hook_event(stream) == {}
+             and stream.tell() == len(late))
+
+    # A huge skipped value under the limit is skipped, not stored
+    skipped = payload(tool_input={"list": list(range(5000))}, tool_name="Write")
+    run_test("skips nested values", hook_runner.read_hook_event(io.BytesIO(skipped)) == {"tool_name": "Write"})
+
+    long_cwd = payload(cwd="z" * (hook_runner.EVENT_MAX_FIELD_BYTES + 10), tool_name="Read")
+    run_test("drops oversized field values",
+             hook_runner.read_hook_event(io.BytesIO(long_cwd)) == {"tool_name": "Read"})
+
+    run_test("non-string field values are ignored",
+             hook_runner.read_hook_event(io.BytesIO(b'{"tool_name": 7, "cwd": "/x"}')) == {"cwd": "/x"})
+
+    run_test("truncated input keeps earlier fields",
+             hook_runner.read_hook_event(io.BytesIO(b'{"tool_name": "Bash", "cwd": "/ro')) == {"tool_name": "Bash"})
+
+    for label, raw in (("empty input", b""), ("non-JSON input", b"hello"), ("JSON array", b"[1, 2]")):
+        run_test(f"{label} yields no fields", hook_runner.read_hook_event(io.BytesIO(raw)) == {})
+
+    run_test("routes event names to hook types",
+             hook_runner.event_hook_type({"hook_event_name": "SubagentStop"}) == "subagent_stop"
+             and hook_runner.event_hook_type({}) is None)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
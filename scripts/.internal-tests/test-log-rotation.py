@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for log rotation
+Checks that each log rolls over to numbered segments past its byte limit,
+that only the newest segments are kept, that concurrent writers never lose
+or interleave lines, and that the bash append_log() rotates the same way
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("rotation_test_")
+LOGS = Path(SANDBOX) / "logs"
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+WRITERS = 4
+LINES_PER_WRITER = 300
+
+# One hook process appending lines while the others do the same
+WRITER = """
+import sys
+sys.path.insert(0, {hooks!r})
+from audio_hooks import runner as hook_runner
+hook_runner.LOG_MAX_BYTES["race.log"] = 8192
+hook_runner.LOG_KEEP_SEGMENTS = 1000
+for index in range({lines}):
+    hook_runner.write_log("race.log", "writer {writer} line %04d " % index + "x" * 80 + "\\n")
+"""
+
+
+def segments(name):
+    return [path.name for path in hook_runner.list_log_segments(LOGS / name)]
+
+
+def fill(name, line, count):
+    for _ in range(count):
+        hook_runner.write_log(name, line)
+
+
+def main():
+    print_header("Log Rotation Test Suite")
+
+    limit = hook_runner.LOG_MAX_BYTES["errors.log"]
+    line = "e" * 1023 + "\n"
+
+    # A log under its limit is left alone; one past it rolls over
+    fill("errors.log", line, limit // len(line))
+    run_test("log at its limit is not rotated", not segments("errors.log")
+             and (LOGS / "errors.log").stat().st_size == limit)
+    hook_runner.write_log("errors.log", line)
+    run_test("log past its limit rolls over to .1",
+             segments("errors.log") == ["errors.log.1"] and not (LOGS / "errors.log").exists()
+             and (LOGS / "errors.log.1").stat().st_size == limit + len(line))
+    hook_runner.write_log("errors.log", "fresh\n")
+    run_test("next write starts a fresh log", (LOGS / "errors.log").read_text() == "fresh\n")
+
+    # Only the newest segments survive, and numbering keeps going
+    for _ in range(4):
+        fill("errors.log", line, limit // len(line) + 1)
+    kept = segments("errors.log")
+    run_test("only the newest segments are kept",
+             kept == ["errors.log.3", "errors.log.4", "errors.log.5"]
+             and len(kept) == hook_runner.LOG_KEEP_SEGMENTS, f"got {kept}")
+    total = sum(path.stat().st_size for path in LOGS.glob("errors.log*"))
+    bound = (hook_runner.LOG_KEEP_SEGMENTS + 1) * (limit + len(line))
+    run_test("disk use stays bounded", total <= bound, f"{total} bytes, bound {bound}")
+
+    # Each log has its own limit; unknown logs use the default
+    big = "d" * (hook_runner.LOG_MAX_BYTES["errors.log"] + 1) + "\n"
+    hook_runner.write_log("debug.log", big)
+    hook_runner.write_log("other.log", big)
+    run_test("per-log limits apply", not segments("debug.log") and segments("other.log") == ["other.log.1"],
+             f"debug {segments('debug.log')}, other {segments('other.log')}")
+
+    # Segment listing is numeric and ignores other files
+    for name in ("trace.log.9", "trace.log.10", "trace.log.2", "trace.log.bak", "trace.log.1.gz"):
+        (LOGS / name).write_text("x\n")
+    run_test("segments sort numerically and skip other files",
+             segments("trace.log") == ["trace.log.2", "trace.log.9", "trace.log.10"], f"got {segments('trace.log')}")
+    (LOGS / "trace.log").write_text("x\n")
+    hook_runner.rotate_log(LOGS / "trace.log")
+    run_test("rotation continues after the highest segment",
+             segments("trace.log") == ["trace.log.9", "trace.log.10", "trace.log.11"], f"got {segments('trace.log')}")
+    hook_runner.rotate_log(LOGS / "missing.log")
+    run_test("rotating a log someone else rotated is harmless", not segments("missing.log"))
+
+    # Concurrent hooks rotating the same log lose and interleave nothing
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER.format(
+        hooks=str(PROJECT_DIR / "hooks"), lines=LINES_PER_WRITER, writer=writer)])
+        for writer in range(WRITERS)]
+    for proc in writers:
+        proc.wait()
+    lines = []
+    for path in hook_runner.list_log_segments(LOGS / "race.log") + [LOGS / "race.log"]:
+        if path.exists():
+            lines.extend(path.read_text().splitlines())
+    expected = {f"writer {w} line {i:04d} " + "x" * 80 for w in range(WRITERS) for i in range(LINES_PER_WRITER)}
+    run_test("concurrent writers keep every line intact",
+             len(lines) == len(expected) and set(lines) == expected and len(segments("race.log")) > 1,
+             f"{len(lines)} lines in {len(segments('race.log'))} segments")
+
+    # The bash hooks rotate their logs the same way
+    if shutil.which("bash"):
+        script = ('source "$1"; for i in $(seq 1 40); do append_log "$2" 1024 "$(printf "%0199d" "$i")"; done')
+        subprocess.run(["bash", "-c", script, "bash", str(PROJECT_DIR / "hooks" / "shared" / "hook_config.sh"),
+                        str(LOGS / "bash.log")], check=True, stdin=subprocess.DEVNULL)
+        kept = segments("bash.log")
+        run_test("bash append_log keeps the newest segments",
+                 kept == ["bash.log.4", "bash.log.5", "bash.log.6"]
+                 and all((LOGS / name).stat().st_size <= 1024 + 200 for name in kept), f"got {kept}")
+        newest = (LOGS / "bash.log").read_text().splitlines()
+        run_test("bash append_log keeps writing after rotating", newest[-1] == "%0199d" % 40, f"got {newest[-1:]}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for buffered logging
+Checks that records are only written when flushed, one write per log file,
+that disabled levels skip formatting, that trigger sampling and the history
+spool work, and that a one-shot hook's logging stays within its budget
+"""
+
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("logging_test_", CLAUDE_HOOKS_LOG_LEVEL=None, CLAUDE_HOOKS_DEBUG=None)
+LOGS = Path(SANDBOX) / "logs"
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+BUDGET_RUNS = 7
+
+# What a one-shot hook logs: a few debug lines (usually disabled), one trigger
+ONE_SHOT = """
+import sys, time
+sys.path.insert(0, {hooks!r})
+from audio_hooks import runner as hook_runner
+start = time.perf_counter()
+for index in range(8):
+    hook_runner.log_debug("step %d of %s", index, "stop")
+hook_runner.log_trigger("stop", "PLAYED", "task-complete.mp3")
+hook_runner.flush_logs()
+print(int((time.perf_counter() - start) * 1e6))
+"""
+
+
+def set_logging(level="info", sample=None):
+    hook_runner.configure_logging({"level": level, "sample": sample or {}})
+
+
+def read(name):
+    log_file = LOGS / name
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+class Formatted:
+    """Log argument that counts how often it is turned into text."""
+
+    count = 0
+
+    def __str__(self):
+        Formatted.count += 1
+        return "formatted"
+
+
+def main():
+    print_header("Buffered Logging Test Suite")
+
+    # Records wait in memory until flushed, then go out one write per file
+    set_logging("debug")
+    writes = []
+    write_log = hook_runner.write_log
+    hook_runner.write_log = lambda name, text: (writes.append(name), write_log(name, text))
+    for index in range(5):
+        hook_runner.log_debug("line %d", index)
+    hook_runner.log_error("broken %s", "thing")
+    run_test("logging calls do not touch the files", read("debug.log") == "" and read("errors.log") == "")
+    hook_runner.flush_logs()
+    hook_runner.write_log = write_log
+    lines = read("debug.log").splitlines()
+    run_test("flush writes each log in one write", sorted(writes) == ["debug.log", "errors.log"], f"got {writes}")
+    run_test("records keep their order and format",
+             [line.split(" | ", 2)[1:] for line in lines] == [["DEBUG", f"line {i}"] for i in range(5)]
+             and read("errors.log").endswith("| ERROR | broken thing\n"), f"got {lines}")
+
+    # Disabled levels never format their arguments
+    set_logging("info")
+    hook_runner.log_debug("value %s", Formatted())
+    hook_runner.flush_logs()
+    run_test("disabled level skips formatting", Formatted.count == 0 and len(read("debug.log").splitlines()) == 5)
+    set_logging("debug")
+    hook_runner.log_debug("value %s", Formatted())
+    hook_runner.flush_logs()
+    run_test("enabled level formats at flush", Formatted.count == 1 and read("debug.log").endswith("value formatted\n"))
+    eager = [line.strip() for line in Path(hook_runner.__file__).read_text(encoding="utf-8").splitlines()
+             if line.strip().startswith(("log_debug(f", "log_error(f"))]
+    run_test("log calls pass %-style args instead of f-strings", not eager, f"got {eager[:3]}")
+    set_logging("off")
+    hook_runner.log_error("hidden")
+    hook_runner.log_trigger("stop", "PLAYED")
+    hook_runner.flush_logs()
+    run_test("level off drops errors and triggers", "hidden" not in read("errors.log")
+             and read("hook_triggers.log") == "" and not (LOGS / hook_runner.HISTORY_SPOOL_NAME).exists())
+
+    # Sampling thins the trigger log; the history keeps every row
+    set_logging("info", {"posttooluse": 10})
+    for _ in range(100):
+        hook_runner.log_trigger("posttooluse", "PLAYED")
+    hook_runner.log_trigger("stop", "PLAYED")
+    hook_runner.flush_logs()
+    logged = read("hook_triggers.log")
+    spooled = read(hook_runner.HISTORY_SPOOL_NAME).splitlines()
+    run_test("1 in N trigger lines are kept", logged.count("posttooluse") == 10 and logged.count("| stop |") == 1,
+             f"got {logged.count('posttooluse')} posttooluse lines")
+    run_test("one-shot history rows go to the spool", len(spooled) == 101, f"got {len(spooled)}")
+
+    # Ingesting moves the spool into the database
+    stored = hook_runner.ingest_history()
+    conn = sqlite3.connect(str(LOGS / hook_runner.HISTORY_DB_NAME))
+    count = conn.execute("SELECT COUNT(*) FROM triggers WHERE hook = 'posttooluse'").fetchone()[0]
+    conn.close()
+    run_test("ingest stores and removes the spool",
+             stored == 101 and count == 100 and not (LOGS / hook_runner.HISTORY_SPOOL_NAME).exists(),
+             f"stored {stored}, {count} rows")
+    (LOGS / hook_runner.HISTORY_SPOOL_NAME).write_text('[1.0,"stop","PLAYED",1.0,null]\n[2.0,"st', encoding="utf-8")
+    run_test("a truncated spool line is skipped", hook_runner.ingest_history() == 1)
+
+    compiled = hook_runner.compile_logging({"level": "LOUD", "sample": {"subagent": 5, "stop": 0, "pretooluse": 1}})
+    run_test("logging config is validated",
+             compiled == {"level": "info", "sample": {"subagent_stop": 5}}, f"got {compiled}")
+
+    # A one-shot hook's logging fits its budget, starting from a fresh process
+    timings = []
+    for _ in range(BUDGET_RUNS):
+        result = subprocess.run([sys.executable, "-c", ONE_SHOT.format(hooks=str(PROJECT_DIR / "hooks"))],
+                                stdout=subprocess.PIPE, check=True)
+        timings.append(int(result.stdout))
+    median = statistics.median(timings)
+    print(f"  one-shot logging: median {median:.0f} µs (budget {hook_runner.LOG_BUDGET_US} µs)")
+    run_test("one-shot logging stays within budget", median <= hook_runner.LOG_BUDGET_US, f"got {timings}")
+
+    # Long-lived processes flush from a thread and write history directly
+    set_logging("debug")
+    hook_runner.start_log_flusher(0.05)
+    hook_runner.log_debug("from the flusher")
+    hook_runner.log_trigger("notification", "PLAYED")
+    time.sleep(0.3)
+    conn = sqlite3.connect(str(LOGS / hook_runner.HISTORY_DB_NAME))
+    count = conn.execute("SELECT COUNT(*) FROM triggers WHERE hook = 'notification'").fetchone()[0]
+    conn.close()
+    run_test("flusher thread writes without an explicit flush",
+             "from the flusher" in read("debug.log") and count == 1, f"{count} notification rows")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the software mixer
+Mixes known PCM clips into a WAV file sink and checks the exact samples
+"""
+
+import sys
+import wave
+from array import array
+from pathlib import Path
+
+import harness
+from harness import YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("mixer_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+RATE = 8000
+
+
+def make_wav(name, samples, channels=1, rate=RATE):
+    path = Path(SANDBOX) / name
+    data = array("h", samples)
+    if sys.byteorder == "big":
+        data.byteswap()
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(data.tobytes())
+    return path
+
+
+def read_samples(path):
+    with wave.open(str(path), "rb") as wav:
+        data = array("h")
+        data.frombytes(wav.readframes(wav.getnframes()))
+        if sys.byteorder == "big":
+            data.byteswap()
+        return wav.getnchannels(), wav.getframerate(), list(data)
+
+
+def mix_samples(paths, offsets, gain):
+    sink = Path(SANDBOX) / "sink.wav"
+    duration = hook_runner.mix_to_file(paths, offsets, gain, sink)
+    if duration is None:
+        return None, None
+    return duration, read_samples(sink)
+
+
+def main():
+    print_header("Software Mixer Test Suite")
+
+    first = make_wav("first.wav", [1000, -1000, 30000, -20000])
+    second = make_wav("second.wav", [500, 501, 10000, -20000, 7])
+
+    duration, result = mix_samples([first, second], [0.0, 0.0], 1.0)
+    run_test("summing with clipping",
+             result == (1, RATE, [1500, -499, 32767, -32768, 7]), f"got {result}")
+    run_test("mix duration", duration == 5 / RATE, f"got {duration}")
+
+    halves = make_wav("halves.wav", [3, 5, -3, 1])
+    _, result = mix_samples([halves], [0.0], 0.5)
+    run_test("gain rounds half to even", result == (1, RATE, [2, 2, -2, 0]), f"got {result}")
+
+    # Two frames at 8 kHz
+    _, result = mix_samples([first, second], [0.0, 2 / RATE], 1.0)
+    run_test("layers start at their offsets",
+             result == (1, RATE, [1000, -1000, 30500, -19499, 10000, -20000, 7]),
+             f"got {result}")
+
+    stereo = make_wav("stereo.wav", [100, -100, 200, -200], channels=2)
+    _, result = mix_samples([stereo, first], [0.0, 0.0], 1.0)
+    run_test("mono layer is spread across channels",
+             result == (2, RATE, [1100, 900, -800, -1200, 30000, 30000, -20000, -20000]),
+             f"got {result}")
+
+    fast = make_wav("fast.wav", [10, 20, 30, 40], rate=RATE * 2)
+    _, result = mix_samples([first, fast], [0.0, 0.0], 1.0)
+    run_test("other sample rates are resampled",
+             result == (1, RATE, [1010, -970, 30000, -20000]), f"got {result}")
+
+    layers = [(hook_runner.read_wav(path), 0.8, 0.0) for path in (first, second, halves)]
+    fallback = hook_runner.mix_clips(layers, use_numpy=False)
+    run_test("mix is deterministic",
+             fallback == hook_runner.mix_clips(layers, use_numpy=False))
+    if hook_runner._numpy() is not None:
+        run_test("NumPy and array paths agree",
+                 fallback == hook_runner.mix_clips(layers, use_numpy=True))
+    else:
+        print(f"{YELLOW}Skipping NumPy comparison: numpy is not installed{RESET}")
+
+    missing = Path(SANDBOX) / "missing.wav"
+    duration, _ = mix_samples([first, missing], [0.0, 0.0], 1.0)
+    run_test("unreadable clip aborts the mix", duration is None)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for MP3 duration parsing
+Builds MP3 streams from raw frame headers and checks the CBR and VBR frame
+walks, Xing/Info and VBRI frame counts, tag skipping, the large-file
+estimate and the per-file duration cache
+"""
+
+import os
+from pathlib import Path
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("mp3_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+BITRATE_INDEX = {32: 1, 64: 5, 128: 9, 320: 14}
+MPEG2_BITRATE_INDEX = {64: 8}
+PARSED = []
+
+
+def frame(kbps=128, mpeg1=True, mono=False, padding=0, body=None):
+    """One layer III frame: a valid header followed by silence (or body)."""
+    if mpeg1:
+        version, rate_bits, sample_rate, bitrate_bits = 3, 0, 44100, BITRATE_INDEX[kbps]
+        length = 144 * kbps * 1000 // sample_rate + padding
+    else:
+        version, rate_bits, sample_rate, bitrate_bits = 2, 0, 22050, MPEG2_BITRATE_INDEX[kbps]
+        length = 72 * kbps * 1000 // sample_rate + padding
+    header = bytes([
+        0xFF,
+        0xE0 | (version << 3) | (1 << 1) | 1,
+        (bitrate_bits << 4) | (rate_bits << 2) | (padding << 1),
+        (3 if mono else 0) << 6,
+    ])
+    body = body or b""
+    return header + body + b"\0" * (length - 4 - len(body))
+
+
+def id3v2(size, fake_sync=False):
+    """An ID3v2 tag of the given payload size, optionally full of 0xFF bytes."""
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    payload = (b"\xff\xfb\x90" * size)[:size] if fake_sync else b"\0" * size
+    return b"ID3\x04\x00\x00" + syncsafe + payload
+
+
+def xing(kind, frames, side_info):
+    return b"\0" * side_info + kind + (1).to_bytes(4, "big") + frames.to_bytes(4, "big")
+
+
+def close(value, expected):
+    return value is not None and abs(value - expected) < 1e-6
+
+
+def counting_parse(original):
+    def parse(data):
+        PARSED.append(len(data))
+        return original(data)
+    return parse
+
+
+def main():
+    print_header("MP3 Duration Test Suite")
+
+    mpeg1_frame = 1152 / 44100
+    mpeg2_frame = 576 / 22050
+
+    # Constant bitrate: every frame is walked
+    cbr = b"".join(frame(128) for _ in range(100))
+    run_test("CBR duration from the frame walk", close(hook_runner.parse_mp3_duration(cbr), 100 * mpeg1_frame),
+             f"got {hook_runner.parse_mp3_duration(cbr)}")
+    padded = b"".join(frame(128, padding=index % 2) for index in range(50))
+    run_test("padded frames stay in step", close(hook_runner.parse_mp3_duration(padded), 50 * mpeg1_frame))
+
+    # Variable bitrate without a header: the walk, not the bitrate, decides
+    vbr = b"".join(frame((32, 320, 64, 128)[index % 4]) for index in range(80))
+    run_test("VBR duration counts frames, not bytes", close(hook_runner.parse_mp3_duration(vbr), 80 * mpeg1_frame),
+             f"got {hook_runner.parse_mp3_duration(vbr)}")
+    mono = b"".join(frame(64, mpeg1=False, mono=True) for _ in range(40))
+    run_test("MPEG-2 frames use 576 samples", close(hook_runner.parse_mp3_duration(mono), 40 * mpeg2_frame))
+
+    # Xing/Info and VBRI headers give the frame count directly
+    tagged = frame(128, body=xing(b"Xing", 1000, 32)) + frame(128) * 3
+    run_test("Xing header frame count wins over the walk",
+             close(hook_runner.parse_mp3_duration(tagged), 1000 * mpeg1_frame),
+             f"got {hook_runner.parse_mp3_duration(tagged)}")
+    info = frame(128, body=xing(b"Info", 250, 32)) + frame(128) * 3
+    run_test("Info header is read like Xing", close(hook_runner.parse_mp3_duration(info), 250 * mpeg1_frame))
+    mono_xing = frame(128, mono=True, body=xing(b"Xing", 500, 17)) + frame(128, mono=True) * 3
+    run_test("mono Xing header sits after the shorter side info",
+             close(hook_runner.parse_mp3_duration(mono_xing), 500 * mpeg1_frame))
+    mpeg2_xing = frame(64, mpeg1=False, body=xing(b"Xing", 300, 17)) + frame(64, mpeg1=False) * 3
+    run_test("MPEG-2 Xing header", close(hook_runner.parse_mp3_duration(mpeg2_xing), 300 * mpeg2_frame))
+    no_count = frame(128, body=b"\0" * 32 + b"Xing" + (0).to_bytes(4, "big")) + frame(128) * 9
+    run_test("Xing header without a frame count falls back to the walk",
+             close(hook_runner.parse_mp3_duration(no_count), 10 * mpeg1_frame))
+    vbri = frame(128, body=b"\0" * 32 + b"VBRI" + b"\0" * 10 + (700).to_bytes(4, "big")) + frame(128) * 3
+    run_test("VBRI header frame count", close(hook_runner.parse_mp3_duration(vbri), 700 * mpeg1_frame))
+
+    # Tags around the audio are skipped
+    run_test("ID3v2 tag is skipped", close(hook_runner.parse_mp3_duration(id3v2(300) + cbr), 100 * mpeg1_frame))
+    run_test("sync-like bytes inside ID3v2 are not frames",
+             close(hook_runner.parse_mp3_duration(id3v2(64, fake_sync=True) + cbr), 100 * mpeg1_frame))
+    garbage = b"\xff\xfb\x90\x00junk" + cbr
+    run_test("a lone false sync before the audio is skipped",
+             close(hook_runner.parse_mp3_duration(garbage), 100 * mpeg1_frame),
+             f"got {hook_runner.parse_mp3_duration(garbage)}")
+    id3v1 = b"TAG" + b"\0" * 125
+    run_test("ID3v1 tag at the end is not audio",
+             close(hook_runner.parse_mp3_duration(cbr + id3v1), 100 * mpeg1_frame))
+    run_test("data without MPEG audio has no duration",
+             hook_runner.parse_mp3_duration(b"RIFF" + b"\0" * 2000) is None
+             and hook_runner.parse_mp3_duration(b"") is None)
+
+    # Very large files are estimated from the first frame's bitrate
+    limit = hook_runner.MP3_WALK_LIMIT_BYTES
+    hook_runner.MP3_WALK_LIMIT_BYTES = 1000
+    estimate = hook_runner.parse_mp3_duration(cbr)
+    vbr_estimate = hook_runner.parse_mp3_duration(vbr)
+    hook_runner.MP3_WALK_LIMIT_BYTES = limit
+    run_test("large CBR file is estimated from its bitrate", abs(estimate - 100 * mpeg1_frame) < 0.01,
+             f"got {estimate}")
+    run_test("the estimate uses the first frame's bitrate", close(vbr_estimate, len(vbr) * 8 / 32000))
+
+    # Durations are cached per file and recomputed when it changes (the
+    # manifest of the bundled assets is built first so only the clip counts)
+    hook_runner.get_audio_manifest()
+    hook_runner.parse_mp3_duration = counting_parse(hook_runner.parse_mp3_duration)
+    clip = Path(SANDBOX) / "clip.mp3"
+    clip.write_bytes(cbr)
+    first = hook_runner.get_audio_duration(clip)
+    hook_runner._AUDIO_INFO_CACHE["entries"] = None
+    second = hook_runner.get_audio_duration(clip)
+    run_test("duration is parsed once and cached on disk",
+             first == second == round(100 * mpeg1_frame, 3) and len(PARSED) == 1, f"parsed {len(PARSED)} times")
+    clip.write_bytes(cbr[:len(cbr) // 2])
+    stat = clip.stat()
+    os.utime(str(clip), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    run_test("edited file is parsed again",
+             hook_runner.get_audio_duration(clip) == round(50 * mpeg1_frame, 3) and len(PARSED) == 2)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
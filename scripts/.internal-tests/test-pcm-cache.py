@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the decoded PCM cache
+Verifies the cache stays within its byte limit and that warm hits never decode
+"""
+
+import time
+from pathlib import Path
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("pcm_cache_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+ENTRY_BYTES = 1000
+
+
+class FakeDecoder:
+    """Writes a fixed-size file and counts how often it was asked to decode."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, source, target):
+        self.calls += 1
+        Path(target).write_bytes(b"\0" * ENTRY_BYTES)
+        return True
+
+
+def new_cache(name, max_bytes):
+    decoder = FakeDecoder()
+    cache = hook_runner.PcmCache(Path(SANDBOX) / name, max_bytes, decoder)
+    return cache, decoder
+
+
+def main():
+    print_header("PCM Cache Test Suite")
+
+    source = Path(SANDBOX) / "clip.mp3"
+    source.write_bytes(b"not really an mp3")
+
+    # Warm hits
+    cache, decoder = new_cache("warm", 10 * ENTRY_BYTES)
+    first = cache.get(source, "aaaa")
+    second = cache.get(source, "aaaa")
+    run_test("cold miss decodes once", first is not None and decoder.calls == 1,
+             f"path={first} decoder calls={decoder.calls}")
+    run_test("warm hit skips decoding", second == first and decoder.calls == 1,
+             f"path={second} decoder calls={decoder.calls}")
+    run_test("lookup never decodes", cache.lookup("bbbb") is None and decoder.calls == 1,
+             f"decoder calls={decoder.calls}")
+
+    # Byte limit
+    cache, decoder = new_cache("bounded", 3 * ENTRY_BYTES)
+    within_limit = True
+    for index in range(10):
+        cache.get(source, f"clip{index}")
+        within_limit = within_limit and cache.total_bytes() <= cache.max_bytes
+        time.sleep(0.01)
+    run_test("cache stays within its byte limit", within_limit,
+             f"total={cache.total_bytes()} limit={cache.max_bytes}")
+    survivors = sorted(p.name for p in cache.directory.glob("*.wav"))
+    run_test("newest entries survive eviction",
+             survivors == ["clip7.wav", "clip8.wav", "clip9.wav"], f"got {survivors}")
+
+    # Eviction order is least recently used, not insertion order
+    cache.lookup("clip7")
+    time.sleep(0.01)
+    cache.get(source, "clip10")
+    survivors = sorted(p.name for p in cache.directory.glob("*.wav"))
+    run_test("recently hit entry is kept",
+             survivors == ["clip10.wav", "clip7.wav", "clip9.wav"], f"got {survivors}")
+
+    # An entry larger than the whole cache is not kept
+    cache, decoder = new_cache("tiny", ENTRY_BYTES // 2)
+    run_test("oversized entry is rejected",
+             cache.get(source, "huge") is None and cache.total_bytes() == 0,
+             f"total={cache.total_bytes()}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the playback queue
+Checks FIFO order, what a full queue coalesces, drops and evicts, that
+concurrent hooks never lose an entry, and that only one worker drains
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("queue_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+WRITERS = 4
+ENTRIES_PER_WRITER = 25
+
+PLAYED = []
+STARTED = []
+
+# One hook process enqueueing while the others do the same
+WRITER = """
+import sys
+from pathlib import Path
+sys.path.insert(0, {hooks!r})
+from audio_hooks import runner as hook_runner
+hook_runner.ensure_queue_worker = lambda: None
+hook_runner._SNAPSHOT["snapshot"] = dict(hook_runner.get_config_snapshot(), max_queue_size=1000)
+for index in range({entries}):
+    hook_runner.enqueue_playback("stop", Path("/sounds/w{writer}-%02d.mp3" % index))
+"""
+
+
+def configure(**settings):
+    hook_runner.refresh_config_snapshot()
+    snapshot = dict(hook_runner.get_config_snapshot(), **settings)
+    hook_runner._SNAPSHOT["snapshot"] = snapshot
+
+
+def fake_play(audio_file, duration=None):
+    PLAYED.append(audio_file.name)
+    return True
+
+
+def queued():
+    with hook_runner.FileLock(hook_runner.QUEUE_LOCK_FILE):
+        return [Path(item["file"]).name for item in hook_runner._read_queue()]
+
+
+def enqueue(hook_type, name):
+    return hook_runner.enqueue_playback(hook_type, Path(f"/sounds/{name}"))
+
+
+def triggers():
+    hook_runner.flush_logs()
+    log_file = Path(SANDBOX) / "logs" / "hook_triggers.log"
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+class FakePopen:
+    """Records worker launches instead of starting them."""
+
+    pid = 0
+
+    def __init__(self, cmd, **kwargs):
+        STARTED.append(cmd)
+
+
+def main():
+    print_header("Playback Queue Test Suite")
+
+    # Drain in-process with a recording player
+    hook_runner.play_and_wait = fake_play
+    hook_runner.play_playlist = lambda files, on_start=None: False
+    real_ensure = hook_runner.ensure_queue_worker
+    hook_runner.ensure_queue_worker = lambda: None
+    configure(mix_enabled=False, max_queue_size=3)
+
+    # Sounds of one priority play in arrival order
+    statuses = [enqueue("stop", name) for name in ("one.mp3", "two.mp3", "three.mp3")]
+    run_test("entries are queued in arrival order",
+             statuses == ["QUEUED"] * 3 and queued() == ["one.mp3", "two.mp3", "three.mp3"], f"got {statuses}")
+
+    # Full queue: a waiting sound coalesces, an equal-priority one is dropped
+    status = enqueue("stop", "two.mp3")
+    run_test("full queue coalesces a sound already waiting", status == "COALESCED" and len(queued()) == 3)
+    status = enqueue("subagent_stop", "four.mp3")
+    run_test("full queue drops an equal-priority sound",
+             status == "DROPPED" and queued() == ["one.mp3", "two.mp3", "three.mp3"], f"got {status}")
+
+    # A higher-priority sound evicts the oldest of the lowest priority
+    hook_runner.drain_queue()
+    PLAYED.clear()
+    for name in ("tool-a.mp3", "tool-b.mp3"):
+        enqueue("posttooluse", name)
+    enqueue("stop", "stop.mp3")
+    status = enqueue("notification", "urgent.mp3")
+    run_test("eviction takes the oldest lowest-priority entry first",
+             status == "QUEUED" and queued() == ["tool-b.mp3", "stop.mp3", "urgent.mp3"], f"got {queued()}")
+    status = enqueue("notification", "urgent-2.mp3")
+    run_test("then the next lowest", status == "QUEUED" and queued() == ["stop.mp3", "urgent.mp3", "urgent-2.mp3"],
+             f"got {queued()}")
+    status = enqueue("notification", "urgent-3.mp3")
+    run_test("then the next priority up", queued() == ["urgent.mp3", "urgent-2.mp3", "urgent-3.mp3"],
+             f"got {queued()}")
+    log = triggers()
+    run_test("each eviction is logged in order",
+             log.index("EVICTED | tool-a.mp3") < log.index("EVICTED | tool-b.mp3") < log.index("EVICTED | stop.mp3"),
+             log)
+    status = enqueue("notification", "urgent-4.mp3")
+    run_test("nothing lower left means drop", status == "DROPPED", f"got {status}")
+
+    # The worker plays everything and leaves an empty queue
+    hook_runner.drain_queue()
+    run_test("worker drains in FIFO order", PLAYED == ["urgent.mp3", "urgent-2.mp3", "urgent-3.mp3"]
+             and not queued(), f"got {PLAYED}")
+
+    # Only one worker: a held worker lock stops both draining and launching
+    configure(mix_enabled=False, max_queue_size=10)
+    PLAYED.clear()
+    enqueue("stop", "waiting.mp3")
+    holder = hook_runner.FileLock(hook_runner.WORKER_LOCK_FILE, blocking=False)
+    holder.acquire()
+    popen = hook_runner.subprocess.Popen
+    hook_runner.subprocess.Popen = FakePopen
+    try:
+        run_test("second worker exits at once", hook_runner.drain_queue() == 0 and not PLAYED
+                 and queued() == ["waiting.mp3"])
+        real_ensure()
+        run_test("live worker is not duplicated", not STARTED)
+        holder.release()
+        real_ensure()
+        run_test("idle queue starts a worker", len(STARTED) == 1 and "--drain-queue" in STARTED[0], f"got {STARTED}")
+    finally:
+        hook_runner.subprocess.Popen = popen
+    hook_runner.drain_queue()
+
+    # Concurrent hooks: every entry lands, each hook's in its own order
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER.format(
+        hooks=str(PROJECT_DIR / "hooks"), entries=ENTRIES_PER_WRITER, writer=writer)])
+        for writer in range(WRITERS)]
+    started = time.time()
+    for proc in writers:
+        proc.wait()
+    names = queued()
+    in_order = all([name for name in names if name.startswith(f"w{w}-")]
+                   == [f"w{w}-{i:02d}.mp3" for i in range(ENTRIES_PER_WRITER)] for w in range(WRITERS))
+    run_test("concurrent hooks never lose an entry", len(names) == WRITERS * ENTRIES_PER_WRITER and in_order,
+             f"{len(names)} entries after {time.time() - started:.1f}s")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the audio player registry
+Checks that players are probed once and re-probed only when PATH or a
+player binary changes, and that selection respects each player's formats
+before its startup latency
+"""
+
+import json
+import os
+from pathlib import Path
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory, and
+# let the registry see only the stub players in BIN_DIR
+SANDBOX = harness.sandbox("registry_test_")
+BIN_DIR = Path(SANDBOX) / "bin"
+OTHER_BIN = Path(SANDBOX) / "other-bin"
+PROBES = Path(SANDBOX) / "probes.log"
+os.environ["PATH"] = str(BIN_DIR)
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+
+def install(name, directory=BIN_DIR):
+    """Install a stub player that records each probe."""
+    directory.mkdir(exist_ok=True)
+    stub = directory / name
+    stub.write_text(f"#!/bin/sh\necho {name} >> '{PROBES}'\n", encoding="utf-8")
+    stub.chmod(0o755)
+    return stub
+
+
+def probed():
+    """Return and clear the players probed since the last call."""
+    if not PROBES.exists():
+        return []
+    names = PROBES.read_text(encoding="utf-8").split()
+    PROBES.unlink()
+    return names
+
+
+def lookup():
+    """Look the registry up as a fresh hook process would."""
+    hook_runner._PLAYER_REGISTRY["registry"] = None
+    return hook_runner.get_player_registry()
+
+
+def set_latency(**latencies):
+    for player in hook_runner.get_player_registry()["players"]:
+        player["latency_ms"] = latencies.get(player["name"])
+
+
+def chosen(name):
+    player = hook_runner.select_player(Path(f"/sounds/{name}"))
+    return player["name"] if player else None
+
+
+def main():
+    print_header("Audio Player Registry Test Suite")
+
+    if os.name == "nt":
+        print("  Stub players need a POSIX shell, skipping")
+        return print_summary()
+
+    # Probed once, then reused from players.json
+    install("mpg123")
+    install("aplay")
+    registry = lookup()
+    names = [player["name"] for player in registry["players"]]
+    run_test("probe finds the installed players in preference order", names == ["mpg123", "aplay"], f"got {names}")
+    run_test("probe measures startup latency", sorted(probed()) == ["aplay", "mpg123"]
+             and all(player["latency_ms"] is not None for player in registry["players"]))
+    run_test("registry is persisted", hook_runner.PLAYER_REGISTRY_FILE.exists())
+    lookup()
+    run_test("unchanged PATH and binaries reuse the registry", not probed())
+
+    # Re-probed when PATH or a player binary changes
+    install("paplay", OTHER_BIN)
+    os.environ["PATH"] = f"{BIN_DIR}{os.pathsep}{OTHER_BIN}"
+    registry = lookup()
+    run_test("PATH change re-probes", "paplay" in probed()
+             and "paplay" in [player["name"] for player in registry["players"]])
+    stub = BIN_DIR / "aplay"
+    stat = stub.stat()
+    os.utime(str(stub), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    lookup()
+    run_test("updated binary re-probes", probed())
+    (OTHER_BIN / "paplay").unlink()
+    registry = lookup()
+    run_test("removed binary re-probes", probed() and "paplay" not in [p["name"] for p in registry["players"]])
+    stale = json.loads(hook_runner.PLAYER_REGISTRY_FILE.read_text(encoding="utf-8"))
+    stale["schema"] = hook_runner.PLAYER_REGISTRY_SCHEMA - 1
+    hook_runner.PLAYER_REGISTRY_FILE.write_text(json.dumps(stale), encoding="utf-8")
+    lookup()
+    run_test("older schema re-probes", probed())
+    hook_runner.PLAYER_REGISTRY_FILE.write_text("{", encoding="utf-8")
+    lookup()
+    run_test("corrupt registry re-probes", probed())
+
+    # Formats come first, then the fastest startup
+    install("paplay")
+    install("ffplay")
+    hook_runner.get_player_registry(refresh=True)
+    set_latency(mpg123=40.0, ffplay=90.0, paplay=20.0, aplay=5.0)
+    run_test("MP3 goes to the fastest MP3-capable player", chosen("chime.mp3") == "mpg123", chosen("chime.mp3"))
+    run_test("WAV goes to the fastest player overall", chosen("chime.wav") == "aplay", chosen("chime.wav"))
+    run_test("OGG skips players that cannot open it", chosen("chime.ogg") == "paplay", chosen("chime.ogg"))
+    run_test("anything else falls to ffplay", chosen("chime.opus") == "ffplay", chosen("chime.opus"))
+    set_latency(mpg123=40.0, ffplay=10.0, aplay=None, paplay=20.0)
+    run_test("unmeasured players sort last", chosen("chime.wav") == "ffplay", chosen("chime.wav"))
+    mixed = hook_runner.playlist_player([Path("/sounds/a.mp3"), Path("/sounds/b.wav")])
+    wav_only = hook_runner.playlist_player([Path("/sounds/a.wav"), Path("/sounds/b.wav")])
+    run_test("playlist player must open every file in one run",
+             mixed is None and wav_only is not None and wav_only["name"] == "aplay",
+             f"mixed {mixed and mixed['name']}, wav {wav_only and wav_only['name']}")
+
+    (BIN_DIR / "ffplay").unlink()
+    hook_runner.get_player_registry(refresh=True)
+    run_test("no capable player means no choice", chosen("chime.opus") is None)
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
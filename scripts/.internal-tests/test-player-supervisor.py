@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for the player supervisor
+Uses `sleep` processes as stand-in players to check the concurrency cap,
+overrun kills, preemption and the PID reuse guard
+"""
+
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import harness
+from harness import YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("supervisor_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+SPAWNED = []
+
+
+def configure(**settings):
+    hook_runner.refresh_config_snapshot()
+    snapshot = dict(hook_runner.get_config_snapshot(), **settings)
+    hook_runner._SNAPSHOT["snapshot"] = snapshot
+
+
+def start_player(hook_type, duration=30.0, tracked=True):
+    """Reserve a slot and start a stand-in player like play_audio() does."""
+    if not hook_runner.reserve_player_slot(hook_type):
+        return None
+    proc = subprocess.Popen(["sleep", "30"])
+    SPAWNED.append(proc)
+    if tracked:
+        hook_runner.track_player(proc)
+    hook_runner.register_player(proc, duration)
+    return proc
+
+
+def stopped(proc, timeout=2.0):
+    try:
+        proc.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def reset():
+    for proc in SPAWNED:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    hook_runner.reap_players()
+    hook_runner._write_players([])
+
+
+def triggers():
+    hook_runner.flush_logs()
+    log_file = Path(SANDBOX) / "logs" / "hook_triggers.log"
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+def main():
+    print_header("Player Supervisor Test Suite")
+
+    if os.name == "nt" or shutil.which("sleep") is None:
+        print(f"{YELLOW}Skipping: needs POSIX process control and sleep(1){RESET}")
+        return 0
+
+    # Concurrency cap
+    configure(max_players=2, preempt=True)
+    first = start_player("stop")
+    second = start_player("stop")
+    run_test("players up to the limit start", first is not None and second is not None)
+    run_test("player over the limit is refused", hook_runner.reserve_player_slot("stop") is False)
+    entries = hook_runner._read_players()
+    run_test("table records PIDs and deadlines",
+             sorted(e["pid"] for e in entries) == sorted([first.pid, second.pid])
+             and all(e["deadline"] > time.time() for e in entries), f"got {entries}")
+
+    first.kill()
+    first.wait()
+    run_test("a finished player frees its slot", start_player("stop") is not None)
+    reset()
+
+    # Reservations
+    run_test("one reservation per process",
+             hook_runner.reserve_player_slot("stop") and hook_runner.reserve_player_slot("stop")
+             and len(hook_runner._read_players()) == 1)
+    hook_runner.release_player_slot()
+    run_test("released reservation is removed", hook_runner._read_players() == [])
+    hook_runner._write_players([{"pid": None, "owner": 999999999, "hook": "stop", "reserved": time.time()}])
+    run_test("reservation of a dead process is dropped", hook_runner.supervise_players() == 0)
+    reset()
+
+    # Overrun
+    configure(max_players=4, preempt=True)
+    grace = hook_runner.PLAYBACK_GRACE_SECONDS
+    hook_runner.PLAYBACK_GRACE_SECONDS = 0
+    overrun = start_player("stop", duration=0.1, tracked=False)
+    hook_runner.PLAYBACK_GRACE_SECONDS = grace
+    time.sleep(0.3)
+    live = hook_runner.supervise_players()
+    run_test("player past its clip length is stopped", stopped(overrun) and live == 0,
+             f"live={live} returncode={overrun.poll()}")
+    run_test("overrun is logged", "| stop | OVERRUN | PID" in triggers(), triggers())
+    reset()
+
+    # Preemption across processes (the player is not one of ours)
+    chime = start_player("posttooluse", tracked=False)
+    chime_started = start_player("stop", tracked=False)
+    hook_runner.release_player_slot()
+    hook_runner.reserve_player_slot("notification")
+    run_test("notification preempts a posttooluse player", stopped(chime), f"returncode={chime.poll()}")
+    run_test("other players are left alone", chime_started.poll() is None)
+    run_test("preemption is logged", "| posttooluse | PREEMPTED | PID" in triggers(), triggers())
+    reset()
+
+    configure(max_players=4, preempt=False)
+    chime = start_player("posttooluse", tracked=False)
+    hook_runner.release_player_slot()
+    hook_runner.preempt_players("notification")
+    run_test("preempt: false keeps the player", chime.poll() is None)
+    reset()
+
+    # A recycled PID must never be signalled
+    configure(max_players=4, preempt=True)
+    bystander = subprocess.Popen(["sleep", "30"])
+    SPAWNED.append(bystander)
+    ticks = hook_runner._process_start_ticks(bystander.pid)
+    if ticks is not None:
+        hook_runner._write_players([{"pid": bystander.pid, "start": ticks + 1, "hook": "posttooluse",
+                                     "owner": 1, "started": 0, "deadline": 0}])
+        hook_runner.preempt_players("notification")
+        run_test("reused PID is not signalled", bystander.poll() is None and hook_runner._read_players() == [],
+                 f"table={hook_runner._read_players()}")
+    else:
+        print(f"{YELLOW}Skipping PID reuse check: /proc is not available{RESET}")
+    hook_runner._write_players([{"pid": bystander.pid, "start": None, "hook": "posttooluse",
+                                 "owner": 1, "started": 0, "deadline": 0}])
+    hook_runner.supervise_players()
+    run_test("PID with an unknown start time is not signalled",
+             bystander.poll() is None and hook_runner._read_players() == [],
+             f"table={hook_runner._read_players()}")
+    reset()
+
+    # A hook that finds every slot taken does not start a player
+    configure(max_players=1, preempt=True, queue_enabled=False, debounce_ms=0)
+    busy = start_player("stop", tracked=False)
+    hook_runner.release_player_slot()
+    played = []
+    hook_runner.play_audio = lambda audio_file: played.append(audio_file) or True
+    hook_runner.run_hook_local("subagent_stop", {})
+    run_test("hook over the limit logs BUSY", played == [] and "| subagent_stop | BUSY |" in triggers(),
+             triggers())
+    busy.kill()
+    busy.wait()
+    reset()
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main, cleanup=reset)
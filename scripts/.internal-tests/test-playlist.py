@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for playlist playback
+Plays short WAV clips through a stub multi-file player and checks that one
+process gets every file and that clip starts follow the real clip lengths
+"""
+
+import os
+import time
+import wave
+from pathlib import Path
+
+import harness
+from harness import YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory, and
+# put a stub aplay (WAV, several files per run) first on PATH
+SANDBOX = harness.sandbox("playlist_test_")
+BIN_DIR = Path(SANDBOX) / "bin"
+CALLS = Path(SANDBOX) / "calls.log"
+os.environ["PATH"] = f"{BIN_DIR}{os.pathsep}{os.environ.get('PATH', '')}"
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+RATE = 8000
+CLIP_SECONDS = [0.3, 0.2, 0.25]
+
+
+def make_clip(name, seconds):
+    path = Path(SANDBOX) / name
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(b"\0\0" * int(RATE * seconds))
+    return path
+
+
+def install_stub(play_seconds):
+    BIN_DIR.mkdir(exist_ok=True)
+    stub = BIN_DIR / "aplay"
+    stub.write_text(
+        "#!/bin/sh\n"
+        "[ \"$1\" = \"--version\" ] && exit 0\n"
+        f"echo \"$@\" >> '{CALLS}'\n"
+        f"sleep {play_seconds}\n",
+        encoding="utf-8",
+    )
+    stub.chmod(0o755)
+    for other in ("mpg123", "ffplay", "paplay"):
+        # Hide real players so the registry only sees the stub
+        hidden = BIN_DIR / other
+        hidden.write_text("#!/bin/sh\nexit 1\n", encoding="utf-8")
+        hidden.chmod(0o755)
+    hook_runner.get_player_registry(refresh=True)
+
+
+def calls():
+    if not CALLS.exists():
+        return []
+    return CALLS.read_text(encoding="utf-8").splitlines()
+
+
+def main():
+    print_header("Playlist Playback Test Suite")
+
+    if hook_runner.SYSTEM != "Linux" or hook_runner.IS_WSL:
+        print(f"{YELLOW}Skipping: playlist players are only used on native Linux{RESET}")
+        return 0
+
+    clips = [make_clip(f"clip{index}.wav", seconds) for index, seconds in enumerate(CLIP_SECONDS)]
+    total = sum(CLIP_SECONDS)
+    install_stub(total)
+
+    registry = hook_runner.get_player_registry()
+    names = {player["name"]: player["playlist"] for player in registry["players"]}
+    run_test("registry marks playlist players", names.get("aplay") is True and names.get("ffplay") is False,
+             f"got {names}")
+    run_test("playlist player covers every format",
+             hook_runner.playlist_player(clips)["name"] == "aplay"
+             and hook_runner.playlist_player(clips + [Path("x.mp3")]) is None)
+
+    starts = []
+    started = time.monotonic()
+    ok = hook_runner.play_playlist(clips, on_start=lambda index: starts.append(time.monotonic() - started))
+    elapsed = time.monotonic() - started
+    run_test("one player gets every file", ok and calls() == [" ".join(str(clip) for clip in clips)],
+             f"ok={ok} calls={calls()}")
+    expected = [0.0, CLIP_SECONDS[0], CLIP_SECONDS[0] + CLIP_SECONDS[1]]
+    run_test("clip starts follow the real lengths",
+             len(starts) == 3 and all(abs(a - b) < 0.1 for a, b in zip(starts, expected)),
+             f"starts={[round(s, 3) for s in starts]} expected={expected}")
+    run_test("returns once the player has finished", total - 0.05 <= elapsed < total + 1.0,
+             f"took {elapsed:.2f}s")
+    run_test("unknown formats fall back to the caller",
+             hook_runner.play_playlist([Path(SANDBOX) / "missing.ogg"]) is False)
+
+    # Queued sounds that are already waiting share one player
+    CALLS.unlink()
+    now = time.time()
+    hook_runner._write_queue([
+        {"hook": "stop", "file": str(clip), "ts": now, "due": now} for clip in clips
+    ])
+    hook_runner.drain_queue()
+    hook_runner.flush_logs()
+    log = (Path(SANDBOX) / "logs" / "hook_triggers.log").read_text(encoding="utf-8")
+    run_test("queue drains a batch as one playlist", len(calls()) == 1 and len(calls()[0].split()) == 3,
+             f"calls={calls()}")
+    run_test("each queued sound is logged as it starts", log.count("PLAYED | clip") == 3
+             and "(playlist)" in log, log)
+    run_test("queue is empty afterwards", hook_runner._read_queue() == [])
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for queue priorities
+Checks the per-hook defaults and overrides, that the worker always plays the
+most urgent waiting sound next and that a full queue evicts the least urgent
+"""
+
+import time
+from pathlib import Path
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("priority_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+PLAYED = []
+
+
+def configure(**settings):
+    hook_runner.refresh_config_snapshot()
+    snapshot = dict(hook_runner.get_config_snapshot(), **settings)
+    hook_runner._SNAPSHOT["snapshot"] = snapshot
+
+
+def entry(hook_type, name, age=0.0, **extra):
+    now = time.time()
+    return dict({"hook": hook_type, "file": f"/sounds/{name}", "ts": now - age, "due": now - age}, **extra)
+
+
+def fake_play(audio_file, duration=None):
+    PLAYED.append(audio_file.name)
+    return True
+
+
+def triggers():
+    hook_runner.flush_logs()
+    log_file = Path(SANDBOX) / "logs" / "hook_triggers.log"
+    return log_file.read_text(encoding="utf-8") if log_file.exists() else ""
+
+
+def main():
+    print_header("Queue Priority Test Suite")
+
+    # Drain in-process with a recording player and no background worker
+    hook_runner.play_and_wait = fake_play
+    hook_runner.play_playlist = lambda files, on_start=None: False
+    hook_runner.ensure_queue_worker = lambda: None
+    configure(mix_enabled=False)
+
+    # Per-hook defaults and overrides
+    order = ["notification", "stop", "session_start", "posttooluse"]
+    priorities = [hook_runner.get_hook_priority(hook) for hook in order]
+    run_test("default priorities rank notification, stop, session, tool",
+             priorities == sorted(priorities, reverse=True) and len(set(priorities)) == 4,
+             f"got {dict(zip(order, priorities))}")
+    run_test("subagent_stop ranks with stop",
+             hook_runner.get_hook_priority("subagent_stop") == hook_runner.get_hook_priority("stop"))
+    compiled = hook_runner.compile_priorities({"posttooluse": 9, "subagent": 0, "stop": "high", "_comment": "x"})
+    run_test("overrides merge over the defaults",
+             compiled["posttooluse"] == 9 and compiled["subagent_stop"] == 0
+             and compiled["stop"] == hook_runner.DEFAULT_HOOK_PRIORITIES["stop"]
+             and compiled["notification"] == hook_runner.DEFAULT_HOOK_PRIORITIES["notification"],
+             f"got {compiled}")
+
+    # The worker plays the most urgent waiting sound next, oldest first within a level
+    hook_runner._write_queue([
+        entry("posttooluse", "tool.mp3", age=4),
+        entry("session_start", "session.mp3", age=3),
+        entry("stop", "stop-old.mp3", age=2),
+        entry("notification", "urgent.mp3", age=1),
+        entry("stop", "stop-new.mp3", age=0.5),
+    ])
+    hook_runner.drain_queue()
+    run_test("highest priority plays first",
+             PLAYED == ["urgent.mp3", "stop-old.mp3", "stop-new.mp3", "session.mp3", "tool.mp3"],
+             f"got {PLAYED}")
+
+    # Entries written before priorities existed use their hook's default
+    PLAYED.clear()
+    hook_runner._write_queue([entry("posttooluse", "tool.mp3", age=1), entry("stop", "stop.mp3")])
+    hook_runner.drain_queue()
+    run_test("entries without a priority use the hook default", PLAYED == ["stop.mp3", "tool.mp3"],
+             f"got {PLAYED}")
+
+    # A notification arriving mid-batch jumps ahead of the sounds still waiting
+    PLAYED.clear()
+    hook_runner._write_queue([entry("posttooluse", f"tool{i}.mp3", age=3 - i) for i in range(3)])
+
+    def play_then_notify(audio_file, duration=None):
+        if audio_file.name == "tool0.mp3":
+            with hook_runner.FileLock(hook_runner.QUEUE_LOCK_FILE):
+                hook_runner._write_queue(hook_runner._read_queue() + [entry("notification", "urgent.mp3")])
+        return fake_play(audio_file)
+
+    hook_runner.play_and_wait = play_then_notify
+    hook_runner.drain_queue()
+    hook_runner.play_and_wait = fake_play
+    run_test("urgent sound interrupts a lower batch",
+             PLAYED == ["tool0.mp3", "urgent.mp3", "tool1.mp3", "tool2.mp3"], f"got {PLAYED}")
+
+    # A full queue evicts the least urgent, oldest entry
+    configure(mix_enabled=False, max_queue_size=3)
+    hook_runner._write_queue([
+        entry("posttooluse", "tool-old.mp3", age=2, priority=1),
+        entry("posttooluse", "tool-new.mp3", age=1, priority=1),
+        entry("stop", "stop.mp3", priority=3),
+    ])
+    status = hook_runner.enqueue_playback("notification", Path("/sounds/urgent.mp3"))
+    names = [Path(item["file"]).name for item in hook_runner._read_queue()]
+    run_test("full queue evicts the lowest priority", status == "QUEUED"
+             and names == ["tool-new.mp3", "stop.mp3", "urgent.mp3"], f"got {status}, {names}")
+    run_test("eviction is logged", "| posttooluse | EVICTED | tool-old.mp3" in triggers(), triggers())
+    run_test("queued entry records its priority", hook_runner._read_queue()[-1]["priority"]
+             == hook_runner.get_hook_priority("notification"))
+    status = hook_runner.enqueue_playback("posttooluse", Path("/sounds/other.mp3"))
+    run_test("sound ranked no higher than the queue is dropped",
+             status == "DROPPED" and len(hook_runner._read_queue()) == 3, f"got {status}")
+    status = hook_runner.enqueue_summary("stop", Path("/sounds/summary.mp3"), 0)
+    names = [Path(item["file"]).name for item in hook_runner._read_queue()]
+    run_test("burst summaries evict too", status == "AGGREGATED" and "tool-new.mp3" not in names,
+             f"got {status}, {names}")
+
+    # Priorities can be changed in playback_settings
+    configure(mix_enabled=False, max_queue_size=3,
+              priorities=hook_runner.compile_priorities({"posttooluse": 10}))
+    status = hook_runner.enqueue_playback("posttooluse", Path("/sounds/tool.mp3"))
+    run_test("configured priority changes what is evicted", status == "QUEUED", f"got {status}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
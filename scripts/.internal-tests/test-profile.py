@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for per-phase profiling
+Runs hooks in-process with CLAUDE_HOOKS_PROFILE=1 and checks the records,
+the diagnose.py percentile tables and the Chrome trace export
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import harness
+from harness import PROJECT_DIR, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("profile_test_", CLAUDE_HOOKS_NO_DAEMON="1", CLAUDE_HOOKS_PROFILE="1")
+sys.path.insert(0, str(PROJECT_DIR / "scripts"))
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+import diagnose  # noqa: E402
+
+
+def read_records():
+    hook_runner.flush_logs()
+    log_file = Path(SANDBOX) / "logs" / "profile.log"
+    return [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+
+
+def main():
+    print_header("Phase Profiling Test Suite")
+
+    # Keep the hook from starting a real player or queue worker
+    hook_runner.is_queue_enabled = lambda: False
+    hook_runner.play_audio = lambda audio_file: True
+
+    hook_runner.begin_profile()
+    hook_runner.run_hook("stop", {})
+    hook_runner.flush_profile("stop")
+    hook_runner.begin_profile()
+    hook_runner.run_hook("stop", {})
+    hook_runner.flush_profile("stop")
+
+    records = read_records()
+    run_test("one record per invocation", len(records) == 2, f"got {len(records)}")
+    played, debounced = records
+    names = [phase[0] for phase in played["phases"]]
+    run_test("played path records every phase",
+             names == ["daemon_send", "config", "debounce", "select_audio", "rate_limit", "play", "log"],
+             f"got {names}")
+    run_test("status comes from the trigger log",
+             (played["status"], debounced["status"]) == ("PLAYED", "DEBOUNCED"),
+             f"got {played['status']}, {debounced['status']}")
+    run_test("debounced path stops after debounce",
+             [phase[0] for phase in debounced["phases"]] == ["daemon_send", "config", "debounce", "log"],
+             f"got {debounced['phases']}")
+    ordered = all(a[1] + a[2] <= b[1] for a, b in zip(played["phases"], played["phases"][1:]))
+    within = all(0 <= start and start + duration <= played["total_us"]
+                 for _, start, duration in played["phases"])
+    run_test("phases are sequential and inside the total", ordered and within, f"got {played}")
+    run_test("record is one compact line",
+             " " not in (Path(SANDBOX) / "logs" / "profile.log").read_text(encoding="utf-8").splitlines()[0])
+
+    hook_runner.PROFILE = False
+    hook_runner.begin_profile()
+    hook_runner.run_hook("pretooluse", {})
+    hook_runner.flush_profile("pretooluse")
+    run_test("nothing is recorded when profiling is off", len(read_records()) == 2)
+
+    rows = {row["phase"]: row for row in diagnose.summarize_profiles(records)}
+    run_test("summary has a row per phase plus total",
+             set(rows) == {"total"} | set(names), f"got {sorted(rows)}")
+    run_test("phase counts", rows["play"]["count"] == 1 and rows["debounce"]["count"] == 2,
+             f"got {rows['play']['count']}, {rows['debounce']['count']}")
+    run_test("nearest-rank percentiles",
+             diagnose.percentile([5, 1, 4, 2, 3], 50) == 3
+             and diagnose.percentile(list(range(1, 101)), 95) == 95
+             and diagnose.percentile([7], 99) == 7)
+
+    trace = diagnose.profile_trace(records)["traceEvents"]
+    run_test("trace has an event per phase plus one per invocation",
+             len(trace) == len(played["phases"]) + len(debounced["phases"]) + 2, f"got {len(trace)}")
+    run_test("trace events are complete events in microseconds",
+             all(event["ph"] == "X" and isinstance(event["ts"], int) for event in trace)
+             and trace[1]["ts"] == int(played["ts"] * 1e6) + played["phases"][0][1])
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
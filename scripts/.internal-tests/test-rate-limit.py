@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for token-bucket rate limiting and burst aggregation
+Verifies bucket refill and that a suppressed burst plays one summary sound
+"""
+
+import time
+from pathlib import Path
+
+import harness
+from harness import run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+SANDBOX = harness.sandbox("rate_limit_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+
+def main():
+    print_header("Rate Limit Test Suite")
+
+    allowed = [hook_runner.take_rate_token("pretooluse", 0, 3) for _ in range(5)]
+    run_test("bucket allows its burst, then limits",
+             allowed == [True, True, True, False, False], f"got {allowed}")
+
+    # 6000 per minute refills one token every 10 ms
+    drained = [hook_runner.take_rate_token("posttooluse", 6000, 1) for _ in range(2)]
+    time.sleep(0.05)
+    run_test("bucket refills over time",
+             drained == [True, False] and hook_runner.take_rate_token("posttooluse", 6000, 1),
+             f"got {drained}")
+
+    run_test("debounce slot is kept separately",
+             hook_runner.should_debounce("pretooluse") is False)
+
+    # Burst aggregation: no worker is started, the queue is drained in-process
+    hook_runner.ensure_queue_worker = lambda: None
+    played = []
+
+    def fake_play(audio_file, duration=None):
+        played.append(audio_file)
+        return True
+
+    hook_runner.play_and_wait = fake_play
+    audio_file = Path(SANDBOX) / "tool.mp3"
+    statuses = [hook_runner.enqueue_summary("posttooluse", audio_file, 300) for _ in range(5)]
+    entries = hook_runner._read_queue()
+    run_test("suppressed events share one summary entry",
+             statuses == ["AGGREGATED"] * 5 and len(entries) == 1 and entries[0]["count"] == 5,
+             f"statuses={statuses} queue={entries}")
+
+    started = time.time()
+    hook_runner.drain_queue()
+    waited = time.time() - started
+    run_test("summary plays once after the burst goes quiet",
+             played == [audio_file] and waited >= 0.2, f"played={played} waited={waited:.2f}s")
+    run_test("queue is empty afterwards", hook_runner._read_queue() == [])
+    run_test("summary names the event count",
+             hook_runner._entry_name(entries[0]) == "tool.mp3 (summary of 5 events)",
+             hook_runner._entry_name(entries[0]))
+
+    limits = hook_runner.compile_rate_limits({
+        "subagent": {"per_minute": 2, "burst": 4, "aggregate": True},
+        "pretooluse": {"per_minute": -1},
+        "bad": 3,
+    })
+    run_test("config aliases and validation",
+             limits["subagent_stop"] == {"per_minute": 2.0, "burst": 4, "aggregate": True, "quiet_ms": 2000}
+             and limits["pretooluse"]["per_minute"] == hook_runner.DEFAULT_RATE_PER_MINUTE
+             and "bad" not in limits,
+             f"got {limits}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
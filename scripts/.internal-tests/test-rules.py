@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the sound rule engine
+Verifies rule matching, including through the bash resolver, and benchmarks
+lookup cost as the rule count grows
+"""
+
+import time
+from pathlib import Path
+
+import harness
+from harness import BLUE, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+harness.sandbox("rules_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+BENCH_EVENTS = 20000
+# Generous ceiling: a lookup must stay far below process startup cost
+BENCH_LIMIT_US = 50.0
+# Compiling patterns is a per-process cost; 100 rules is a large real config
+BENCH_COLD_RULES = 100
+BENCH_COLD_LIMIT_MS = 20.0
+
+
+def event(tool, name="PostToolUse", **extra):
+    return dict(hook_event_name=name, tool_name=tool, **extra)
+
+
+def synthetic_rules(count):
+    """Half exact, half regex rules that never match the benchmark events."""
+    rules = []
+    for index in range(count):
+        rule = {"hook": "posttooluse", "tool": "*", "tool_regex": None, "groups": 0,
+                "outcome": "*", "audio": f"/sounds/{index}.mp3"}
+        if index % 2:
+            rule["tool_regex"] = f"Tool{index}(Alpha|Beta)?"
+            rule["groups"] = 1
+        else:
+            rule["tool"] = f"Tool{index}"
+        rules.append(rule)
+    return rules
+
+
+def bench(count):
+    rules = synthetic_rules(count) + [{"hook": "*", "tool": "*", "tool_regex": "Ba.h", "groups": 0,
+                                       "outcome": "*", "audio": "/sounds/bash.mp3"}]
+    payload = event("Bash")
+    # First event in a fresh process: build the table and compile its patterns
+    started = time.perf_counter()
+    table = hook_runner.build_rule_table(rules)
+    hook_runner.match_rule(table, "posttooluse", payload)
+    cold_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(BENCH_EVENTS):
+        result = hook_runner.match_rule(table, "posttooluse", payload)
+    elapsed_us = (time.perf_counter() - started) / BENCH_EVENTS * 1e6
+    assert result == "/sounds/bash.mp3"
+    return cold_ms, elapsed_us
+
+
+def main():
+    print_header("Sound Rules Test Suite")
+
+    rules = hook_runner.compile_rules([
+        {"hook": "posttooluse", "tool": "Bash", "outcome": "failure",
+         "audio": "default/notification-urgent.mp3"},
+        {"hook": "posttooluse", "tool": "Bash", "audio": "default/task-complete.mp3"},
+        {"tool_regex": "Edit|Write|MultiEdit", "audio": "default/task-progress.mp3"},
+        {"hook": "subagent", "audio": "default/session-end.mp3"},
+        {"tool": "Task", "audio": "default/session-start.mp3"},
+        {"tool": "Bash", "tool_regex": "x", "audio": "default/task-complete.mp3"},
+        {"tool_regex": "(", "audio": "default/task-complete.mp3"},
+        {"outcome": "maybe", "audio": "default/task-complete.mp3"},
+        {"tool": "Read", "audio": "missing/nothing.mp3"},
+        "not a rule",
+    ])
+    run_test("invalid rules are skipped", len(rules) == 5, f"kept {len(rules)}")
+    table = hook_runner.build_rule_table(rules)
+
+    def pick(hook_type, payload):
+        audio = hook_runner.match_rule(table, hook_type, payload)
+        return Path(audio).name if audio else None
+
+    run_test("exact tool and failure outcome",
+             pick("posttooluse", event("Bash", "PostToolUseFailure")) == "notification-urgent.mp3")
+    run_test("error field marks a failure",
+             pick("posttooluse", event("Bash", error="exit 1")) == "notification-urgent.mp3")
+    run_test("success falls through to the next rule",
+             pick("posttooluse", event("Bash")) == "task-complete.mp3")
+    run_test("regex matches the whole tool name",
+             pick("pretooluse", event("MultiEdit", "PreToolUse")) == "task-progress.mp3"
+             and pick("pretooluse", event("EditNotebook", "PreToolUse")) is None)
+    run_test("hook aliases apply to rules", pick("subagent_stop", {"hook_event_name": "SubagentStop"})
+             == "session-end.mp3")
+    run_test("first matching rule wins",
+             pick("posttooluse", event("Task")) == "session-start.mp3"
+             and pick("subagent_stop", event("Task", "SubagentStop")) == "session-end.mp3")
+    run_test("unmatched events use the hook sound", pick("stop", {"hook_event_name": "Stop"}) is None)
+
+    # The bash hooks' --resolve call applies the rules too
+    snapshot = hook_runner.get_config_snapshot()
+    hook_runner._SNAPSHOT["snapshot"] = dict(snapshot, rules=rules, key="rules_test", queue_enabled=False,
+                                             enabled=dict(snapshot["enabled"], posttooluse=True))
+    line = hook_runner.resolve_hook("posttooluse", event("Bash", error="exit 1"))
+    run_test("resolver plays the matching rule's sound",
+             Path(line.split("\t")[3]).name == "notification-urgent.mp3", repr(line))
+
+    print("")
+    print(f"{BLUE}Lookup cost by rule count (first event, then {BENCH_EVENTS} warm events):{RESET}")
+    timings = {}
+    for count in (0, 10, 100, 1000):
+        timings[count] = bench(count)
+        print(f"  {count:>5} rules: first {timings[count][0]:7.2f} ms, warm {timings[count][1]:7.2f} us/event")
+    print("")
+    run_test(f"{BENCH_COLD_RULES} rules: first event under {BENCH_COLD_LIMIT_MS:.0f} ms",
+             timings[BENCH_COLD_RULES][0] < BENCH_COLD_LIMIT_MS,
+             f"{timings[BENCH_COLD_RULES][0]:.2f} ms")
+    run_test(f"1000 rules: warm lookups under {BENCH_LIMIT_US:.0f} us/event",
+             timings[1000][1] < BENCH_LIMIT_US, f"{timings[1000][1]:.2f} us")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for per-session state and the machine-wide sound arbiter
+Checks that sessions keep their own debounce and rate-limit state, that the
+global bucket caps sounds across sessions, and stress-tests lock contention
+as the number of concurrent sessions grows
+"""
+
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import harness
+from harness import YELLOW, RESET, run_test, print_header, print_summary
+
+# Keep the runner's queue and log files out of the real temp directory
+harness.sandbox("sessions_test_")
+
+from audio_hooks import runner as hook_runner  # noqa: E402
+
+STRESS_SESSIONS = (1, 4, 16)
+STRESS_EVENTS = 200
+# Most acquisitions allowed to wait for another process, per session count
+STRESS_MAX_CONTENDED = 0.02
+
+
+def configure(**settings):
+    hook_runner.refresh_config_snapshot()
+    snapshot = dict(hook_runner.get_config_snapshot(), **settings)
+    hook_runner._SNAPSHOT["snapshot"] = snapshot
+
+
+def in_session(session_id):
+    hook_runner._SESSION[0] = hook_runner.session_namespace(session_id)
+
+
+def reset_state():
+    for namespace in list(hook_runner._DEBOUNCE_STATE["sessions"]):
+        hook_runner._close_session_state(namespace)
+    hook_runner._DEBOUNCE_STATE["map"] = None
+    hook_runner._DEBOUNCE_STATE["slots"] = {}
+    for key in hook_runner.LOCK_STATS:
+        hook_runner.LOCK_STATS[key] = 0
+
+
+def storm(start_at, session_id, events):
+    """One session's hook process firing events back to back."""
+    reset_state()
+    in_session(session_id)
+    time.sleep(max(0.0, start_at - time.time()))
+    for _ in range(events):
+        hook_runner.should_debounce("posttooluse")
+        hook_runner.take_rate_token("posttooluse", 60000, 1000)
+        hook_runner.take_global_token(60, 5)
+    return dict(hook_runner.LOCK_STATS)
+
+
+def stress(context, sessions, shared):
+    start_at = time.time() + 0.3
+    jobs = [(start_at, None if shared else f"session-{index}", STRESS_EVENTS) for index in range(sessions)]
+    with context.Pool(sessions) as pool:
+        results = pool.starmap(storm, jobs)
+    acquired = sum(result["acquired"] for result in results)
+    contended = sum(result["contended"] for result in results)
+    wait_us = sum(result["wait_us"] for result in results)
+    return contended / max(acquired, 1), wait_us / (sessions * STRESS_EVENTS)
+
+
+def main():
+    print_header("Session State Test Suite")
+
+    configure(debounce_ms=60000, global_rate_limit=None)
+
+    # Namespaces
+    run_test("session ids become safe file names",
+             hook_runner.session_namespace("../../etc/passwd") == "_.._etc_passwd"
+             and hook_runner.session_namespace("abc-123") == "abc-123"
+             and hook_runner.session_namespace("") is None and hook_runner.session_namespace(None) is None
+             and len(hook_runner.session_namespace("x" * 500)) == hook_runner.SESSION_ID_MAX_LENGTH,
+             f"got {hook_runner.session_namespace('../../etc/passwd')}")
+
+    # Debounce and buckets are per session
+    in_session("alpha")
+    first = hook_runner.should_debounce("stop")
+    repeat = hook_runner.should_debounce("stop")
+    in_session("beta")
+    other = hook_runner.should_debounce("stop")
+    run_test("a session debounces its own repeats", (first, repeat) == (False, True))
+    run_test("sessions do not debounce each other", other is False)
+    run_test("each session has its own state file",
+             sorted(path.name for path in hook_runner.SESSIONS_DIR.glob("*.state")) == ["alpha.state", "beta.state"])
+    in_session(None)
+    run_test("events without a session use the shared state",
+             hook_runner.should_debounce("stop") is False and hook_runner.DEBOUNCE_STATE_FILE.exists())
+
+    in_session("alpha")
+    drained = [hook_runner.take_rate_token("pretooluse", 0, 2) for _ in range(3)]
+    in_session("beta")
+    run_test("rate-limit buckets are per session",
+             drained == [True, True, False] and hook_runner.take_rate_token("pretooluse", 0, 2), f"got {drained}")
+
+    # The arbiter caps sounds across every session
+    allowed = []
+    for index in range(6):
+        in_session(f"arbiter-{index}")
+        allowed.append(hook_runner.take_global_token(0, 3))
+    run_test("machine-wide bucket caps the total", allowed == [True] * 3 + [False] * 3, f"got {allowed}")
+    acquired = hook_runner.LOCK_STATS["acquired"]
+    hook_runner.take_global_token(0, 3)
+    run_test("an empty bucket is refused without the lock", hook_runner.LOCK_STATS["acquired"] == acquired)
+    configure(debounce_ms=0, global_rate_limit={"per_minute": 0.0, "burst": 3})
+    in_session("arbiter-late")
+    run_test("over the cap the event is THROTTLED",
+             hook_runner.apply_rate_limit("stop", Path("/sounds/stop.mp3")) == "THROTTLED")
+    run_test("global_rate_limit: false disables the cap",
+             hook_runner.compile_global_rate_limit(False) is None)
+    run_test("global_rate_limit is opt-in: a missing key sets no cap",
+             hook_runner.compile_global_rate_limit(None) is None
+             and hook_runner.compile_config({"playback_settings": {}})["global_rate_limit"] is None)
+    run_test("global_rate_limit: {} uses the default cap",
+             hook_runner.compile_global_rate_limit({}) == {
+                 "per_minute": hook_runner.DEFAULT_GLOBAL_PER_MINUTE,
+                 "burst": hook_runner.DEFAULT_GLOBAL_BURST})
+    configure(debounce_ms=60000, global_rate_limit=None)
+
+    # Session lifecycle
+    hook_runner.begin_session("session_end", {"session_id": "alpha"})
+    run_test("session_end removes the session's state",
+             not (hook_runner.SESSIONS_DIR / "alpha.state").exists()
+             and not (hook_runner.SESSIONS_DIR / "alpha.lock").exists() and hook_runner._SESSION[0] is None)
+    stale = hook_runner.SESSIONS_DIR / "beta.state"
+    os.utime(str(stale), (time.time() - 2 * hook_runner.SESSION_STATE_MAX_AGE_SECONDS,) * 2)
+    hook_runner.begin_session("session_start", {"session_id": "gamma"})
+    run_test("session_start prunes abandoned sessions", not stale.exists() and hook_runner._SESSION[0] == "gamma")
+
+    maps_max = hook_runner.SESSION_MAPS_MAX
+    hook_runner.SESSION_MAPS_MAX = 4
+    for index in range(10):
+        in_session(f"many-{index}")
+        hook_runner.should_debounce("stop")
+    run_test("a long-lived process keeps a bounded number of maps",
+             len(hook_runner._DEBOUNCE_STATE["sessions"]) == 4
+             and "many-9" in hook_runner._DEBOUNCE_STATE["sessions"])
+    hook_runner.SESSION_MAPS_MAX = maps_max
+
+    # Contention stays flat as sessions are added
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        configure(debounce_ms=0, global_rate_limit=None)
+        rows = []
+        for sessions in STRESS_SESSIONS:
+            rows.append((sessions, stress(context, sessions, shared=False), stress(context, sessions, shared=True)))
+        print("")
+        print("  sessions  contended (per-session / shared)  wait per event (per-session / shared)")
+        for sessions, (own, own_wait), (shared, shared_wait) in rows:
+            print(f"  {sessions:8d}  {own:9.2%} / {shared:6.2%}          {own_wait:9.1f} µs / {shared_wait:.1f} µs")
+        print("")
+        worst = max(own for _, (own, _), _ in rows)
+        run_test("per-session lock contention stays flat", worst <= STRESS_MAX_CONTENDED,
+                 f"worst {worst:.2%} of acquisitions waited")
+    else:
+        print(f"{YELLOW}Skipping stress test: fork is not available{RESET}")
+
+    return print_summary()
+
+
+if __name__ == "__main__":
+    harness.run(main)
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Claude Code Audio Hooks - Hook Latency Benchmark
+
+Measures how long `python hook_runner.py <hook_type>` takes from start to
+return, which is the latency every Claude Code event pays. Each hook type is
+run cold (runner caches and bytecode removed before every run) and warm, N times, on
+the disabled, debounced and played paths, attached and (with --attach)
+detached (CLAUDE_HOOKS_DETACH=1). Runs use a sandboxed copy of the hook
+runner, generated configs and stub audio players on PATH (or, with
+--players real, the installed ones), so the user's config, queue and
+trigger history are never touched.
+
+Usage:
+    python benchmark_hooks.py [--runs N] [--hooks H,H] [--paths P,P] [--modes cold,warm]
+                              [--attach attached,detached] [--players stub|real]
+                              [--output FILE] [--compare BASELINE.json]
+
+Options:
+    --runs N        Invocations per hook, path and mode (default: 20)
+    --hooks         Comma-separated hook types (default: all nine)
+    --paths         disabled, debounced, played, queued (default: first three)
+    --modes         cold, warm (default: both)
+    --attach        attached, detached (default: attached); detached results
+                    are stored as <path>+detached/<mode>/<hook>
+    --players       stub (exit at once, the default) or real (the players
+                    installed on PATH, which really play every sound)
+    --output FILE   Where to write the JSON results (default: hook-benchmark-<rev>.json)
+    --compare FILE  Print p50/p95 changes against an earlier results file
+"""
+
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+RESULTS_SCHEMA = 1
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPT_DIR.parent
+HOOK_RUNNER = PROJECT_DIR / "hooks" / "hook_runner.py"
+RUNNER_PACKAGE = PROJECT_DIR / "hooks" / "audio_hooks"
+
+HOOK_EVENTS = {
+    "notification": "Notification",
+    "stop": "Stop",
+    "pretooluse": "PreToolUse",
+    "posttooluse": "PostToolUse",
+    "userpromptsubmit": "UserPromptSubmit",
+    "subagent_stop": "SubagentStop",
+    "precompact": "PreCompact",
+    "session_start": "SessionStart",
+    "session_end": "SessionEnd",
+}
+
+PATHS = ("disabled", "debounced", "played", "queued")
+DEFAULT_PATHS = ("disabled", "debounced", "played")
+MODES = ("cold", "warm")
+ATTACH_MODES = ("attached", "detached")
+
+# Detached runs leave a grandchild finishing the event. When they are
+# benchmarked, every run is followed by this pause (attached runs too, to
+# keep the comparison fair) so that work is not billed to the next run.
+DETACH_SETTLE_SECONDS = 0.3
+
+# Players the runner may look for; each stub exits immediately
+STUB_PLAYERS = ("mpg123", "ffplay", "paplay", "aplay", "afplay")
+PLAYER_SOURCES = ("stub", "real")
+
+# Real players outlive their run, so lift the supervisor's limit; otherwise
+# later played runs would be refused as BUSY
+REAL_MAX_PLAYERS = 1000
+
+# Files the runner rebuilds on demand; removing them makes a run cold
+CACHE_FILES = ("config_snapshot.json", "players.json", "audio_info.json", "audio_manifest.json")
+
+
+class Colors:
+    """ANSI color codes for terminal output."""
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    BOLD = '\033[1m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def disable():
+        """Disable colors (for non-TTY output)."""
+        Colors.GREEN = ''
+        Colors.RED = ''
+        Colors.YELLOW = ''
+        Colors.BLUE = ''
+        Colors.BOLD = ''
+        Colors.RESET = ''
+
+
+if not sys.stdout.isatty():
+    Colors.disable()
+
+# =============================================================================
+# STATISTICS
+# =============================================================================
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Reduce timings (ms) to the figures stored in the results file."""
+    return {
+        "n": len(samples),
+        "p50": round(percentile(samples, 50), 3),
+        "p95": round(percentile(samples, 95), 3),
+        "p99": round(percentile(samples, 99), 3),
+        "mean": round(sum(samples) / len(samples), 3),
+        "min": round(min(samples), 3),
+        "max": round(max(samples), 3),
+    }
+
+# =============================================================================
+# SANDBOX
+# =============================================================================
+
+class Sandbox:
+    """A throwaway project tree, temp dir and PATH for benchmark runs."""
+
+    def __init__(self, players: str = "stub"):
+        self.players = players
+        self.root = Path(tempfile.mkdtemp(prefix="hook_benchmark_"))
+        self.project = self.root / "project"
+        self.hooks_dir = self.project / "hooks"
+        self.runner = self.hooks_dir / "hook_runner.py"
+        self.config_file = self.project / "config" / "user_preferences.json"
+        self.tmp = self.root / "tmp"
+        self.queue_dir = self.tmp / "claude_audio_hooks_queue"
+        self.bin_dir = self.root / "bin"
+
+        self.hooks_dir.mkdir(parents=True)
+        self.config_file.parent.mkdir()
+        self.tmp.mkdir()
+        self.bin_dir.mkdir()
+        shutil.copy2(str(HOOK_RUNNER), str(self.runner))
+        shutil.copytree(str(RUNNER_PACKAGE), str(self.hooks_dir / RUNNER_PACKAGE.name),
+                        ignore=shutil.ignore_patterns("__pycache__"))
+        shutil.copytree(str(PROJECT_DIR / "audio"), str(self.project / "audio"))
+        for name in STUB_PLAYERS if players == "stub" else ():
+            stub = self.bin_dir / name
+            stub.write_text("#!/bin/sh\nexit 0\n", encoding="utf-8")
+            stub.chmod(0o755)
+
+        self.env = dict(os.environ)
+        self.env.update({
+            "PATH": f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "TMPDIR": str(self.tmp),
+            "CLAUDE_HOOKS_LOG_DIR": str(self.root / "logs"),
+            "CLAUDE_HOOKS_NO_DAEMON": "1",
+        })
+        self.env.pop("CLAUDE_HOOKS_DEBUG", None)
+        # Installed hooks get their bytecode cached; warm runs should too
+        self.env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    def write_config(self, path: str) -> None:
+        """Write preferences that send every hook down the given path."""
+        playback = {
+            "queue_enabled": path == "queued",
+            "debounce_ms": 3600 * 1000 if path == "debounced" else 0,
+            "pcm_cache": False,
+            "rate_limits": {},
+        }
+        if self.players == "real":
+            playback["max_players"] = REAL_MAX_PLAYERS
+        self.config_file.write_text(json.dumps({
+            "enabled_hooks": {hook: path != "disabled" for hook in HOOK_EVENTS},
+            "playback_settings": playback,
+        }), encoding="utf-8")
+        self.reset_state()
+
+    def clear_caches(self) -> None:
+        """Remove every cache the runner rebuilds, keeping runtime state."""
+        for name in CACHE_FILES:
+            try:
+                (self.queue_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            (self.hooks_dir / ".env_cache.json").unlink()
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(str(self.hooks_dir / RUNNER_PACKAGE.name / "__pycache__"), ignore_errors=True)
+
+    def reset_state(self) -> None:
+        """Forget debounce timestamps, queued sounds and caches."""
+        shutil.rmtree(str(self.queue_dir), ignore_errors=True)
+        self.clear_caches()
+
+    def run_hook(self, hook: str, python: str, detached: bool = False) -> float:
+        """Run one hook event and return its wall time in ms.
+
+        Output goes to pipes, as with Claude Code, so the time also covers
+        waiting for every process that still holds them open.
+        """
+        payload = json.dumps({
+            "session_id": "benchmark",
+            "cwd": str(self.project),
+            "hook_event_name": HOOK_EVENTS[hook],
+            "tool_name": "Bash",
+        }).encode("utf-8")
+        env = dict(self.env, CLAUDE_HOOKS_DETACH="1" if detached else "0")
+        started = time.perf_counter()
+        subprocess.run(
+            [python, str(self.runner), hook],
+            input=payload,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+        )
+        return (time.perf_counter() - started) * 1000.0
+
+    def import_time_us(self, python: str) -> Optional[int]:
+        """Cumulative import time of the runner reported by -X importtime."""
+        result = subprocess.run(
+            [python, "-X", "importtime", "-c", "import audio_hooks.runner"],
+            cwd=str(self.hooks_dir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=self.env,
+        )
+        for line in result.stderr.decode("utf-8", "replace").splitlines():
+            parts = [part.strip() for part in line.split("|")]
+            if len(parts) == 3 and parts[2] == "audio_hooks.runner":
+                return int(parts[1])
+        return None
+
+    def cleanup(self) -> None:
+        shutil.rmtree(str(self.root), ignore_errors=True)
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def git_revision() -> Optional[str]:
+    """Short hash of the checked-out revision, if this is a git tree."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(PROJECT_DIR),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        return None
+    revision = result.stdout.decode("ascii", "replace").strip()
+    return revision or None
+
+
+def run_benchmark(runs: int, hooks: List[str], paths: List[str], modes: List[str],
+                  attach: List[str], python: str, players: str = "stub") -> Dict[str, Any]:
+    """Run every (path, attach, mode, hook) combination and collect timings."""
+    sandbox = Sandbox(players)
+    results: Dict[str, Any] = {}
+    try:
+        interpreter = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([python, "-c", "pass"], env=sandbox.env)
+            interpreter.append((time.perf_counter() - started) * 1000.0)
+
+        imports = []
+        sandbox.write_config("disabled")
+        sandbox.run_hook("stop", python)
+        for _ in range(runs):
+            value = sandbox.import_time_us(python)
+            if value is not None:
+                imports.append(value / 1000.0)
+
+        settle = DETACH_SETTLE_SECONDS if "detached" in attach else 0.0
+        for path in paths:
+            for attach_mode in attach:
+                detached = attach_mode == "detached"
+                label = f"{path}+detached" if detached else path
+                sandbox.write_config(path)
+                for mode in modes:
+                    combined: List[float] = []
+                    for hook in hooks:
+                        # The first event records the debounce timestamp; a
+                        # warm run also needs it to build the caches
+                        sandbox.run_hook(hook, python, detached)
+                        time.sleep(settle)
+                        samples = []
+                        for _ in range(runs):
+                            if mode == "cold":
+                                sandbox.clear_caches()
+                            samples.append(sandbox.run_hook(hook, python, detached))
+                            time.sleep(settle)
+                        results[f"{label}/{mode}/{hook}"] = summarize(samples)
+                        combined.extend(samples)
+                    results[f"{label}/{mode}/all"] = summarize(combined)
+                    print(f"  {label:<19} {mode:<5} p50 {results[f'{label}/{mode}/all']['p50']:8.2f} ms")
+    finally:
+        sandbox.cleanup()
+
+    return {
+        "schema": RESULTS_SCHEMA,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": f"{platform.system()} {platform.release()}",
+        "runs": runs,
+        "attach": attach,
+        "players": players,
+        "interpreter_ms": summarize(interpreter),
+        "import_ms": summarize(imports) if imports else None,
+        "results": results,
+    }
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def print_report(data: Dict[str, Any]) -> None:
+    """Print the percentile table for one results file."""
+    print(f"\n{Colors.BOLD}Hook latency (ms), {data['runs']} runs each, "
+          f"revision {data['revision'] or 'unknown'}{Colors.RESET}")
+    print(f"{'path/mode/hook':<36} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for key, stats in sorted(data["results"].items()):
+        label = f"{Colors.BOLD}{key:<36}{Colors.RESET}" if key.endswith("/all") else f"{key:<36}"
+        print(f"{label} {stats['p50']:8.2f} {stats['p95']:8.2f} {stats['p99']:8.2f} {stats['max']:8.2f}")
+    print(f"\n{'interpreter start (python -c pass)':<36} {data['interpreter_ms']['p50']:8.2f} p50")
+    if data["import_ms"]:
+        print(f"{'import audio_hooks.runner':<36} {data['import_ms']['p50']:8.2f} p50")
+
+
+def print_detach_comparison(data: Dict[str, Any]) -> None:
+    """Print how much wall time detaching saves on each path and mode."""
+    rows = [(key, stats, data["results"].get(key.replace("+detached/", "/", 1)))
+            for key, stats in sorted(data["results"].items())
+            if key.endswith("/all") and "+detached/" in key]
+    rows = [row for row in rows if row[2]]
+    if not rows:
+        return
+    print(f"\n{Colors.BOLD}Attached vs detached (p50 ms){Colors.RESET}")
+    print(f"{'path/mode':<36} {'attached':>9} {'detached':>9} {'saved':>8}")
+    for key, detached, attached in rows:
+        saved = attached["p50"] - detached["p50"]
+        color = Colors.GREEN if saved > 0 else Colors.RED
+        print(f"{key.replace('+detached', '')[:-len('/all')]:<36} {attached['p50']:9.2f} "
+              f"{detached['p50']:9.2f} {color}{saved:+8.2f}{Colors.RESET}")
+
+
+def print_comparison(data: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print p50/p95 changes against a baseline results file."""
+    print(f"\n{Colors.BOLD}Compared with revision {baseline.get('revision') or 'unknown'}"
+          f" ({baseline.get('created', '?')}){Colors.RESET}")
+    print(f"{'path/mode/hook':<36} {'p50 before':>10} {'after':>8} {'change':>8} {'p95 change':>11}")
+    rows = [("import_ms", baseline.get("import_ms"), data.get("import_ms"))]
+    rows += [(key, baseline["results"].get(key), stats) for key, stats in sorted(data["results"].items())]
+    for key, before, after in rows:
+        if not before or not after:
+            continue
+        change = (after["p50"] - before["p50"]) / before["p50"] * 100.0 if before["p50"] else 0.0
+        change95 = (after["p95"] - before["p95"]) / before["p95"] * 100.0 if before["p95"] else 0.0
+        color = Colors.RED if change > 10 else Colors.GREEN if change < -10 else ""
+        print(f"{key:<36} {before['p50']:10.2f} {after['p50']:8.2f} "
+              f"{color}{change:+7.1f}%{Colors.RESET} {change95:+10.1f}%")
+
+
+def main() -> int:
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark hook_runner.py end-to-end latency",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Invocations per combination (default: 20)")
+    parser.add_argument("--hooks", default=",".join(HOOK_EVENTS), help="Comma-separated hook types")
+    parser.add_argument("--paths", default=",".join(DEFAULT_PATHS),
+                        help=f"Comma-separated paths from {', '.join(PATHS)}")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated modes: cold, warm")
+    parser.add_argument("--attach", default="attached",
+                        help="Comma-separated from attached, detached (default: attached)")
+    parser.add_argument("--players", default="stub", choices=PLAYER_SOURCES,
+                        help="stub players that exit at once (default) or the real installed ones")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter to run the hooks with")
+    parser.add_argument("--output", help="JSON results file (default: hook-benchmark-<rev>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if os.name == "nt" and args.players == "stub":
+        print("Error: the stub player needs a POSIX shell; run this under WSL, macOS or Linux",
+              file=sys.stderr)
+        return 1
+
+    hooks = [hook.strip() for hook in args.hooks.split(",") if hook.strip()]
+    paths = [path.strip() for path in args.paths.split(",") if path.strip()]
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    attach = [item.strip() for item in args.attach.split(",") if item.strip()]
+    for value, allowed, name in ((hooks, HOOK_EVENTS, "hook"), (paths, PATHS, "path"), (modes, MODES, "mode"),
+                                 (attach, ATTACH_MODES, "attach mode")):
+        unknown = [item for item in value if item not in allowed]
+        if unknown:
+            print(f"Error: unknown {name}: {', '.join(unknown)}", file=sys.stderr)
+            return 1
+    if args.runs < 1:
+        print("Error: --runs must be at least 1", file=sys.stderr)
+        return 1
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read {args.compare}: {e}", file=sys.stderr)
+            return 1
+
+    print(f"{Colors.BLUE}Benchmarking {len(hooks)} hooks x {len(paths)} paths x {len(modes)} modes"
+          f" x {len(attach)} attach modes, {args.runs} runs each...{Colors.RESET}")
+    data = run_benchmark(args.runs, hooks, paths, modes, attach, args.python, args.players)
+
+    print_report(data)
+    print_detach_comparison(data)
+    if baseline:
+        print_comparison(data, baseline)
+
+    output = Path(args.output or f"hook-benchmark-{data['revision'] or 'local'}.json")
+    output.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
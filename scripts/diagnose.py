@@ -6,23 +6,38 @@ This tool helps diagnose issues with the audio hooks installation.
 It checks the environment, configuration, and tests audio playback.
 
 Usage:
-    python diagnose.py [--verbose] [--test-audio]
+    python diagnose.py [--verbose] [--test-audio] [--json] [--timeout SECS]
+    python diagnose.py --history [--hook HOOK] [--status STATUS] [--since WINDOW] [--tail N] [--ingest]
+    python diagnose.py --profile [--hook HOOK] [--since WINDOW] [--trace FILE]
 
 Options:
     --verbose       Show detailed debug information
     --test-audio    Test audio playback
+    --json          Print check results and timings as JSON
+    --timeout SECS  Give up on a check after SECS seconds (default: 5)
+    --history       Query the hook trigger history instead of running checks
+    --ingest        With --history, first move spooled triggers into history.db
+    --profile       Summarize CLAUDE_HOOKS_PROFILE=1 phase timings
+    --trace FILE    With --profile, also write a Chrome trace (chrome://tracing)
     --help          Show this help message
 """
 
 import json
 import os
+import re
 import sys
+import time
 import platform
 import subprocess
 import shutil
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 
+# The log layout comes from this checkout's hook runner
+HOOKS_DIR = Path(__file__).resolve().parent.parent / "hooks"
+sys.path.insert(0, str(HOOKS_DIR))
+from audio_hooks.runner import get_log_dir, list_log_segments  # noqa: E402
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -135,7 +150,7 @@ def check_platform() -> Dict[str, str]:
 
 
 def check_hooks_directory() -> Tuple[bool, str, Optional[Path]]:
-    """Check if hooks directory exists and contains hook_runner.py."""
+    """Check if hooks directory exists and contains the hook runner."""
     hooks_dir = Path.home() / ".claude" / "hooks"
 
     if not hooks_dir.exists():
@@ -145,6 +160,9 @@ def check_hooks_directory() -> Tuple[bool, str, Optional[Path]]:
     if not hook_runner.exists():
         return False, "hook_runner.py not found", hooks_dir
 
+    if not (hooks_dir / "audio_hooks" / "runner.py").exists():
+        return False, "audio_hooks/runner.py not found (re-run the installer)", hooks_dir
+
     return True, f"Found at {hooks_dir}", hooks_dir
 
 
@@ -183,21 +201,48 @@ def check_project_path(hooks_dir: Path) -> Tuple[bool, str, Optional[Path]]:
         return False, f"Error reading project path: {e}", None
 
 
-def check_audio_files(project_dir: Path) -> Tuple[bool, str]:
-    """Check if audio files exist."""
+def load_audio_manifest(hooks_dir: Path) -> Optional[Dict[str, Any]]:
+    """Ask the installed hook runner for its (refreshed) audio manifest."""
+    try:
+        result = subprocess.run(
+            [sys.executable, str(hooks_dir / "hook_runner.py"), "--manifest"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=CHECK_TIMEOUT_SECONDS)
+        manifest = json.loads(result.stdout.decode("utf-8"))
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and "assets" in manifest else None
+
+
+def check_audio_files(project_dir: Path, hooks_dir: Path) -> Tuple[bool, str, List[str]]:
+    """Check the audio assets, using the hook runner's manifest when available.
+
+    The manifest records every asset's codec and length, so corrupt or
+    misnamed files are reported as well as missing defaults.
+    """
+    manifest = load_audio_manifest(hooks_dir)
+    if manifest is not None:
+        assets = manifest["assets"]
+        problems = [f"{os.path.relpath(item['path'], manifest['root'])}: {item['problem']}"
+                    for item in manifest["problems"]]
+        total = sum(asset.get("duration") or 0 for asset in assets.values())
+        message = f"Found {len(assets)} audio files ({total:.1f}s of audio)"
+        if problems:
+            return False, f"{message}, {len(problems)} with problems", problems
+        return True, message, []
+
     audio_dir = project_dir / "audio" / "default"
 
     if not audio_dir.exists():
-        return False, "Audio directory not found"
+        return False, "Audio directory not found", []
 
     mp3_files = list(audio_dir.glob("*.mp3"))
 
     if len(mp3_files) >= 9:
-        return True, f"Found {len(mp3_files)} audio files"
+        return True, f"Found {len(mp3_files)} audio files", []
     elif len(mp3_files) > 0:
-        return True, f"Found {len(mp3_files)} audio files (expected 9)"
+        return True, f"Found {len(mp3_files)} audio files (expected 9)", []
     else:
-        return False, "No MP3 files found"
+        return False, "No MP3 files found", []
 
 
 def check_settings_json() -> Tuple[bool, str]:
@@ -248,34 +293,342 @@ def check_config(project_dir: Path) -> Tuple[bool, str]:
         return False, f"Error reading config: {e}"
 
 
+def tail_lines(path: Path, count: int, block_size: int = 4096) -> List[str]:
+    """Return the last `count` lines of a file, reading backwards from the end."""
+    if count <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    return lines[-count:]
+
+
+def tail_log(log_file: Path, count: int) -> List[str]:
+    """Tail a rotating log, continuing into older segments if needed."""
+    lines: List[str] = []
+    for path in [log_file] + list(reversed(list_log_segments(log_file))):
+        if len(lines) >= count:
+            break
+        try:
+            lines = tail_lines(path, count - len(lines)) + lines
+        except OSError:
+            continue
+    return lines
+
+
+def history_spool_bytes() -> int:
+    """Return the size of the trigger rows still waiting in the spool files.
+
+    One-shot hooks append their history rows to a spool file that the
+    daemon, the queue worker or a full spool moves into history.db.
+    """
+    spool = get_log_dir() / "history.spool"
+    total = 0
+    for path in list_log_segments(spool) + [spool]:
+        try:
+            total += path.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def ingest_history_spool() -> bool:
+    """Have this checkout's hook runner move spooled triggers into history.db."""
+    hook_runner = HOOKS_DIR / "hook_runner.py"
+    try:
+        result = subprocess.run([sys.executable, str(hook_runner), "--ingest-history"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                timeout=CHECK_TIMEOUT_SECONDS)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+def open_history_db():
+    """Open the trigger history database read-only, or return None."""
+    db_file = get_log_dir() / "history.db"
+    if not db_file.exists():
+        return None
+    try:
+        import sqlite3
+        return sqlite3.connect(f"{db_file.as_uri()}?mode=ro", uri=True, timeout=2.0)
+    except Exception:
+        return None
+
+
 def check_logs() -> Tuple[bool, str, List[str]]:
     """Check hook trigger logs."""
-    if platform.system() == "Windows":
-        temp_dir = Path(os.environ.get("TEMP", os.environ.get("TMP", "C:/Windows/Temp")))
-    else:
-        temp_dir = Path("/tmp")
-
-    log_dir = temp_dir / "claude_audio_hooks_queue" / "logs"
-    log_file = log_dir / "hook_triggers.log"
+    log_file = get_log_dir() / "hook_triggers.log"
 
     recent_logs = []
 
-    if not log_file.exists():
+    if not log_file.exists() and not list_log_segments(log_file):
         return False, "No trigger logs found (hooks may not have been triggered yet)", recent_logs
 
     try:
-        lines = log_file.read_text(encoding="utf-8").strip().splitlines()
-        recent_logs = lines[-10:] if len(lines) > 10 else lines
+        recent_logs = tail_log(log_file, 10)
 
-        if len(lines) > 0:
-            return True, f"Found {len(lines)} log entries", recent_logs
-        else:
+        if not recent_logs:
             return False, "Log file is empty", recent_logs
 
+        conn = open_history_db()
+        if conn is not None:
+            try:
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM triggers WHERE ts >= ?", (time.time() - 86400,)
+                ).fetchone()[0]
+                return True, f"{count} hook triggers in the last 24h", recent_logs
+            except Exception:
+                pass
+            finally:
+                conn.close()
+
+        return True, "Trigger log found", recent_logs
+
     except Exception as e:
         return False, f"Error reading logs: {e}", recent_logs
 
 
+# =============================================================================
+# TRIGGER HISTORY QUERIES
+# =============================================================================
+
+WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(text: str) -> float:
+    """Parse a time window such as '30m', '1h' or '7d' into seconds."""
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([smhd])\s*$", text.lower())
+    if not match:
+        raise ValueError(f"Invalid time window: {text!r} (use e.g. 30m, 1h, 7d)")
+    return float(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+
+def query_history(conn, since_seconds: float, hook: Optional[str] = None,
+                  status: Optional[str] = None, tail: int = 10) -> Dict[str, Any]:
+    """Summarize triggers in a time window using the history indexes."""
+    start = time.time() - since_seconds
+    where = "ts >= ?"
+    params: List[Any] = [start]
+    if hook:
+        where += " AND hook = ?"
+        params.append(hook)
+    if status:
+        where += " AND status = ?"
+        params.append(status.upper())
+
+    counts = conn.execute(
+        f"SELECT hook, status, COUNT(*), AVG(latency_ms), MAX(latency_ms) "
+        f"FROM triggers WHERE {where} GROUP BY hook, status ORDER BY hook, status",
+        params,
+    ).fetchall()
+    recent = conn.execute(
+        f"SELECT ts, hook, status, latency_ms, details FROM triggers "
+        f"WHERE {where} ORDER BY ts DESC LIMIT ?",
+        params + [tail],
+    ).fetchall()
+
+    return {
+        "since_seconds": since_seconds,
+        "total": sum(row[2] for row in counts),
+        "counts": [
+            {
+                "hook": row[0],
+                "status": row[1],
+                "count": row[2],
+                "avg_latency_ms": row[3],
+                "max_latency_ms": row[4],
+            }
+            for row in counts
+        ],
+        "recent": [
+            {
+                "ts": row[0],
+                "hook": row[1],
+                "status": row[2],
+                "latency_ms": row[3],
+                "details": row[4],
+            }
+            for row in reversed(recent)
+        ],
+    }
+
+
+def run_history(since: str, hook: Optional[str], status: Optional[str], tail: int,
+                ingest: bool = False) -> int:
+    """Print trigger counts, rates and the most recent events.
+
+    With ingest, spooled rows are first moved into history.db for good.
+    """
+    try:
+        since_seconds = parse_window(since)
+    except ValueError as e:
+        print_fail(str(e))
+        return 1
+
+    if ingest and not ingest_history_spool():
+        print_warn("Could not ingest the trigger spool; querying history.db as it is")
+    pending = history_spool_bytes()
+
+    conn = open_history_db()
+    if conn is None:
+        if pending:
+            print_warn("No triggers stored yet; run with --ingest to store the spooled ones")
+        else:
+            print_warn("No trigger history found (hooks may not have been triggered yet)")
+        return 1
+
+    try:
+        result = query_history(conn, since_seconds, hook=hook, status=status, tail=tail)
+    except Exception as e:
+        print_fail(f"Error querying history: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print_section(f"Hook triggers in the last {since}")
+    if pending:
+        print_info(f"{max(1, pending // 1024)} KB of triggers not stored yet; add --ingest to include them")
+
+    if not result["counts"]:
+        print_info("No matching triggers")
+        return 0
+
+    minutes = since_seconds / 60.0
+    print(f"  {'HOOK':<18} {'STATUS':<16} {'COUNT':>7} {'PER MIN':>9} {'AVG MS':>8} {'MAX MS':>8}")
+    for row in result["counts"]:
+        avg = f"{row['avg_latency_ms']:.1f}" if row["avg_latency_ms"] is not None else "-"
+        peak = f"{row['max_latency_ms']:.1f}" if row["max_latency_ms"] is not None else "-"
+        print(f"  {row['hook']:<18} {row['status']:<16} {row['count']:>7} "
+              f"{row['count'] / minutes:>9.2f} {avg:>8} {peak:>8}")
+    print(f"\n  Total: {result['total']} ({result['total'] / minutes:.2f}/min)")
+
+    if result["recent"]:
+        print_section(f"Last {len(result['recent'])} triggers")
+        for event in result["recent"]:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["ts"]))
+            line = f"  {timestamp} | {event['hook']} | {event['status']}"
+            if event["details"]:
+                line += f" | {event['details']}"
+            print(line)
+
+    return 0
+
+
+# =============================================================================
+# PHASE PROFILES
+# =============================================================================
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list."""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def load_profile_records(since_seconds: float, hook: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read profile.log and its rotated segments, oldest record first."""
+    log_file = get_log_dir() / "profile.log"
+    start = time.time() - since_seconds
+    records = []
+    for path in list_log_segments(log_file) + [log_file]:
+        try:
+            lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or record.get("ts", 0) < start:
+                continue
+            if hook and record.get("hook") != hook:
+                continue
+            records.append(record)
+    return records
+
+
+def summarize_profiles(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-phase duration percentiles (ms), "total" first, then in run order."""
+    durations: Dict[str, List[float]] = {"total": []}
+    starts: Dict[str, List[float]] = {"total": [float("-inf")]}
+    for record in records:
+        durations["total"].append(record.get("total_us", 0) / 1000.0)
+        for name, start_us, duration_us in record.get("phases", []):
+            durations.setdefault(name, []).append(duration_us / 1000.0)
+            starts.setdefault(name, []).append(start_us)
+    order = sorted(durations, key=lambda name: percentile(starts[name], 50))
+    return [
+        {
+            "phase": name,
+            "count": len(durations[name]),
+            "p50": percentile(durations[name], 50),
+            "p95": percentile(durations[name], 95),
+            "p99": percentile(durations[name], 99),
+            "max": max(durations[name]),
+        }
+        for name in order
+    ]
+
+
+def profile_trace(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert profile records to Chrome trace-event format."""
+    events = []
+    for record in records:
+        base_us = int(record.get("ts", 0) * 1e6)
+        pid = record.get("pid", 0)
+        args = {"hook": record.get("hook"), "status": record.get("status")}
+        events.append({"name": f"{record.get('hook')} ({record.get('status') or '?'})",
+                       "ph": "X", "ts": base_us, "dur": record.get("total_us", 0),
+                       "pid": pid, "tid": pid, "args": args})
+        for name, start_us, duration_us in record.get("phases", []):
+            events.append({"name": name, "ph": "X", "ts": base_us + start_us,
+                           "dur": duration_us, "pid": pid, "tid": pid, "args": args})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def run_profile(since: str, hook: Optional[str], trace: Optional[str]) -> int:
+    """Print per-phase percentile tables for recorded hook invocations."""
+    try:
+        since_seconds = parse_window(since)
+    except ValueError as e:
+        print_fail(str(e))
+        return 1
+
+    records = load_profile_records(since_seconds, hook)
+    if not records:
+        print_warn("No profile records found (run hooks with CLAUDE_HOOKS_PROFILE=1)")
+        return 1
+
+    hooks = sorted({record.get("hook", "?") for record in records})
+    for name in ([None] + hooks if len(hooks) > 1 else hooks):
+        subset = [record for record in records if name is None or record.get("hook") == name]
+        print_section(f"Phase timings (ms) for {name or 'all hooks'}: "
+                      f"{len(subset)} invocations in the last {since}")
+        print(f"  {'PHASE':<14} {'COUNT':>7} {'P50':>9} {'P95':>9} {'P99':>9} {'MAX':>9}")
+        for row in summarize_profiles(subset):
+            print(f"  {row['phase']:<14} {row['count']:>7} {row['p50']:>9.2f} "
+                  f"{row['p95']:>9.2f} {row['p99']:>9.2f} {row['max']:>9.2f}")
+
+    if trace:
+        try:
+            Path(trace).write_text(json.dumps(profile_trace(records)), encoding="utf-8")
+        except OSError as e:
+            print_fail(f"Could not write trace: {e}")
+            return 1
+        print_ok(f"Chrome trace written to {trace} (open in chrome://tracing or Perfetto)")
+
+    return 0
+
+
 def test_audio_playback(project_dir: Path) -> Tuple[bool, str]:
     """Test audio playback."""
     audio_file = project_dir / "audio" / "default" / "task-complete.mp3"
@@ -284,7 +637,6 @@ def test_audio_playback(project_dir: Path) -> Tuple[bool, str]:
         return False, "Test audio file not found"
 
     system = platform.system()
-    print_info(f"Testing audio playback on {system}...")
 
     try:
         if system == "Windows":
@@ -353,103 +705,211 @@ $p.Close()
 # MAIN DIAGNOSTIC
 # =============================================================================
 
-def run_diagnostics(verbose: bool = False, test_audio: bool = False) -> int:
-    """Run all diagnostic checks."""
-    print_header(f"Claude Code Audio Hooks Diagnostic Tool v{VERSION}")
+# Checks run concurrently. One still running after its timeout is reported
+# as failed and abandoned; the process exits without waiting for it.
+CHECK_TIMEOUT_SECONDS = 5.0
+AUDIO_TEST_TIMEOUT_SECONDS = 15.0
+CHECK_WORKERS = 8
 
-    issues = 0
-    project_dir = None
+# Names of checks abandoned after a timeout; main() then exits without
+# joining their threads
+ABANDONED_CHECKS: List[str] = []
 
-    # Section 1: Environment
-    print_section("Environment")
 
-    # Python version
-    ok, msg = check_python_version()
-    if ok:
-        print_ok(msg)
-    else:
-        print_fail(msg)
-        issues += 1
+class CheckRunner:
+    """Runs checks in a thread pool and collects each one's timing."""
 
-    # Platform detection
-    platform_info = check_platform()
-    print_ok(f"Platform: {platform_info['detected']} ({platform_info['system']} {platform_info['release']})")
+    def __init__(self, timeout: float):
+        from concurrent.futures import ThreadPoolExecutor
 
-    if platform_info['is_wsl']:
-        print_info("WSL detected - audio will use Windows PowerShell")
-    if platform_info['is_git_bash']:
-        print_info("Git Bash detected - audio will use Windows PowerShell")
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=CHECK_WORKERS)
+        self.pending: Dict[str, Tuple[Any, float]] = {}
 
-    # Section 2: Installation
-    print_section("Installation")
+    @staticmethod
+    def _timed(func, args) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        value = func(*args)
+        return value, (time.perf_counter() - started) * 1000.0
 
-    # Hooks directory
-    ok, msg, hooks_dir = check_hooks_directory()
-    if ok:
-        print_ok(msg)
-    else:
-        print_fail(msg)
-        issues += 1
-
-    # Project path
-    if hooks_dir:
-        ok, msg, project_dir = check_project_path(hooks_dir)
-        if ok:
-            print_ok(msg)
-        else:
-            print_fail(msg)
-            issues += 1
-
-    # Audio files
-    if project_dir:
-        ok, msg = check_audio_files(project_dir)
-        if ok:
-            print_ok(msg)
-        else:
-            print_fail(msg)
-            issues += 1
+    def submit(self, name: str, func, *args, timeout: Optional[float] = None) -> None:
+        """Start a check; its timeout counts from now."""
+        deadline = time.perf_counter() + (timeout if timeout is not None else self.timeout)
+        self.pending[name] = (self.pool.submit(self._timed, func, args), deadline)
 
-    # Section 3: Configuration
-    print_section("Configuration")
+    def result(self, name: str) -> Dict[str, Any]:
+        """Wait for a check and return {"value", "duration_ms", "error"}."""
+        from concurrent.futures import TimeoutError as FutureTimeout
 
-    # settings.json
-    ok, msg = check_settings_json()
-    if ok:
-        print_ok(msg)
-    else:
-        print_fail(msg)
-        issues += 1
-
-    # user_preferences.json
-    if project_dir:
-        ok, msg = check_config(project_dir)
-        if ok:
-            print_ok(msg)
-        else:
-            print_warn(msg)
-
-    # Section 4: Logs
-    print_section("Recent Activity")
-
-    ok, msg, recent_logs = check_logs()
-    if ok:
-        print_ok(msg)
-        if verbose and recent_logs:
-            print_info("Recent log entries:")
-            for log in recent_logs[-5:]:
-                print(f"      {log}")
-    else:
-        print_warn(msg)
-
-    # Section 5: Audio Test (optional)
-    if test_audio and project_dir:
-        print_section("Audio Playback Test")
-        ok, msg = test_audio_playback(project_dir)
-        if ok:
-            print_ok(msg)
+        future, deadline = self.pending[name]
+        try:
+            value, duration_ms = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            return {"value": value, "duration_ms": duration_ms, "error": None}
+        except FutureTimeout:
+            ABANDONED_CHECKS.append(name)
+            return {"value": None, "duration_ms": None, "error": "timed out"}
+        except Exception as e:
+            return {"value": None, "duration_ms": None, "error": f"check raised {e!r}"}
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=not ABANDONED_CHECKS)
+
+
+class Report:
+    """Check outcomes in display order, printed as text or kept for JSON."""
+
+    def __init__(self, as_json: bool):
+        self.as_json = as_json
+        self.checks: List[Dict[str, Any]] = []
+        self.section = ""
+        self.issues = 0
+
+    def start_section(self, title: str) -> None:
+        self.section = title
+        if not self.as_json:
+            print_section(title)
+
+    def add(self, name: str, record: Dict[str, Any], ok: bool, message: str,
+            severity: str = "fail", details: Optional[List[str]] = None,
+            lines: Optional[List[str]] = None) -> None:
+        """Record one check; a failure counts as an issue unless severity is "warn"."""
+        if record["error"]:
+            ok, message = False, f"{name} check {record['error']}"
+        status = "ok" if ok else severity
+        if status == "fail":
+            self.issues += 1
+        duration = record["duration_ms"]
+        self.checks.append({
+            "name": name,
+            "section": self.section,
+            "status": status,
+            "message": message,
+            "duration_ms": round(duration, 3) if duration is not None else None,
+            "details": details or [],
+            "lines": lines or [],
+        })
+        if self.as_json:
+            return
+        {"ok": print_ok, "fail": print_fail, "warn": print_warn}[status](message)
+        for detail in details or []:
+            print_info(detail)
+        for line in lines or []:
+            print(f"      {line}")
+
+
+def run_diagnostics(verbose: bool = False, test_audio: bool = False, as_json: bool = False,
+                    timeout: float = CHECK_TIMEOUT_SECONDS) -> int:
+    """Run all diagnostic checks.
+
+    Independent checks start together; those that need the project
+    directory start as soon as it is known. Results are reported in a
+    fixed order, as coloured text or (as_json) one JSON document.
+    """
+    started = time.perf_counter()
+    if not as_json:
+        print_header(f"Claude Code Audio Hooks Diagnostic Tool v{VERSION}")
+
+    checks = CheckRunner(timeout)
+    report = Report(as_json)
+    try:
+        checks.submit("python_version", check_python_version)
+        checks.submit("platform", check_platform)
+        checks.submit("hooks_directory", check_hooks_directory)
+        checks.submit("settings_json", check_settings_json)
+        checks.submit("logs", check_logs)
+
+        hooks_record = checks.result("hooks_directory")
+        hooks_dir = hooks_record["value"][2] if hooks_record["value"] else None
+        project_record = None
+        project_dir = None
+        if hooks_dir:
+            checks.submit("project_path", check_project_path, hooks_dir)
+            project_record = checks.result("project_path")
+            project_dir = project_record["value"][2] if project_record["value"] else None
+        if project_dir:
+            checks.submit("audio_files", check_audio_files, project_dir, hooks_dir)
+            checks.submit("config", check_config, project_dir)
+            if test_audio:
+                checks.submit("audio_test", test_audio_playback, project_dir,
+                              timeout=max(timeout, AUDIO_TEST_TIMEOUT_SECONDS))
+
+        # Section 1: Environment
+        report.start_section("Environment")
+
+        record = checks.result("python_version")
+        ok, msg = record["value"] or (False, "")
+        report.add("python_version", record, ok, msg)
+
+        record = checks.result("platform")
+        info = record["value"] or {}
+        notes = []
+        if info.get("is_wsl"):
+            notes.append("WSL detected - audio will use Windows PowerShell")
+        if info.get("is_git_bash"):
+            notes.append("Git Bash detected - audio will use Windows PowerShell")
+        report.add("platform", record, bool(info),
+                   f"Platform: {info.get('detected')} ({info.get('system')} {info.get('release')})",
+                   details=notes)
+
+        # Section 2: Installation
+        report.start_section("Installation")
+
+        ok, msg, _ = hooks_record["value"] or (False, "", None)
+        report.add("hooks_directory", hooks_record, ok, msg)
+
+        if project_record:
+            ok, msg, _ = project_record["value"] or (False, "", None)
+            report.add("project_path", project_record, ok, msg)
+
+        if project_dir:
+            record = checks.result("audio_files")
+            ok, msg, problems = record["value"] or (False, "", [])
+            report.add("audio_files", record, ok, msg, lines=problems)
+
+        # Section 3: Configuration
+        report.start_section("Configuration")
+
+        record = checks.result("settings_json")
+        ok, msg = record["value"] or (False, "")
+        report.add("settings_json", record, ok, msg)
+
+        if project_dir:
+            record = checks.result("config")
+            ok, msg = record["value"] or (False, "")
+            report.add("config", record, ok, msg, severity="warn")
+
+        # Section 4: Logs
+        report.start_section("Recent Activity")
+
+        record = checks.result("logs")
+        ok, msg, recent_logs = record["value"] or (False, "", [])
+        if ok and verbose and recent_logs:
+            report.add("logs", record, ok, msg, severity="warn",
+                       details=["Recent log entries:"], lines=recent_logs[-5:])
         else:
-            print_fail(msg)
-            issues += 1
+            report.add("logs", record, ok, msg, severity="warn")
+
+        # Section 5: Audio Test (optional)
+        if test_audio and project_dir:
+            report.start_section("Audio Playback Test")
+            if not as_json:
+                print_info(f"Testing audio playback on {platform.system()}...")
+            record = checks.result("audio_test")
+            ok, msg = record["value"] or (False, "")
+            report.add("audio_test", record, ok, msg)
+    finally:
+        checks.close()
+
+    issues = report.issues
+    if as_json:
+        print(json.dumps({
+            "version": VERSION,
+            "ok": issues == 0,
+            "issues": issues,
+            "duration_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            "checks": report.checks,
+        }, indent=2))
+        return 0 if issues == 0 else 1
 
     # Summary
     print_section("Summary")
@@ -478,14 +938,39 @@ Examples:
   python diagnose.py --verbose        # Show detailed information
   python diagnose.py --test-audio     # Include audio playback test
   python diagnose.py -v --test-audio  # Full diagnostic with audio test
+  python diagnose.py --json           # Machine-readable results with check timings
+  python diagnose.py --history --hook posttooluse --status debounced --since 1h
+  python diagnose.py --profile --since 1h --trace hooks-trace.json
 """
     )
     parser.add_argument("-v", "--verbose", action="store_true", help="Show detailed debug information")
     parser.add_argument("--test-audio", action="store_true", help="Test audio playback")
+    parser.add_argument("--json", action="store_true", help="Print check results and timings as JSON")
+    parser.add_argument("--timeout", type=float, default=CHECK_TIMEOUT_SECONDS,
+                        help=f"Seconds before a check is abandoned (default: {CHECK_TIMEOUT_SECONDS:g})")
+    parser.add_argument("--history", action="store_true", help="Query hook trigger history")
+    parser.add_argument("--profile", action="store_true", help="Summarize CLAUDE_HOOKS_PROFILE=1 phase timings")
+    parser.add_argument("--trace", help="Profile: also write a Chrome trace-event file")
+    parser.add_argument("--hook", help="History/profile: only this hook type")
+    parser.add_argument("--status", help="History: only this status (e.g. PLAYED, DEBOUNCED)")
+    parser.add_argument("--since", default="24h", help="History/profile: time window, e.g. 30m, 1h, 7d (default: 24h)")
+    parser.add_argument("--tail", type=int, default=10, help="History: number of recent triggers to show (default: 10)")
+    parser.add_argument("--ingest", action="store_true", help="History: first move spooled triggers into history.db")
 
     args = parser.parse_args()
 
-    return run_diagnostics(verbose=args.verbose, test_audio=args.test_audio)
+    if args.history:
+        return run_history(args.since, args.hook, args.status, args.tail, ingest=args.ingest)
+    if args.profile:
+        return run_profile(args.since, args.hook, args.trace)
+
+    result = run_diagnostics(verbose=args.verbose, test_audio=args.test_audio,
+                             as_json=args.json, timeout=args.timeout)
+    if ABANDONED_CHECKS:
+        # Interpreter shutdown would wait for the hung check threads
+        sys.stdout.flush()
+        os._exit(result)
+    return result
 
 
 if __name__ == "__main__":
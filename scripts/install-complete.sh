@@ -376,9 +376,12 @@ step_install_hooks() {
     chmod +x ~/.claude/hooks/shared/*.sh
     print_success "Shared utilities installed"
 
-    # Install Python hook runner (for Windows compatibility)
+    # Install Python hook runner (for Windows compatibility): the entry
+    # point plus the audio_hooks package it imports
     if [ -f "$PROJECT_DIR/hooks/hook_runner.py" ]; then
         cp "$PROJECT_DIR/hooks/hook_runner.py" ~/.claude/hooks/
+        mkdir -p ~/.claude/hooks/audio_hooks
+        cp "$PROJECT_DIR"/hooks/audio_hooks/*.py ~/.claude/hooks/audio_hooks/
         print_success "Python hook runner installed"
     fi
 
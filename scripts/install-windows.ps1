@@ -224,7 +224,8 @@ function Step-ValidateProject {
         @{ Path = (Join-Path $ProjectDir "hooks"); Type = "Directory"; Name = "hooks/ directory" },
         @{ Path = (Join-Path $ProjectDir "audio\default"); Type = "Directory"; Name = "audio/default/ directory" },
         @{ Path = (Join-Path $ProjectDir "config"); Type = "Directory"; Name = "config/ directory" },
-        @{ Path = (Join-Path $ProjectDir "hooks\hook_runner.py"); Type = "File"; Name = "hook_runner.py" }
+        @{ Path = (Join-Path $ProjectDir "hooks\hook_runner.py"); Type = "File"; Name = "hook_runner.py" },
+        @{ Path = (Join-Path $ProjectDir "hooks\audio_hooks\runner.py"); Type = "File"; Name = "audio_hooks/runner.py" }
     )
 
     foreach ($check in $checks) {
@@ -246,7 +247,7 @@ function Step-ValidateProject {
         Write-Warning2 "Audio files: Only $($audioFiles.Count) MP3 files found"
     }
 
-    if ($valid -lt 4) {
+    if ($valid -lt 5) {
         Write-Host ""
         Write-Error2 "Project structure incomplete"
         Write-Info "Make sure you're running from the project root directory"
@@ -263,10 +264,15 @@ function Step-InstallHooks {
     }
     Write-Success "Created hooks directory: $HooksDir"
 
-    # Copy hook_runner.py
+    # Copy hook_runner.py and the audio_hooks package it imports
     $sourceRunner = Join-Path $ProjectDir "hooks\hook_runner.py"
     $destRunner = Join-Path $HooksDir "hook_runner.py"
     Copy-Item -Path $sourceRunner -Destination $destRunner -Force
+    $destPackage = Join-Path $HooksDir "audio_hooks"
+    if (-not (Test-Path $destPackage)) {
+        New-Item -ItemType Directory -Path $destPackage -Force | Out-Null
+    }
+    Copy-Item -Path (Join-Path $ProjectDir "hooks\audio_hooks\*.py") -Destination $destPackage -Force
     Write-Success "Installed hook_runner.py"
 
     # Save project path (Windows format)
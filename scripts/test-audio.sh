@@ -175,6 +175,29 @@ echo ""
 # TEST FUNCTIONS
 #=============================================================================
 
+# Play files back to back with hook_runner.py --playlist: one player for
+# the whole list, returning when the last clip has really finished
+# Returns non-zero if no working Python 3/hook_runner.py is available
+play_playlist() {
+    [ -f "$HOOK_RUNNER" ] || return 1
+
+    local runner_for_python=$(convert_path_for_python "$HOOK_RUNNER")
+    local files=() file cmd
+    for file in "$@"; do
+        files+=("$(convert_path_for_python "$file")")
+    done
+
+    for cmd in "$CLAUDE_HOOKS_PYTHON_CMD" python3 python py; do
+        [ -n "$cmd" ] || continue
+        command -v "$cmd" &> /dev/null || continue
+        "$cmd" -c 'import sys; sys.exit(sys.version_info[0] < 3)' 2>/dev/null || continue
+        "$cmd" "$runner_for_python" --playlist "${files[@]}"
+        return $?
+    done
+
+    return 1
+}
+
 test_audio_file() {
     local hook=$1
     local audio_file=$(get_audio_file "$hook")
@@ -190,9 +213,10 @@ test_audio_file() {
         echo -e "  Size: $size"
 
         echo -e "  ${BLUE}▶ Playing...${NC}"
-        play_audio_internal "$full_path" 2>/dev/null
-
-        sleep 3
+        if ! play_playlist "$full_path" > /dev/null 2>&1; then
+            play_audio_internal "$full_path" 2>/dev/null
+            sleep 3
+        fi
 
         echo -e "  ${GREEN}✓${NC} Playback complete"
     else
@@ -202,6 +226,39 @@ test_audio_file() {
     echo ""
 }
 
+# Test several hooks in one go: list them, then play every clip through a
+# single player invocation instead of one player plus a fixed sleep each
+test_audio_files() {
+    local files=() hook audio_file
+
+    for hook in "$@"; do
+        audio_file=$(get_audio_file "$hook")
+        echo -e "${CYAN}Queued:${NC} ${BOLD}$(get_description "$hook")${NC}"
+        echo -e "  Hook: $hook"
+        echo -e "  File: $audio_file"
+        if [ -f "$AUDIO_DIR/$audio_file" ]; then
+            files+=("$AUDIO_DIR/$audio_file")
+        else
+            echo -e "  ${RED}✗${NC} File not found!"
+        fi
+        echo ""
+    done
+
+    [ ${#files[@]} -gt 0 ] || return 0
+
+    echo -e "${BLUE}▶ Playing ${#files[@]} clip(s) back to back...${NC}"
+    if play_playlist "${files[@]}"; then
+        echo -e "${GREEN}✓${NC} Playback complete"
+        echo ""
+        return 0
+    fi
+
+    echo -e "${YELLOW}⚠${NC} Playlist playback unavailable, playing one file at a time\n"
+    for hook in "$@"; do
+        test_audio_file "$hook"
+    done
+}
+
 #=============================================================================
 # TEST EXECUTION
 #=============================================================================
@@ -212,19 +269,17 @@ case $TEST_OPTION in
         echo -e "${BLUE}${BOLD}Testing Enabled Hooks${NC}\n"
         echo -e "This will test only the hooks you have enabled.\n"
 
-        tested=0
+        enabled_hooks=()
         for i in "${!HOOK_NAMES[@]}"; do
-            hook="${HOOK_NAMES[$i]}"
             if [[ "${ENABLED_STATUS[$i]}" == "true" ]]; then
-                test_audio_file "$hook"
-                ((tested++))
-
-                if [ $tested -lt 3 ]; then
-                    echo -e "${CYAN}Next audio in 2 seconds...${NC}\n"
-                    sleep 2
-                fi
+                enabled_hooks+=("${HOOK_NAMES[$i]}")
             fi
         done
+        tested=${#enabled_hooks[@]}
+
+        if [ $tested -gt 0 ]; then
+            test_audio_files "${enabled_hooks[@]}"
+        fi
 
         if [ $tested -eq 0 ]; then
             echo -e "${YELLOW}⚠${NC} No enabled hooks found!"
@@ -239,16 +294,7 @@ case $TEST_OPTION in
         echo -e "${BLUE}${BOLD}Testing All Audio Files${NC}\n"
         echo -e "This will play all 9 audio files, including disabled hooks.\n"
 
-        count=0
-        for hook in "${HOOK_NAMES[@]}"; do
-            test_audio_file "$hook"
-            ((count++))
-
-            if [ $count -lt 9 ]; then
-                echo -e "${CYAN}Next audio in 2 seconds...${NC}\n"
-                sleep 2
-            fi
-        done
+        test_audio_files "${HOOK_NAMES[@]}"
 
         echo -e "${GREEN}${BOLD}✓ Tested all 9 audio files${NC}"
         ;;
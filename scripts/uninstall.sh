@@ -200,6 +200,10 @@ if [ -d "$HOOKS_DIR/shared" ]; then
     echo -e "${GREEN}✓${NC} Removed shared configuration library"
 fi
 
+# Remove the Python hook runner and the cached environment it writes
+rm -f "$HOOKS_DIR/hook_runner.py" "$HOOKS_DIR/.env_cache.json"
+rm -rf "$HOOKS_DIR/audio_hooks"
+
 # Also remove old v1.0 hook if it exists
 if [ -f "$HOOKS_DIR/play_audio.sh" ]; then
     rm "$HOOKS_DIR/play_audio.sh"